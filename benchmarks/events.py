@@ -0,0 +1,216 @@
+"""Benchmark of webhook event parsing: lazy whatsapp.events views vs eager pydantic models.
+
+Builds a multi-entry batch of inbound messages (text, image, reaction, location) and status
+updates, then compares decoding it and reading `from`, `type` and `id` of every event with
+whatsapp.events.parse against validating it into a full pydantic model tree:
+
+    python -m benchmarks.events --entries 200 --messages 50
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from typing import Optional
+from pydantic import BaseModel, Field
+from whatsapp.events import parse
+
+
+class Profile(BaseModel):
+    name: str
+
+
+class WaContact(BaseModel):
+    profile: Profile
+    wa_id: str
+
+
+class Text(BaseModel):
+    body: str
+
+
+class MediaObject(BaseModel):
+    id: str
+    mime_type: str
+    sha256: str
+    caption: Optional[str] = None
+
+
+class Reaction(BaseModel):
+    message_id: str
+    emoji: Optional[str] = None
+
+
+class LocationObject(BaseModel):
+    latitude: float
+    longitude: float
+    name: Optional[str] = None
+    address: Optional[str] = None
+
+
+class Context(BaseModel):
+    id: str
+    from_: Optional[str] = Field(default=None, alias="from")
+
+
+class InboundMessage(BaseModel):
+    from_: str = Field(alias="from")
+    id: str
+    timestamp: int
+    type: str
+    context: Optional[Context] = None
+    text: Optional[Text] = None
+    image: Optional[MediaObject] = None
+    reaction: Optional[Reaction] = None
+    location: Optional[LocationObject] = None
+
+
+class Conversation(BaseModel):
+    id: str
+
+
+class Pricing(BaseModel):
+    billable: bool
+    pricing_model: str
+    category: str
+
+
+class Status(BaseModel):
+    id: str
+    status: str
+    timestamp: int
+    recipient_id: str
+    conversation: Optional[Conversation] = None
+    pricing: Optional[Pricing] = None
+
+
+class Metadata(BaseModel):
+    display_phone_number: str
+    phone_number_id: str
+
+
+class Value(BaseModel):
+    messaging_product: str
+    metadata: Metadata
+    contacts: list[WaContact] = []
+    messages: list[InboundMessage] = []
+    statuses: list[Status] = []
+
+
+class Change(BaseModel):
+    field: str
+    value: Value
+
+
+class Entry(BaseModel):
+    id: str
+    changes: list[Change]
+
+
+class Payload(BaseModel):
+    object: str
+    entry: list[Entry]
+
+
+def message(index: int) -> dict:
+    base = {"from": f"1650555{index % 10000:04d}", "id": f"wamid.{index}", "timestamp": "1749416383"}
+    kind = index % 4
+    if kind == 0:
+        return base | {"type": "text", "text": {"body": "Does it come in another color?"}}
+    if kind == 1:
+        return base | {"type": "image", "image": {"id": str(index), "mime_type": "image/jpeg", "sha256": "x" * 44,
+                                                  "caption": "this one"}}
+    if kind == 2:
+        return base | {"type": "reaction", "reaction": {"message_id": f"wamid.{index - 1}", "emoji": "\U0001F600"}}
+    return base | {"type": "location", "location": {"latitude": 9.082, "longitude": 8.6753, "name": "Abuja"}}
+
+
+def status(index: int) -> dict:
+    return {
+        "id": f"wamid.out.{index}",
+        "status": ("sent", "delivered", "read")[index % 3],
+        "timestamp": "1749416383",
+        "recipient_id": f"1650555{index % 10000:04d}",
+        "conversation": {"id": f"conv.{index % 100}"},
+        "pricing": {"billable": True, "pricing_model": "CBP", "category": "marketing"},
+    }
+
+
+def batch(entries: int, messages: int) -> bytes:
+    return json.dumps({
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": str(e),
+                "changes": [{
+                    "field": "messages",
+                    "value": {
+                        "messaging_product": "whatsapp",
+                        "metadata": {"display_phone_number": "15550783881", "phone_number_id": "106540352242922"},
+                        "contacts": [{"profile": {"name": "Sheena"}, "wa_id": "16505551234"}],
+                        "messages": [message(e * messages + i) for i in range(messages)],
+                        "statuses": [status(e * messages + i) for i in range(messages * 3)],
+                    },
+                }],
+            }
+            for e in range(entries)
+        ],
+    }).encode()
+
+
+def lazy(body: bytes) -> list:
+    events = list(parse(body))
+    for event in events:
+        event.id, event.type
+        if event.kind == "message":
+            event.sender
+    return events
+
+
+def eager(body: bytes) -> list:
+    events = []
+    for entry in Payload.model_validate_json(body).entry:
+        for change in entry.changes:
+            events.extend(change.value.messages)
+            events.extend(change.value.statuses)
+    for event in events:
+        event.id
+        getattr(event, "type", None) or event.status
+        getattr(event, "from_", None)
+    return events
+
+
+def measure(fn, body: bytes, repeat: int) -> tuple[float, int, int]:
+    fn(body)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        events = fn(body)
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    events = fn(body)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, len(events), retained
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50, help="inbound messages per entry, statuses are 3x")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = batch(args.entries, args.messages)
+    print(f"batch: {len(body) / 1e6:.1f} MB, {args.entries} entries")
+    results = {}
+    for name, fn in (("lazy events", lazy), ("eager pydantic", eager)):
+        elapsed, count, retained = measure(fn, body, args.repeat)
+        results[name] = elapsed
+        print(f"{name:<16}{count / elapsed:>12,.0f} events/s  {elapsed * 1000:8.1f} ms/batch  "
+              f"{retained / count:8.0f} bytes/event retained")
+    print(f"speedup: {results['eager pydantic'] / results['lazy events']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
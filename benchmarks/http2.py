@@ -0,0 +1,259 @@
+"""HTTP/1.1 (Transport) vs HTTP/2 (HTTP2Transport) at high concurrency, against a local stub.
+
+The stub runs in its own process and answers /messages and /media requests after --latency-ms,
+speaking HTTP/1.1 or HTTP/2 without TLS (prior knowledge) on the same port. Each scenario sends
+--messages messages with send_bulk at --concurrency, optionally while another thread uploads
+--upload-mb files in a loop, and reports the connections the server accepted, the send latency,
+and the uploads completed, failed (timed out) and their throughput during the sends:
+
+    http/1.1         Transport, one connection per concurrent request
+    http/2           HTTP2Transport, messages and media on separate connections
+    http/2 one lane  HTTP2Transport with media sharing the messages connections
+
+    python -m benchmarks.http2 --messages 3000 --concurrency 64 --latency-ms 20 --upload-mb 16
+
+Needs httpx and h2 (`pip install whatsapp[http2]`).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from benchmarks.suite import messages, percentile
+
+PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+
+def response_body(path: str, ids) -> bytes:
+    if path.endswith("/media"):
+        return json.dumps({"id": str(next(ids))}).encode()
+    return json.dumps({
+        "messaging_product": "whatsapp",
+        "contacts": [{"input": "16505551234", "wa_id": "16505551234"}],
+        "messages": [{"id": f"wamid.{next(ids)}"}],
+    }).encode()
+
+
+class Stub:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections: Counter[str] = Counter()
+        self.ids = iter(range(10 ** 15, 10 ** 16))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await reader.readexactly(len(PREFACE))
+        except asyncio.IncompleteReadError:
+            writer.close()
+            return
+        try:
+            if head == PREFACE:
+                self.connections["h2"] += 1
+                await self.http2(head, reader, writer)
+            else:
+                self.connections["http/1.1"] += 1
+                await self.http1(head, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def http1(self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        buffer = head
+        while True:
+            while b"\r\n\r\n" not in buffer:
+                data = await reader.read(65536)
+                if not data:
+                    return
+                buffer += data
+            header, _, buffer = buffer.partition(b"\r\n\r\n")
+            lines = header.decode("latin-1").split("\r\n")
+            path = lines[0].split(" ")[1]
+            headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:])}
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                while True:
+                    while b"\r\n" not in buffer:
+                        buffer += await reader.read(65536)
+                    size_line, _, buffer = buffer.partition(b"\r\n")
+                    size = int(size_line.split(b";")[0], 16)
+                    while len(buffer) < size + 2:
+                        buffer += await reader.read(max(65536, size + 2 - len(buffer)))
+                    buffer = buffer[size + 2:]
+                    if not size:
+                        break
+            else:
+                remaining = int(headers.get("content-length", 0))
+                while len(buffer) < remaining:
+                    buffer += await reader.read(max(65536, remaining - len(buffer)))
+                buffer = buffer[remaining:]
+            await asyncio.sleep(self.latency)
+            body = response_body(path, self.ids)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+            )
+            await writer.drain()
+
+    async def http2(self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        conn.local_settings.max_concurrent_streams = 100
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        paths: dict[int, str] = {}
+        wake = asyncio.Event()
+
+        async def respond(stream_id: int):
+            await asyncio.sleep(self.latency)
+            body = response_body(paths.pop(stream_id), self.ids)
+            conn.send_headers(stream_id, [
+                (":status", "200"), ("content-type", "application/json"), ("content-length", str(len(body))),
+            ])
+            conn.send_data(stream_id, body, end_stream=True)
+            wake.set()
+
+        async def flush():
+            while True:
+                await wake.wait()
+                wake.clear()
+                writer.write(conn.data_to_send())
+                await writer.drain()
+
+        flusher = asyncio.ensure_future(flush())
+        tasks = set()
+        data = head
+        try:
+            while data:
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        paths[event.stream_id] = dict(event.headers)[":path"]
+                    elif isinstance(event, h2.events.DataReceived):
+                        # hand the window back at once: the stub consumes bodies as they arrive
+                        conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        task = asyncio.ensure_future(respond(event.stream_id))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+                wake.set()
+                data = await reader.read(65536)
+        finally:
+            flusher.cancel()
+            for task in tasks:
+                task.cancel()
+
+
+def serve(latency: float, pipe):
+    async def main():
+        stub = Stub(latency)
+        server = await asyncio.start_server(stub.handle, "127.0.0.1", 0, backlog=1024)
+        pipe.send(server.sockets[0].getsockname()[1])
+        await asyncio.get_running_loop().run_in_executor(None, pipe.recv)
+        pipe.send(dict(stub.connections))
+        server.close()
+
+    asyncio.run(main())
+
+
+def run(name: str, args, port: int, upload: str) -> tuple[list[float], int, int, float]:
+    from whatsapp import WhatsApp
+    from whatsapp.http2_transport import HTTP2Transport
+    from whatsapp.metrics import Instrumentation
+    from whatsapp.ratelimit import RateLimiter
+    from whatsapp.transport import Transport
+
+    url = f"http://127.0.0.1:{port}"
+    if name == "http/1.1":
+        transport = Transport(url, pool_maxsize=args.concurrency + 1)
+    else:
+        transport = HTTP2Transport(url, http1=False)
+        if name == "http/2 one lane":
+            transport.async_transport.media_client = transport.async_transport.client
+    latencies: list[float] = []
+    whatsapp = WhatsApp(
+        "benchmark", "106540352242922", "benchmark", version="v21.0", transport=transport,
+        rate_limiter=RateLimiter(rate=1e9, pair_rate=1e9),
+        instrumentation=Instrumentation(lambda call: latencies.append(call.wire_time) if call.endpoint == "messages" else None),
+    )
+    done = threading.Event()
+    uploads = upload_errors = 0
+
+    def upload_loop():
+        nonlocal uploads, upload_errors
+        while not done.is_set():
+            try:
+                whatsapp.media.upload_media(upload, "video/mp4")
+                uploads += 1
+            except Exception:
+                # a starved upload times out; count it and keep the load on
+                upload_errors += 1
+
+    uploader = threading.Thread(target=upload_loop) if upload else None
+    with transport, whatsapp:
+        if uploader is not None:
+            uploader.start()
+        started = time.perf_counter()
+        bulk = whatsapp.message.send_bulk(messages(args.messages), concurrency=args.concurrency)
+        errors = sum(not result.ok for result in bulk)
+        elapsed = time.perf_counter() - started
+        done.set()
+        if uploader is not None:
+            uploader.join()
+    if errors:
+        print(f"{name}: {errors} sends failed")
+    latencies.sort()
+    return latencies, uploads, upload_errors, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stub latency per request")
+    parser.add_argument("--upload-mb", type=float, default=0.0, help="upload files of this size during the sends")
+    args = parser.parse_args()
+    try:
+        import h2  # noqa: F401
+        import httpx  # noqa: F401
+    except ImportError:
+        print("needs httpx and h2: pip install whatsapp[http2]")
+        return 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        upload = ""
+        if args.upload_mb:
+            upload = os.path.join(directory, "upload.mp4")
+            with open(upload, "wb") as f:
+                f.write(os.urandom(int(args.upload_mb * 1024 * 1024)))
+        print(
+            f"{'transport':<17}{'connections':>12}{'msg/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+            f"{'uploads':>9}{'failed':>8}{'MiB/s':>8}"
+        )
+        for name in ("http/1.1", "http/2", "http/2 one lane"):
+            if name == "http/2 one lane" and not upload:
+                continue
+            parent, child = multiprocessing.Pipe()
+            server = multiprocessing.Process(target=serve, args=(args.latency_ms / 1000, child), daemon=True)
+            server.start()
+            port = parent.recv()
+            latencies, uploads, upload_errors, elapsed = run(name, args, port, upload)
+            parent.send("stop")
+            connections = sum(parent.recv().values())
+            server.join()
+            print(f"{name:<17}{connections:>12}{args.messages / elapsed:>9,.0f}{percentile(latencies, 0.5) * 1000:>9.2f}"
+                  f"{percentile(latencies, 0.99) * 1000:>9.2f}{latencies[-1] * 1000:>9.2f}{uploads:>9}"
+                  f"{upload_errors:>8}{uploads * args.upload_mb / elapsed:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Import-time benchmark for the whatsapp package.
+
+Runs ``python -X importtime`` in fresh interpreters and reports the median cumulative import
+time of each statement, plus the slowest modules it pulled in. Exits with status 1 when a
+budget is exceeded or when a module that must stay lazy was imported, so it can gate CI:
+
+    python -m benchmarks.import_time --runs 7 --budget-ms 400
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = {
+    "import whatsapp": "import whatsapp",
+    "from whatsapp import WhatsApp": "from whatsapp import WhatsApp",
+}
+# modules that only specific features need, and that must not be loaded by the statements above
+LAZY_MODULES = (
+    "bs4", "email_validator", "httpx", "asyncio", "sqlite3",
+    # optional subsystems, imported by the constructor arguments and methods that use them
+    "whatsapp.webhook", "whatsapp.window", "whatsapp.receipts", "whatsapp.metrics", "whatsapp.templates",
+    "whatsapp.validation", "whatsapp.retry", "whatsapp.cache",
+)
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def _run(statement: str) -> tuple[list[tuple[int, int, str]], set[str]]:
+    probe = f"{statement}\nimport sys\nprint(','.join(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match is not None:
+            entries.append((int(match.group(2)), len(match.group(3)), match.group(4)))
+    return entries, set(proc.stdout.strip().split(","))
+
+
+def measure(statement: str, startup: set[str]) -> tuple[int, dict[str, int], set[str]]:
+    entries, loaded = _run(statement)
+    # interpreter startup (site, .pth hooks, ...) also shows up as top level imports, leave it out
+    entries = [entry for entry in entries if entry[2] not in startup]
+    total = sum(cumulative for cumulative, indent, _ in entries if indent == 1)
+    return total, {name: cumulative for cumulative, _, name in entries}, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when a statement exceeds this median")
+    args = parser.parse_args()
+
+    startup = {name for _, _, name in _run("pass")[0]}
+    failed = False
+    for label, statement in STATEMENTS.items():
+        totals = []
+        modules, loaded = {}, set()
+        for _ in range(args.runs):
+            total, modules, loaded = measure(statement, startup)
+            totals.append(total)
+        median_ms = statistics.median(totals) / 1000
+        print(f"{label}: median {median_ms:.1f} ms over {args.runs} runs (min {min(totals) / 1000:.1f} ms)")
+        for name, cumulative in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+        eager = [name for name in LAZY_MODULES if name in loaded]
+        if eager:
+            print(f"    FAIL: eagerly imported {', '.join(eager)}")
+            failed = True
+        if args.budget_ms is not None and median_ms > args.budget_ms:
+            print(f"    FAIL: over the {args.budget_ms:.0f} ms budget")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
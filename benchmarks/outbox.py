@@ -0,0 +1,63 @@
+"""Throughput of the SQLite outbox (whatsapp.outbox).
+
+Enqueues --messages messages in batches, then drains them with --workers processes sharing the file.
+The send is a stub that returns at once, so the numbers are the outbox's own cost (claims, leases,
+write backs). Checks that every message was sent exactly once:
+
+    python -m benchmarks.outbox --messages 100000 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from whatsapp.models import MessageResponse
+from whatsapp.outbox import Outbox
+
+RESPONSE = MessageResponse.model_validate({"messaging_product": "whatsapp", "messages": [{"id": "wamid.stub"}]})
+
+
+def send(message: dict) -> MessageResponse:
+    return RESPONSE
+
+
+def work(path: str, concurrency: int, batch_size: int) -> int:
+    with Outbox(path) as outbox:
+        return outbox.drain(send, concurrency=concurrency, batch_size=batch_size).total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4, help="draining processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="send threads per worker")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "outbox.db")
+        message = {"messaging_product": "whatsapp", "to": "16505551234", "type": "text", "text": {"body": "hi"}}
+        with Outbox(path) as outbox:
+            start = time.perf_counter()
+            for offset in range(0, args.messages, args.batch_size):
+                count = min(args.batch_size, args.messages - offset)
+                outbox.enqueue([message] * count, [f"m{i}" for i in range(offset, offset + count)])
+            elapsed = time.perf_counter() - start
+            print(f"enqueue: {args.messages / elapsed:>10,.0f} msg/s  (batches of {args.batch_size})")
+
+            start = time.perf_counter()
+            with multiprocessing.Pool(args.workers) as pool:
+                totals = pool.starmap(work, [(path, args.concurrency, args.batch_size)] * args.workers)
+            elapsed = time.perf_counter() - start
+            print(f"drain:   {sum(totals) / elapsed:>10,.0f} msg/s  ({args.workers} workers: {totals})")
+            counts = outbox.counts()
+            print(f"state:   {counts}")
+            if sum(totals) != args.messages or counts["sent"] != args.messages:
+                print("error: messages were lost or sent twice")
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Microbenchmark of message serialization: validated pydantic path vs trusted fast path.
+
+For each message type it checks that both paths encode to the same bytes, then reports how
+many messages per second each path can build and encode (no network involved):
+
+    python -m benchmarks.payloads --seconds 1
+"""
+import argparse
+import sys
+import time
+from whatsapp import payloads
+from whatsapp.models import Location, Message, MessageTypeProperties
+from whatsapp.payloads import JSONCodec, OrjsonCodec
+
+CASES = {
+    "text": (
+        lambda: Message(
+            recipient_type="individual",
+            to="+1234567890",
+            type="text",
+            text=MessageTypeProperties(preview_url=True, body="hi, welcome to my business"),
+        ),
+        lambda: payloads.text("+1234567890", "hi, welcome to my business"),
+    ),
+    "reply": (
+        lambda: Message(
+            recipient_type="individual",
+            to="+1234567890",
+            context=MessageTypeProperties(message_id="wamid.HBgLMTIzNDU2Nzg5MAA="),
+            type="text",
+            text=MessageTypeProperties(body="thanks!"),
+        ),
+        lambda: payloads.reply_text("+1234567890", "thanks!", "wamid.HBgLMTIzNDU2Nzg5MAA="),
+    ),
+    "media": (
+        lambda: Message(
+            recipient_type="individual",
+            to="+1234567890",
+            type="document",
+            document=MessageTypeProperties(id="1234567890", caption="Our brochure", filename="brochure.pdf"),
+        ),
+        lambda: payloads.media("document", "+1234567890", "1234567890", "Our brochure", "brochure.pdf"),
+    ),
+    "reaction": (
+        lambda: Message(
+            recipient_type="individual",
+            to="+1234567890",
+            type="reaction",
+            reaction=MessageTypeProperties(message_id="wamid.HBgLMTIzNDU2Nzg5MAA=", emoji="\U0001F600"),
+        ),
+        lambda: payloads.reaction("+1234567890", "wamid.HBgLMTIzNDU2Nzg5MAA=", "\U0001F600"),
+    ),
+    "location": (
+        lambda: Message(
+            recipient_type="individual",
+            to="+1234567890",
+            type="location",
+            location=Location(latitude="9.0820", longitude="8.6753", name="Abuja", address=None),
+        ),
+        lambda: payloads.location("+1234567890", "9.0820", "8.6753", "Abuja"),
+    ),
+    "read": (
+        lambda: Message(status="read", message_id="wamid.HBgLMTIzNDU2Nzg5MAA="),
+        lambda: payloads.read_receipt("wamid.HBgLMTIzNDU2Nzg5MAA="),
+    ),
+}
+
+
+def rate(fn, seconds: float) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(200):
+            fn()
+        count += 200
+    return count / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent on each measurement")
+    args = parser.parse_args()
+
+    codec = JSONCodec()
+    try:
+        fast_codec = OrjsonCodec()
+    except ImportError:
+        fast_codec = None
+
+    mismatched = False
+    print(f"{'type':<10}{'pydantic msg/s':>16}{'fast msg/s':>14}{'speedup':>9}{'fast+orjson msg/s':>20}")
+    for name, (model, template) in CASES.items():
+        if codec.dumps(model().model_dump(exclude_none=True)) != codec.dumps(template()):
+            print(f"{name}: payloads differ")
+            mismatched = True
+            continue
+        slow = rate(lambda: codec.dumps(model().model_dump(exclude_none=True)), args.seconds)
+        fast = rate(lambda: codec.dumps(template()), args.seconds)
+        orjson = f"{rate(lambda: fast_codec.dumps(template()), args.seconds):>20,.0f}" if fast_codec else f"{'n/a':>20}"
+        print(f"{name:<10}{slow:>16,.0f}{fast:>14,.0f}{fast / slow:>8.1f}x{orjson}")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
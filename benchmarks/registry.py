@@ -0,0 +1,54 @@
+"""Cost of serving many phone numbers: one WhatsApp client per number vs WhatsAppRegistry handles.
+
+Builds --numbers clients (each with its own transport and validated config), then registers the
+same numbers in a registry and routes a lookup to --active of them. Reports the setup time and the
+memory held (tracemalloc) by each; nothing is sent:
+
+    python -m benchmarks.registry --numbers 500 --active 50
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from whatsapp import WhatsApp
+from whatsapp.registry import WhatsAppRegistry
+
+
+def measure(build) -> tuple[float, int, object]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, size, held
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--numbers", type=int, default=500)
+    parser.add_argument("--active", type=int, default=50, help="numbers the registry actually routes to")
+    args = parser.parse_args()
+    numbers = [str(106540352242922 + i) for i in range(args.numbers)]
+
+    def clients():
+        return [WhatsApp("token", number, "verify", version="v21.0") for number in numbers]
+
+    def registry():
+        registry = WhatsAppRegistry("token", version="v21.0", max_active=args.active)
+        for number in numbers:
+            registry.add(number)
+        for number in numbers[:args.active]:
+            registry.get(number).message
+        return registry
+
+    WhatsApp("token", "0", "verify", version="v21.0").close()  # imports and pydantic schema build
+    for name, build in (("clients", clients), ("registry", registry)):
+        elapsed, size, held = measure(build)
+        print(f"{name:<9}{elapsed * 1000:>9.1f} ms{size / 1024:>10.0f} KiB"
+              f"{elapsed / args.numbers * 1e6:>9.1f} us/number{size / args.numbers:>9.0f} B/number")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Memory held by bulk send results, and export speed of the columnar ResultSet (whatsapp.results).
+
+Keeps --results results of realistic shape three ways (MessageResponse models, SendResult records,
+one ResultSet) and reports the bytes per result (tracemalloc), then times ResultSet.to_csv and
+to_jsonl to a temporary file:
+
+    python -m benchmarks.results --results 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from whatsapp.models import MessageResponse
+from whatsapp.results import ResultSet, SendResult
+
+
+def response(i: int) -> dict:
+    to = f"1650{i:07d}"
+    return {
+        "messaging_product": "whatsapp",
+        "contacts": [{"input": to, "wa_id": to}],
+        "messages": [{"id": f"wamid.HBgLMTY1MDU1NTEyMzQVAgARGBI{i:020d}A"}],
+    }
+
+
+def measure(name: str, count: int, build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{name:<17}{size / count:>8.0f} B/result{size / 1024 / 1024:>9.1f} MiB{elapsed:>8.2f} s to build")
+    return held
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=1_000_000)
+    args = parser.parse_args()
+    n = args.results
+    MessageResponse(**response(0))  # pydantic schema build
+
+    measure("MessageResponse", n, lambda: [MessageResponse(**response(i)) for i in range(n)])
+    measure("SendResult", n, lambda: [SendResult(i, f"1650{i:07d}", response(i)) for i in range(n)])
+    results = measure("ResultSet", n, lambda: ResultSet(SendResult(i, f"1650{i:07d}", response(i)) for i in range(n)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for export in ("to_csv", "to_jsonl"):
+            path = os.path.join(directory, "results")
+            start = time.perf_counter()
+            getattr(results, export)(path)
+            elapsed = time.perf_counter() - start
+            print(f"{export:<17}{n / elapsed:>10,.0f} rows/s{os.path.getsize(path) / 1024 / 1024:>9.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Ingest speed and query latency of the delivery status stores (whatsapp.statuses).
+
+Tracks --messages sent messages over --campaigns campaigns, then feeds three status webhooks per
+message (sent, delivered, read; a few percent fail or stay undelivered) as webhook payloads of
+--batch statuses in shuffled order, into the in-memory store and into the SQLite store:
+
+    python -m benchmarks.statuses --messages 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from whatsapp.statuses import MemoryStatusStore, SQLiteStatusStore
+
+
+def statuses(n: int, now: int, rng: random.Random) -> list[dict]:
+    events = []
+    for i in range(n):
+        message_id, recipient = f"wamid.HBgLMTY1MDU1NTEyMzQVAgARGBI{i:020d}A", str(16_500_000_000 + i)
+        outcome = rng.random()
+        sequence = ("sent", "failed") if outcome < 0.02 else ("sent",) if outcome < 0.05 else ("sent", "delivered", "read")
+        for offset, status in enumerate(sequence):
+            events.append({"id": message_id, "status": status, "timestamp": str(now + offset), "recipient_id": recipient})
+    rng.shuffle(events)
+    return events
+
+
+def payloads(events: list[dict], batch: int) -> list[dict]:
+    return [
+        {"entry": [{"changes": [{"value": {"metadata": {"phone_number_id": "1"}, "statuses": events[i:i + batch]}}]}]}
+        for i in range(0, len(events), batch)
+    ]
+
+
+def run(name: str, store, args, events: int, webhooks: list[dict], now: int):
+    n = args.messages
+    per_campaign = n // args.campaigns
+    start = time.perf_counter()
+    for c in range(args.campaigns):
+        store.track_many(
+            ((f"wamid.HBgLMTY1MDU1NTEyMzQVAgARGBI{i:020d}A", str(16_500_000_000 + i))
+             for i in range(c * per_campaign, (c + 1) * per_campaign)),
+            f"campaign-{c}", sent_at=now - 3600,
+        )
+    tracked = time.perf_counter() - start
+    start = time.perf_counter()
+    for payload in webhooks:
+        store.feed(payload)
+    store.flush() if hasattr(store, "flush") else None
+    ingested = time.perf_counter() - start
+    print(f"{name:<8}{n / tracked:>12,.0f} tracked/s{events / ingested:>12,.0f} statuses/s", end="")
+    if hasattr(store, "nbytes"):
+        print(f"{store.nbytes / n:>8.0f} B/message", end="")
+    print()
+    for query, call in (
+            ("delivery_rate", lambda: store.delivery_rate("campaign-0")),
+            ("undelivered", lambda: len(store.undelivered(1800, "campaign-0"))),
+            ("get", lambda: store.get("wamid.HBgLMTY1MDU1NTEyMzQVAgARGBI00000000000000000042A").status),
+            ("for_recipient", lambda: len(store.for_recipient("16500000042"))),
+    ):
+        start = time.perf_counter()
+        result = call()
+        print(f"    {query:<15}{(time.perf_counter() - start) * 1000:>9.3f} ms  {result!r}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--campaigns", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=50, help="statuses per webhook payload")
+    args = parser.parse_args()
+    now = int(time.time())
+    events = statuses(args.messages, now, random.Random(0))
+    webhooks = payloads(events, args.batch)
+
+    run("memory", MemoryStatusStore(capacity=args.messages), args, len(events), webhooks, now)
+    with tempfile.TemporaryDirectory() as directory:
+        with SQLiteStatusStore(os.path.join(directory, "statuses.db")) as store:
+            run("sqlite", store, args, len(events), webhooks, now)
+            size = os.path.getsize(os.path.join(directory, "statuses.db"))
+            print(f"    file{size / args.messages:>20.0f} B/message")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Benchmark suite against the bundled mock Graph API (whatsapp.mock_server).
+
+Starts a MockGraphAPI on localhost and runs each scenario in its own interpreter, so that the
+peak RSS reported for a scenario is the client's alone:
+
+    single     send_text one message after the other
+    bulk       send_bulk with --concurrency worker threads
+    async      AsyncWhatsApp.send_bulk with --concurrency tasks (needs httpx)
+    upload     upload_media of a --media-mb file, one after the other
+    download   query_media_url + download_media_to of --media-mb bodies
+
+    python -m benchmarks.suite --messages 2000 --concurrency 32 --latency-ms 20 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from whatsapp.mock_server import MockGraphAPI
+
+SCENARIOS = ("single", "bulk", "async", "upload", "download")
+
+
+def peak_rss() -> float:
+    # MiB; ru_maxrss is KiB on Linux, bytes on macOS
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def client(args, latencies: list, endpoint: str = "messages", asynchronous: bool = False):
+    from whatsapp.metrics import Instrumentation
+    from whatsapp.ratelimit import RateLimiter
+
+    options = dict(
+        token="benchmark",
+        phone_number_id="106540352242922",
+        verify_token="benchmark",
+        version="v21.0",
+        rate_limiter=RateLimiter(rate=args.rate, pair_rate=args.rate),
+        fast_path=args.fast_path,
+        instrumentation=Instrumentation(
+            lambda call: latencies.append(call.queue_wait + call.wire_time) if call.endpoint == endpoint else None
+        ),
+    )
+    if asynchronous:
+        from whatsapp import AsyncWhatsApp
+        from whatsapp.async_transport import AsyncTransport
+
+        return AsyncWhatsApp(transport=AsyncTransport(
+            args.url, max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+        ), **options)
+    from whatsapp import WhatsApp
+    from whatsapp.transport import Transport
+
+    return WhatsApp(transport=Transport(args.url, pool_maxsize=args.concurrency), **options)
+
+
+def messages(count: int) -> list[dict]:
+    return [
+        {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": f"1650555{i:07d}",
+            "type": "text",
+            "text": {"body": f"Your order #{i} has shipped", "preview_url": False},
+        }
+        for i in range(count)
+    ]
+
+
+def run_single(args, latencies: list) -> tuple[int, int, int]:
+    errors = 0
+    with client(args, latencies) as whatsapp, whatsapp.transport:
+        for i in range(args.messages):
+            try:
+                whatsapp.message.send_text(f"1650555{i:07d}", f"Your order #{i} has shipped")
+            except Exception:
+                errors += 1
+    return args.messages, errors, 0
+
+
+def run_bulk(args, latencies: list) -> tuple[int, int, int]:
+    with client(args, latencies) as whatsapp, whatsapp.transport:
+        bulk = whatsapp.message.send_bulk(messages(args.messages), concurrency=args.concurrency)
+        for _ in bulk:
+            pass
+    return bulk.stats.total, bulk.stats.failed, 0
+
+
+def run_async(args, latencies: list) -> tuple[int, int, int]:
+    async def main():
+        async with client(args, latencies, asynchronous=True) as whatsapp, whatsapp.transport:
+            bulk = whatsapp.message.send_bulk(messages(args.messages), concurrency=args.concurrency)
+            async for _ in bulk:
+                pass
+            return bulk.stats.total, bulk.stats.failed, 0
+
+    return asyncio.run(main())
+
+
+def run_upload(args, latencies: list) -> tuple[int, int, int]:
+    size = int(args.media_mb * 1024 * 1024)
+    errors = 0
+    with tempfile.NamedTemporaryFile(suffix=".jpg") as f:
+        block = os.urandom(1024 * 1024)
+        for offset in range(0, size, len(block)):
+            f.write(block[:size - offset])
+        f.flush()
+        with client(args, latencies, "media/upload") as whatsapp, whatsapp.transport:
+            for _ in range(args.uploads):
+                try:
+                    whatsapp.media.upload_media(f.name, "image/jpeg")
+                except Exception:
+                    errors += 1
+    return args.uploads, errors, size * args.uploads
+
+
+def run_download(args, latencies: list) -> tuple[int, int, int]:
+    errors = received = 0
+    with client(args, latencies, "media/download") as whatsapp, whatsapp.transport:
+        for i in range(args.uploads):
+            try:
+                media = whatsapp.media.query_media_url(str(10 ** 15 + i))
+                sink = io.BytesIO() if args.media_mb <= 64 else open(os.devnull, "wb")
+                with sink:
+                    whatsapp.media.download_media_to(media, sink)
+                received += media.file_size
+            except Exception:
+                errors += 1
+    return args.uploads, errors, received
+
+
+def run(args) -> dict:
+    latencies: list[float] = []
+    started = time.perf_counter()
+    count, errors, payload = globals()[f"run_{args.run}"](args, latencies)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "scenario": args.run,
+        "count": count,
+        "errors": errors,
+        "elapsed": elapsed,
+        "ops": count / elapsed,
+        "mb_s": payload / elapsed / (1024 * 1024),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1] if latencies else float("nan"),
+        "rss": peak_rss(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated subset of the scenarios")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--uploads", type=int, default=10, help="uploads and downloads per scenario")
+    parser.add_argument("--media-mb", type=float, default=16)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mock server latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with --error-codes")
+    parser.add_argument("--error-codes", default="130429,131016,503")
+    parser.add_argument("--rate", type=float, default=1e9, help="client rate limit, messages/second")
+    parser.add_argument("--fast-path", action="store_true")
+    parser.add_argument("--run", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run(args)))
+        return 0
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    mock = MockGraphAPI(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        error_codes=[int(code) for code in args.error_codes.split(",")],
+        media_size=int(args.media_mb * 1024 * 1024),
+    )
+    print(f"{'scenario':<10}{'ops':>8}{'errors':>8}{'ops/s':>10}{'MiB/s':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'peak RSS':>11}")
+    with mock:
+        mock.media_sha256  # computed once here, not during the first download
+        for name in scenarios:
+            if name == "async":
+                try:
+                    import httpx  # noqa: F401
+                except ImportError:
+                    print(f"{name:<10}skipped, needs httpx")
+                    continue
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite", *sys.argv[1:], "--run", name, "--url", mock.url],
+                capture_output=True, text=True,
+            )
+            if proc.returncode:
+                print(f"{name:<10}failed\n{proc.stderr}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{name:<10}{r['count']:>8}{r['errors']:>8}{r['ops']:>10,.0f}{r['mb_s']:>9.1f}"
+                  f"{r['p50'] * 1000:>9.2f}{r['p95'] * 1000:>9.2f}{r['p99'] * 1000:>9.2f}{r['max'] * 1000:>9.2f}"
+                  f"{r['rss']:>8.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Load benchmark of the webhook endpoint.
+
+Serves Webhook.wsgi_app from a threaded wsgiref server on localhost and drives it with
+keep-alive HTTP clients posting signed payloads. Reports acknowledged events per second,
+ack latency percentiles and how long the workers needed to drain the queue:
+
+    python -m benchmarks.webhook --clients 16 --requests 2000
+"""
+import argparse
+import hashlib
+import hmac
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+from whatsapp.webhook import Webhook
+
+APP_SECRET = "benchmark-secret"
+
+
+class _Server(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _QuietHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+
+def payload(index: int, messages: int) -> bytes:
+    return json.dumps({
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "102290129340398",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "15550783881", "phone_number_id": "106540352242922"},
+                    "contacts": [{"profile": {"name": "Sheena Nelson"}, "wa_id": "16505551234"}],
+                    "messages": [
+                        {
+                            "from": "16505551234",
+                            "id": f"wamid.{index}.{i}",
+                            "timestamp": "1749416383",
+                            "type": "text",
+                            "text": {"body": "Does it come in another color?"},
+                        }
+                        for i in range(messages)
+                    ],
+                },
+            }],
+        }],
+    }).encode()
+
+
+def percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per client")
+    parser.add_argument("--messages", type=int, default=1, help="messages per payload")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--handler-ms", type=float, default=0.0, help="simulated work per payload")
+    args = parser.parse_args()
+
+    handled = 0
+    handled_lock = threading.Lock()
+
+    def handler(_payload: dict):
+        nonlocal handled
+        if args.handler_ms:
+            time.sleep(args.handler_ms / 1000)
+        with handled_lock:
+            handled += 1
+
+    webhook = Webhook("verify", APP_SECRET, [handler], workers=args.workers, queue_size=args.clients * args.requests)
+    server = make_server("127.0.0.1", 0, webhook.wsgi_app, server_class=_Server, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    body = payload(0, args.messages)
+    headers = {
+        "Content-Type": "application/json",
+        "X-Hub-Signature-256": "sha256=" + hmac.new(APP_SECRET.encode(), body, hashlib.sha256).hexdigest(),
+    }
+    latencies: list[list[float]] = [[] for _ in range(args.clients)]
+    statuses: dict[int, int] = {}
+    status_lock = threading.Lock()
+
+    def client(index: int):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            conn.request("POST", "/", body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            latencies[index].append(time.perf_counter() - start)
+            with status_lock:
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    acked = time.perf_counter() - start
+    webhook.close()
+    drained = time.perf_counter() - start
+    server.shutdown()
+
+    samples = [latency * 1000 for per_client in latencies for latency in per_client]
+    total = args.clients * args.requests
+    print(f"requests:  {total} from {args.clients} clients, statuses {statuses}")
+    print(f"acked:     {total / acked:,.0f} req/s ({total * args.messages / acked:,.0f} messages/s)")
+    print(f"ack ms:    p50 {percentile(samples, 50):.2f}  p95 {percentile(samples, 95):.2f}  "
+          f"p99 {percentile(samples, 99):.2f}  max {max(samples):.2f}")
+    print(f"handled:   {handled} payloads, queue drained {drained - acked:.2f}s after the last ack")
+    return 0 if handled == statuses.get(200, 0) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
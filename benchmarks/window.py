@@ -0,0 +1,56 @@
+"""Memory and speed of the conversation window index (whatsapp.window) at campaign scale.
+
+Records --contacts inbound messages into a ConversationWindows sized for them, then times is_open()
+lookups of known and unknown recipients, and compares the memory with a dict of wa_id -> timestamp
+(measured with tracemalloc on --dict-contacts entries and scaled):
+
+    python -m benchmarks.window --contacts 10000000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from whatsapp.window import ConversationWindows
+
+
+def wa_id(i: int) -> str:
+    return str(16_500_000_000 + i * 7)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=10_000_000)
+    parser.add_argument("--lookups", type=int, default=1_000_000)
+    parser.add_argument("--dict-contacts", type=int, default=1_000_000)
+    args = parser.parse_args()
+    n = args.contacts
+    now = int(time.time())
+
+    windows = ConversationWindows(capacity=n)
+    start = time.perf_counter()
+    windows.record_many((wa_id(i), now - i % 3600) for i in range(n))
+    elapsed = time.perf_counter() - start
+    print(f"record    {n / elapsed:>12,.0f} contacts/s  {windows.nbytes / n:>6.1f} B/contact"
+          f"  {windows.nbytes / 1024 / 1024:>8.1f} MiB")
+
+    rng = random.Random(0)
+    probes = [wa_id(rng.randrange(2 * n)) for _ in range(args.lookups)]
+    is_open = windows.is_open
+    start = time.perf_counter()
+    found = sum(map(is_open, probes))
+    elapsed = time.perf_counter() - start
+    print(f"is_open   {args.lookups / elapsed:>12,.0f} lookups/s   {found / args.lookups:>6.0%} open")
+
+    m = args.dict_contacts
+    tracemalloc.start()
+    baseline = {wa_id(i): now for i in range(m)}
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"dict      {size / m:>29.1f} B/contact  {size / m * n / 1024 / 1024:>8.1f} MiB for {n:,}")
+    del baseline
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import pytest
+from whatsapp.mock_server import MockGraphAPI
+
+pytest.importorskip("httpx")
+
+from whatsapp import AsyncWhatsApp  # noqa: E402
+from whatsapp.async_transport import AsyncTransport  # noqa: E402
+
+
+class Sink(io.BytesIO):
+    # records the threads the download writes from
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def write(self, data) -> int:
+        self.threads.add(threading.get_ident())
+        return super().write(data)
+
+
+def download(mock: MockGraphAPI, fn):
+    async def main():
+        async with AsyncWhatsApp(
+            "token", "106540352242922", "verify", version="v21.0", transport=AsyncTransport(mock.url),
+        ) as whatsapp:
+            return await fn(whatsapp, threading.get_ident())
+
+    return asyncio.run(main())
+
+
+def test_download_media_to_writes_off_the_event_loop():
+    async def fn(whatsapp, loop_thread):
+        sink = Sink()
+        media = await whatsapp.media.query_media_url("123")
+        digest = await whatsapp.media.download_media_to(media, sink)
+        return sink, digest, loop_thread
+
+    with MockGraphAPI(media_size=1024 * 1024) as mock:
+        sink, digest, loop_thread = download(mock, fn)
+        assert digest == mock.media_sha256 == hashlib.sha256(sink.getvalue()).hexdigest()
+    assert sink.threads and loop_thread not in sink.threads
+
+
+def test_download_media_to_resumes_a_part_file(tmp_path):
+    path = tmp_path / "video.mp4"
+    with MockGraphAPI(media_size=1024 * 1024) as mock:
+        with open(f"{path}.part", "wb") as f:
+            for chunk in mock.media_chunks(0, 300_000):
+                f.write(chunk)
+
+        async def fn(whatsapp, loop_thread):
+            return await whatsapp.media.download_media_to(await whatsapp.media.query_media_url("123"), path)
+
+        assert download(mock, fn) == mock.media_sha256
+    assert os.path.getsize(path) == 1024 * 1024 and not os.path.exists(f"{path}.part")
+
+
+def test_download_media_saves_the_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with MockGraphAPI(media_size=300_000) as mock:
+        async def fn(whatsapp, loop_thread):
+            await whatsapp.media.download_media(f"{mock.url}/download/123")
+
+        download(mock, fn)
+        with open(tmp_path / "123.jpg", "rb") as f:
+            assert hashlib.sha256(f.read()).hexdigest() == mock.media_sha256
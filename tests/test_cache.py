@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+import pytest
+from whatsapp.cache import CoalescingCache, MemoryCache, SQLiteCache, UploadCache
+
+
+def test_memory_cache_expires_and_evicts():
+    cache = MemoryCache(maxsize=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=60)
+    # "b" is the least recently used
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    cache.set("d", 4, ttl=-1)
+    assert cache.get("d") is None
+
+
+def test_upload_cache(tmp_path):
+    backend = SQLiteCache(str(tmp_path / "cache.db"))
+    cache = UploadCache(backend)
+    cache.set("106540352242922", "image/png", "abc", "media-1")
+    assert cache.get("106540352242922", "image/png", "abc") == "media-1"
+    assert cache.get("106540352242922", "image/jpeg", "abc") is None
+    cache.invalidate("media-1")
+    assert cache.get("106540352242922", "image/png", "abc") is None
+    backend.close()
+
+
+def test_concurrent_calls_are_coalesced():
+    cache = CoalescingCache(ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait()
+        return "response"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("key", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["response"] * 8 and len(calls) == 1
+    assert cache.get_or_fetch("key", fetch) == "response" and len(calls) == 1
+
+
+def test_failures_are_shared_not_cached():
+    cache = CoalescingCache(ttl=60)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_fetch("key", fail)
+    assert cache.get_or_fetch("key", lambda: "response") == "response"
+
+
+def test_async_calls_are_coalesced():
+    async def main():
+        cache = CoalescingCache(ttl=60)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "response"
+
+        results = await asyncio.gather(*(cache.get_or_fetch_async("key", fetch) for _ in range(8)))
+        assert results == ["response"] * 8 and len(calls) == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_leader_hands_over_to_a_waiter():
+    async def main():
+        cache = CoalescingCache(ttl=60)
+        calls = []
+        started = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.05)
+            return "response"
+
+        leader = asyncio.create_task(cache.get_or_fetch_async("key", fetch))
+        await started.wait()
+        waiters = [asyncio.create_task(cache.get_or_fetch_async("key", fetch)) for _ in range(4)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await asyncio.gather(*waiters) == ["response"] * 4
+        # one waiter fetched again, the others waited for it
+        assert len(calls) == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_the_call():
+    async def main():
+        cache = CoalescingCache(ttl=60)
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "response"
+
+        leader = asyncio.create_task(cache.get_or_fetch_async("key", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_fetch_async("key", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert await leader == "response"
+
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+import pytest
+import requests
+
+httpx = pytest.importorskip("httpx")
+
+from whatsapp.http2_transport import _RequestsErrors  # noqa: E402
+from whatsapp.retry import RetryPolicy  # noqa: E402
+
+
+def mapped(error: Exception) -> Exception:
+    with pytest.raises(requests.RequestException) as info:
+        with _RequestsErrors():
+            raise error
+    return info.value
+
+
+@pytest.mark.parametrize("error", [
+    httpx.ConnectError("refused"), httpx.ConnectTimeout("connect timed out"), httpx.PoolTimeout("pool timed out"),
+])
+def test_errors_before_the_request_was_sent_are_retried(error):
+    assert RetryPolicy().retryable(mapped(error))
+
+
+@pytest.mark.parametrize("error", [
+    httpx.ReadError("reset"), httpx.WriteError("broken pipe"), httpx.RemoteProtocolError("stream reset"),
+    httpx.ReadTimeout("read timed out"),
+])
+def test_errors_after_the_request_went_out_are_not_replayed(error):
+    error = mapped(error)
+    assert isinstance(error, (requests.exceptions.ChunkedEncodingError, requests.exceptions.ReadTimeout))
+    assert not RetryPolicy().retryable(error)
+    assert RetryPolicy().retryable(error, replayable=True)
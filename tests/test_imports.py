@@ -0,0 +1,37 @@
+import json
+import subprocess
+import sys
+from benchmarks.import_time import LAZY_MODULES
+from whatsapp import WhatsApp
+from whatsapp.mock_server import MockGraphAPI
+from whatsapp.ratelimit import RateLimiter
+from whatsapp.transport import Transport
+
+
+def test_client_import_leaves_optional_modules_unloaded():
+    probe = "import json, sys\nfrom whatsapp import WhatsApp\nprint(json.dumps(sorted(sys.modules)))"
+    loaded = set(json.loads(subprocess.run(
+        [sys.executable, "-c", probe], capture_output=True, text=True, check=True,
+    ).stdout))
+    assert not loaded & set(LAZY_MODULES)
+
+
+def test_optional_features_import_what_they_need():
+    from whatsapp.receipts import ReadReceipts
+    from whatsapp.templates import Template
+    from whatsapp.validation import Preflight
+    from whatsapp.webhook import Webhook
+
+    with MockGraphAPI() as mock:
+        with Transport(mock.url) as transport:
+            with WhatsApp(
+                "token", "106540352242922", "verify", version="v21.0", transport=transport,
+                rate_limiter=RateLimiter(rate=1e9, pair_rate=1e9), preflight=True, read_receipt_window=0.01,
+            ) as whatsapp:
+                assert isinstance(whatsapp.message.preflight, Preflight)
+                assert isinstance(whatsapp.message.receipts, ReadReceipts)
+                webhook = whatsapp.webhook()
+                assert isinstance(webhook, Webhook)
+                webhook.close()
+                template = Template("order_shipped", body="Order {{1}}")
+                assert whatsapp.message.send_template("16505551234", template, ["#42"]).messages
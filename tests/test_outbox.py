@@ -0,0 +1,190 @@
+import sqlite3
+import threading
+import time
+from collections import Counter
+import pytest
+import requests
+import urllib3
+from whatsapp.errors import UnknownAPIException
+from whatsapp.outbox import Outbox, _transient
+
+
+def text(to: str) -> dict:
+    return {"messaging_product": "whatsapp", "to": to, "type": "text", "text": {"body": "hi"}}
+
+
+def response(message: dict) -> dict:
+    to = message["to"]
+    return {"contacts": [{"input": to, "wa_id": to}], "messages": [{"id": f"wamid.{to}"}]}
+
+
+class Stop(BaseException):
+    pass
+
+
+def test_enqueue_is_idempotent_by_key(tmp_path):
+    with Outbox(tmp_path / "outbox.db") as outbox:
+        messages = [text(f"1650555000{i}") for i in range(3)]
+        keys = [m["to"] for m in messages]
+        assert outbox.enqueue(messages, keys) == 3
+        assert outbox.enqueue(messages, keys) == 0
+        assert outbox.counts()["pending"] == 3
+
+
+def test_claim_leases_each_message_once(tmp_path):
+    with Outbox(tmp_path / "outbox.db", lease=60) as outbox:
+        outbox.enqueue(text(f"1650555000{i}") for i in range(5))
+        first = outbox.claim(3, "a")
+        second = outbox.claim(3, "b")
+        assert [item.attempts for item in first] == [1, 1, 1]
+        assert len(second) == 2
+        assert not {item.id for item in first} & {item.id for item in second}
+        assert outbox.claim(3, "c") == []
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    with Outbox(tmp_path / "outbox.db", lease=0.05) as outbox:
+        outbox.enqueue([text("16505550000")])
+        [item] = outbox.claim(1, "dead")
+        time.sleep(0.1)
+        [again] = outbox.claim(1, "b")
+        assert again.id == item.id and again.attempts == 2
+        # the dead worker's lease is not renewed once another worker holds the message
+        assert outbox.renew([item.id], "dead") == 0
+        assert outbox.renew([item.id], "b") == 1
+
+
+def test_drain_renews_leases_of_messages_in_flight(tmp_path):
+    # batches are claimed up front and sent over several lease periods: no other worker may take
+    # the messages still waiting in the batch
+    calls = Counter()
+    started = threading.Event()
+
+    def send(message: dict) -> dict:
+        calls[message["to"]] += 1
+        started.set()
+        time.sleep(0.1)
+        return response(message)
+
+    path = tmp_path / "outbox.db"
+    with Outbox(path, lease=0.15) as outbox:
+        outbox.enqueue(text(f"1650555000{i}") for i in range(6))
+        stolen = []
+        done = threading.Event()
+
+        def other_worker():
+            started.wait()
+            with Outbox(path, lease=0.15) as other:
+                while not done.is_set():
+                    stolen.extend(other.claim(10, "other"))
+                    time.sleep(0.02)
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            stats = outbox.drain(send, concurrency=1, batch_size=10)
+        finally:
+            started.set()
+            done.set()
+            thread.join()
+        assert stolen == []
+        assert stats.succeeded == 6
+        assert set(calls.values()) == {1}
+        assert outbox.counts()["sent"] == 6
+
+
+def test_transient_failures_back_off(tmp_path):
+    times = []
+
+    def send(message: dict) -> dict:
+        times.append(time.monotonic())
+        if len(times) < 3:
+            raise UnknownAPIException({"error": "try again", "code": 1})
+        return response(message)
+
+    with Outbox(tmp_path / "outbox.db", retry_base_delay=0.1) as outbox:
+        outbox.enqueue([text("16505550000")])
+        stats = outbox.drain(send, max_attempts=5, poll_interval=0.01)
+        assert stats.succeeded == 1 and outbox.counts()["sent"] == 1
+        assert len(times) == 3
+        # jittered between half and all of 0.1 then 0.2 seconds
+        assert times[1] - times[0] >= 0.05
+        assert times[2] - times[1] >= 0.1
+
+
+def test_retried_message_is_not_claimable_before_its_backoff(tmp_path):
+    with Outbox(tmp_path / "outbox.db", retry_base_delay=60) as outbox:
+        outbox.enqueue([text("16505550000")])
+        [item] = outbox.claim(1)
+        outbox.mark_failed([(item.id, "try again")], retry=True)
+        assert outbox.claim(1) == []
+        assert outbox.counts()["pending"] == 1
+        assert outbox.next_due() >= time.time() + 29
+
+
+def test_opens_outbox_without_backoff_column(tmp_path):
+    path = tmp_path / "outbox.db"
+    db = sqlite3.connect(path)
+    db.execute(
+        """CREATE TABLE outbox (id INTEGER PRIMARY KEY, key TEXT UNIQUE, payload TEXT NOT NULL,
+        state INTEGER NOT NULL DEFAULT 0, lease_until REAL, worker TEXT, attempts INTEGER NOT NULL DEFAULT 0,
+        message_id TEXT, error TEXT, created REAL NOT NULL, updated REAL)"""
+    )
+    db.execute("INSERT INTO outbox (payload, created) VALUES (?, ?)", ('{"to": "16505550000"}', time.time()))
+    db.commit()
+    db.close()
+    with Outbox(path) as outbox:
+        [item] = outbox.claim(1)
+        assert item.message == {"to": "16505550000"}
+
+
+def test_waiting_drain_writes_back_its_last_results(tmp_path):
+    # with wait=True the outbox runs empty after the last sends: their results must be recorded
+    # then, not when more messages come
+    def send(message: dict) -> dict:
+        if message["to"] == "stop":
+            raise Stop()
+        return response(message)
+
+    path = tmp_path / "outbox.db"
+    with Outbox(path) as outbox:
+        outbox.enqueue(text(f"1650555000{i}") for i in range(3))
+        stopped = []
+
+        def worker():
+            with Outbox(path) as draining:
+                try:
+                    draining.drain(send, batch_size=100, wait=True, poll_interval=0.05)
+                except Stop:
+                    stopped.append(True)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while outbox.counts()["sent"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert outbox.counts() == {"pending": 0, "claimed": 0, "sent": 3, "failed": 0}
+        # still waiting, and still picking up new messages
+        outbox.enqueue([text("16505550009")])
+        while outbox.counts()["sent"] < 4 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert outbox.counts()["sent"] == 4
+        outbox.enqueue([text("stop")])
+        thread.join(5)
+        assert stopped
+
+
+def connection_refused() -> requests.ConnectionError:
+    reason = urllib3.exceptions.NewConnectionError(None, "Failed to establish a new connection: refused")
+    return requests.ConnectionError(urllib3.exceptions.MaxRetryError(None, "/messages", reason))
+
+
+@pytest.mark.parametrize("error, retried", [
+    (connection_refused(), True),
+    (requests.exceptions.ConnectTimeout("connect timed out"), True),
+    (UnknownAPIException({"error": "try again", "code": 1}), True),
+    # may come after the message was delivered
+    (requests.exceptions.ReadTimeout("read timed out"), False),
+])
+def test_connection_errors_before_the_send_are_retried(error, retried):
+    assert _transient(error) is retried
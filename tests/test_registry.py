@@ -0,0 +1,41 @@
+import threading
+from whatsapp.registry import WhatsAppRegistry
+from whatsapp.version import resolver
+
+
+def test_lookups_do_not_wait_for_version_resolution(monkeypatch):
+    registry = WhatsAppRegistry(token="token", version="v21.0")
+    registry.add("106540352242922")
+    registry.add("106540352242923")
+    registry.get("106540352242922")
+    resolving = threading.Event()
+    release = threading.Event()
+
+    def slow_resolve(version: str = "latest") -> str:
+        # a changelog fetch
+        resolving.set()
+        release.wait(5)
+        return "v22.0"
+
+    monkeypatch.setattr(resolver, "resolve", slow_resolve)
+    registry.version = "latest"
+    thread = threading.Thread(target=registry.get, args=("106540352242923",))
+    thread.start()
+    assert resolving.wait(5)
+    # an active tenant is returned while the other thread resolves
+    assert registry.get("106540352242922").config.version == "v21.0"
+    assert not release.is_set()
+    release.set()
+    thread.join()
+    assert registry.get("106540352242923").config.version == "v22.0"
+    registry.close()
+
+
+def test_api_version_follows_the_resolver(monkeypatch):
+    registry = WhatsAppRegistry(token="token")
+    versions = iter(["v21.0", "v22.0"])
+    monkeypatch.setattr(resolver, "resolve", lambda version="latest": next(versions))
+    assert registry.api_version == "v21.0"
+    # refreshed once the resolver's ttl expired, not pinned to the first answer
+    assert registry.api_version == "v22.0"
+    registry.close()
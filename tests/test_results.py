@@ -0,0 +1,80 @@
+import io
+import json
+import pytest
+from whatsapp import WhatsApp
+from whatsapp.errors import AuthException
+from whatsapp.mock_server import MockGraphAPI
+from whatsapp.ratelimit import RateLimiter
+from whatsapp.results import NO_CODE, ResultSet, SendResult
+from whatsapp.transport import Transport
+
+
+def client(mock: MockGraphAPI) -> WhatsApp:
+    return WhatsApp(
+        "token", "106540352242922", "verify", version="v21.0", transport=Transport(mock.url),
+        rate_limiter=RateLimiter(rate=1e9, pair_rate=1e9),
+    )
+
+
+def text(to: str) -> dict:
+    return {"messaging_product": "whatsapp", "to": to, "type": "text", "text": {"body": "hi"}}
+
+
+def response(to: str, message_id: str) -> dict:
+    return {"contacts": [{"input": to, "wa_id": to}], "messages": [{"id": message_id}]}
+
+
+def test_round_trip():
+    results = ResultSet([
+        SendResult(0, "16505550000", response("16505550000", "wamid.0")),
+        SendResult(1, "16505550001", error=Exception({"error": "invalid", "code": 100})),
+        SendResult(2, "+1 650 555 0002", response("16505550002", "wamid.2")),
+        SendResult(3, "16505550003", error=ConnectionError("refused")),
+    ])
+    assert (len(results), results.succeeded, results.failed) == (4, 2, 2)
+    assert results.row(0) == (0, "16505550000", "16505550000", "wamid.0", None)
+    assert results.row(2)[1] == "+1 650 555 0002"
+    assert list(results.errors()) == [(1, "16505550001", 100), (3, "16505550003", NO_CODE)]
+    assert results[0].ok and results[0].message_id == "wamid.0"
+    assert not results[-1].ok and results[-1].error_code == NO_CODE
+    assert results.to_response(0).messages[0].id == "wamid.0"
+    assert results.to_response(1) is None
+
+    csv_file = io.StringIO()
+    results.to_csv(csv_file)
+    lines = csv_file.getvalue().splitlines()
+    assert lines[0] == "index,input,wa_id,message_id,error_code"
+    assert lines[1] == "0,16505550000,16505550000,wamid.0,"
+    assert lines[2] == "1,16505550001,,,100"
+    jsonl = io.StringIO()
+    results.to_jsonl(jsonl)
+    rows = [json.loads(line) for line in jsonl.getvalue().splitlines()]
+    assert rows[0]["error_code"] is None and rows[1]["error_code"] == 100
+
+
+def test_auth_failure_is_not_a_success():
+    # AuthException's Graph code is 0
+    results = ResultSet([SendResult(0, "16505550000", error=AuthException({"error": "bad token", "code": 0}))])
+    assert results.failed == 1 and not results.ok(0)
+    assert list(results.errors()) == [(0, "16505550000", 0)]
+    assert results.to_response(0) is None
+    assert not results[0].ok and results[0].error_code == 0
+
+
+def test_bulk_send_collects_auth_failures():
+    with MockGraphAPI(error_rate=1.0, error_codes=(0,)) as mock:
+        with client(mock) as whatsapp:
+            with pytest.raises(AuthException):
+                whatsapp.message.send_message(text("16505550000"))
+            results = whatsapp.message.send_bulk([text("16505550001"), text("16505550002")]).collect()
+    assert (results.succeeded, results.failed) == (0, 2)
+    assert sorted(code for _, _, code in results.errors()) == [0, 0]
+
+
+def test_bulk_send_collects_successes():
+    with MockGraphAPI() as mock:
+        with client(mock) as whatsapp:
+            results = whatsapp.message.send_bulk([text(f"1650555{i:04d}") for i in range(20)], concurrency=4).collect()
+    assert (results.succeeded, results.failed) == (20, 0)
+    assert sorted(results[i].index for i in range(20)) == list(range(20))
+    assert all(results.to_response(i).messages[0].id.startswith("wamid.") for i in range(20))
@@ -0,0 +1,120 @@
+import http.client
+import pytest
+import requests
+import urllib3
+from whatsapp.errors import CircuitOpenException, InvalidParameterException, UnknownAPIException
+from whatsapp.retry import CircuitBreaker, Retrier, RetryPolicy
+
+
+def retrier(**kwargs) -> Retrier:
+    return Retrier(RetryPolicy(max_attempts=3, base_delay=0, max_delay=0), **kwargs)
+
+
+def failing(*errors):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return fn, calls
+
+
+def connection_refused() -> requests.ConnectionError:
+    reason = urllib3.exceptions.NewConnectionError(None, "Failed to establish a new connection: refused")
+    return requests.ConnectionError(urllib3.exceptions.MaxRetryError(None, "/messages", reason))
+
+
+def connection_aborted() -> requests.ConnectionError:
+    return requests.ConnectionError(("Connection aborted.", http.client.RemoteDisconnected("closed")))
+
+
+def test_retries_transient_graph_errors():
+    fn, calls = failing(UnknownAPIException({"error": "unknown", "code": 1}))
+    assert retrier().call("messages", fn) == "ok"
+    assert len(calls) == 2
+
+
+def test_does_not_retry_definitive_errors():
+    fn, calls = failing(InvalidParameterException({"error": "bad", "code": 100}))
+    with pytest.raises(InvalidParameterException):
+        retrier().call("messages", fn)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("error", [connection_refused(), requests.exceptions.ConnectTimeout("connect timed out")])
+def test_retries_errors_before_the_request_was_sent(error):
+    fn, calls = failing(error)
+    assert retrier().call("messages", fn) == "ok"
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("error", [
+    connection_aborted(),
+    requests.exceptions.ReadTimeout("read timed out"),
+    requests.exceptions.ChunkedEncodingError("connection broken"),
+])
+def test_does_not_replay_sends_after_the_request_went_out(error):
+    fn, calls = failing(error)
+    with pytest.raises(type(error)):
+        retrier().call("messages", fn)
+    assert len(calls) == 1
+
+
+def test_replays_idempotent_calls():
+    fn, calls = failing(connection_aborted())
+    assert retrier().call("media", fn, idempotent=True) == "ok"
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("error", [
+    connection_aborted(),
+    requests.exceptions.ReadTimeout("read timed out"),
+    requests.exceptions.ChunkedEncodingError("connection broken"),
+])
+def test_idempotency_key_does_not_replay_sends(error):
+    # the key never reaches the API: a replay after the request went out could deliver twice
+    fn, calls = failing(error)
+    with pytest.raises(type(error)):
+        retrier().call("messages", fn, idempotency_key="order-1")
+    assert len(calls) == 1
+    # before the request was sent is still safe
+    fn, calls = failing(connection_refused())
+    assert retrier().call("messages", fn, idempotency_key="order-2") == "ok"
+    assert len(calls) == 2
+
+
+def test_idempotency_key_returns_first_response():
+    r = retrier()
+    responses = iter(["first", "second"])
+    assert r.call("messages", lambda: next(responses), idempotency_key="k") == "first"
+    assert r.call("messages", lambda: next(responses), idempotency_key="k") == "first"
+
+
+def test_breaker_opens_and_probes(monkeypatch):
+    import whatsapp.retry
+
+    clock = [1000.0]
+    monkeypatch.setattr(whatsapp.retry.time, "monotonic", lambda: clock[0])
+    r = Retrier(RetryPolicy(max_attempts=1), failure_threshold=2, reset_timeout=30)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            r.call("messages", failing(requests.exceptions.ReadTimeout("t"))[0])
+    assert r.breaker("messages").state == "open"
+    with pytest.raises(CircuitOpenException):
+        r.call("messages", lambda: "ok")
+    clock[0] += 31
+    assert r.breaker("messages").state == "half-open"
+    assert r.call("messages", lambda: "ok") == "ok"
+    assert r.breaker("messages").state == "closed"
+
+
+def test_definitive_error_closes_breaker():
+    breaker = CircuitBreaker("messages", failure_threshold=1)
+    r = retrier()
+    r.breakers["messages"] = breaker
+    with pytest.raises(InvalidParameterException):
+        r.call("messages", failing(InvalidParameterException({"error": "bad", "code": 100}))[0])
+    assert breaker.state == "closed"
@@ -0,0 +1,101 @@
+import time
+import pytest
+from whatsapp.results import SendResult
+from whatsapp.statuses import MemoryStatusStore, SQLiteStatusStore
+
+
+def statuses(*updates: tuple) -> dict:
+    # (message id, recipient, status, timestamp[, error code]) as a status webhook payload
+    items = []
+    for message_id, recipient, status, timestamp, *code in updates:
+        item = {"id": message_id, "recipient_id": recipient, "status": status, "timestamp": str(timestamp)}
+        if code:
+            item["errors"] = [{"code": code[0], "title": "failed"}]
+        items.append(item)
+    return {"entry": [{"changes": [{"value": {
+        "metadata": {"phone_number_id": "106540352242922"}, "statuses": items,
+    }}]}]}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = MemoryStatusStore() if request.param == "memory" else SQLiteStatusStore(tmp_path / "statuses.db")
+    yield store
+    store.close()
+
+
+def test_statuses_only_move_forward(store):
+    now = int(time.time())
+    store.track("wamid.1", "+1 650-555-1234", campaign="sale")
+    # webhooks are not delivered in order
+    store.feed(statuses(("wamid.1", "16505551234", "read", now), ("wamid.1", "16505551234", "delivered", now)))
+    status = store.get("wamid.1")
+    assert status.status == "read" and status.recipient == "16505551234" and status.campaign == "sale"
+    assert store.counts("sale") == {"accepted": 0, "sent": 0, "delivered": 0, "read": 1, "failed": 0}
+    assert store.get("wamid.unknown") is None
+
+
+def test_failed_status_keeps_its_error_code(store):
+    store.track("wamid.1", "16505551234")
+    store.feed(statuses(("wamid.1", "16505551234", "failed", int(time.time()), 131026)))
+    status = store.get("wamid.1")
+    assert status.status == "failed" and status.error_code == 131026
+    assert store.delivery_rate() == 0.0
+
+
+def test_tracks_bulk_results_and_early_statuses(store):
+    now = int(time.time())
+    # the status came in before the send returned
+    store.feed(statuses(("wamid.2", "16505550002", "delivered", now)))
+    response = {"contacts": [{"input": "16505550002", "wa_id": "16505550002"}], "messages": [{"id": "wamid.2"}]}
+    store.track_many([
+        SendResult(0, "16505550001", {"contacts": [{"wa_id": "16505550001"}], "messages": [{"id": "wamid.1"}]}),
+        SendResult(1, "16505550002", response),
+        SendResult(2, "16505550003", error=Exception({"error": "invalid", "code": 100})),
+    ], campaign="sale")
+    assert store.counts("sale") == {"accepted": 1, "sent": 0, "delivered": 1, "read": 0, "failed": 0}
+    assert store.delivery_rate("sale") == 0.5
+    assert len(store) == 2
+
+
+def test_for_recipient_newest_first(store):
+    store.track("wamid.1", "16505551234", sent_at=1_700_000_000)
+    store.track("wamid.2", "16505551234", sent_at=1_700_000_100)
+    store.track("wamid.3", "16505550000", sent_at=1_700_000_200)
+    assert [s.message_id for s in store.for_recipient("+1 (650) 555-1234")] == ["wamid.2", "wamid.1"]
+
+
+def test_undelivered_with_rows_out_of_order(store):
+    now = int(time.time())
+    store.track("wamid.new", "16505550001", sent_at=now)
+    store.track("wamid.old", "16505550002", sent_at=now - 3600)
+    # a status of an untracked message, sent before the others
+    store.feed(statuses(("wamid.older", "16505550003", "sent", now - 7200)))
+    store.track("wamid.delivered", "16505550004", sent_at=now - 5000)
+    store.feed(statuses(("wamid.delivered", "16505550004", "delivered", now)))
+    assert [s.message_id for s in store.undelivered(older_than=60)] == ["wamid.older", "wamid.old"]
+    assert [s.message_id for s in store.undelivered()] == ["wamid.older", "wamid.old", "wamid.new"]
+    store.feed(statuses(("wamid.old", "16505550002", "delivered", now)))
+    assert [s.message_id for s in store.undelivered()] == ["wamid.older", "wamid.new"]
+
+
+def test_sqlite_store_flushes_without_further_writes(tmp_path):
+    path = tmp_path / "statuses.db"
+    store = SQLiteStatusStore(path, flush_interval=0.05)
+    store.track_many([(f"wamid.{i}", f"1650555000{i}") for i in range(10)], campaign="sale")
+    reader = SQLiteStatusStore(path, flush_interval=0)
+    deadline = time.monotonic() + 5
+    while reader.counts("sale")["accepted"] < 10 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert reader.counts("sale")["accepted"] == 10
+    reader.close()
+    store.close()
+    assert store._flusher is None
+
+
+def test_sqlite_store_close_writes_the_rest(tmp_path):
+    path = tmp_path / "statuses.db"
+    with SQLiteStatusStore(path, flush_interval=3600) as store:
+        store.track("wamid.1", "16505551234", campaign="sale")
+    with SQLiteStatusStore(path) as store:
+        assert store.get("wamid.1").campaign == "sale"
@@ -0,0 +1,133 @@
+import io
+import json
+import pytest
+from whatsapp import WhatsApp, payloads
+from whatsapp.errors import CharacterFormatException, ParameterNumberMismatchException
+from whatsapp.mock_server import MockGraphAPI
+from whatsapp.payloads import EncodedMessage, JSONCodec
+from whatsapp.ratelimit import RateLimiter
+from whatsapp.templates import Template
+from whatsapp.transport import Transport
+
+ORDER = Template(
+    "order_update",
+    body="Hi {{1}}, your order {{2}} ships on {{3}}.",
+    header="Order {{1}}",
+    buttons=["https://example.com/track/{{1}}"],
+)
+
+
+def text(*values: str) -> list[dict]:
+    return [{"type": "text", "text": value} for value in values]
+
+
+def test_render_matches_the_codec_byte_for_byte():
+    # quotes, backslashes, non ASCII and braces are escaped as the encoder would
+    values = ["#4{2}", 'Zoë "Z" \\', "#4{2}", "Friday 🎉", "a1/b2"]
+    message = ORDER.render("16505551234", values)
+    expected = payloads.template("16505551234", "order_update", components=[
+        {"type": "header", "parameters": text(values[0])},
+        {"type": "body", "parameters": text(*values[1:4])},
+        {"type": "button", "sub_type": "url", "index": "0", "parameters": text(values[4])},
+    ])
+    assert message.body == JSONCodec().dumps(expected)
+    assert (message.to, message.type) == ("16505551234", "template")
+    assert ORDER.fields == ("header.1", "1", "2", "3", "button.0.1")
+
+
+def test_named_placeholders_and_media_header():
+    template = Template("welcome", body="Hi {{first_name}}", header_format="image", recipient_type=None)
+    assert template.fields == ("header", "first_name")
+    link = json.loads(template.render("16505551234", ["https://example.com/a.jpg", "Ann"]).body)
+    assert "recipient_type" not in link
+    assert link["template"]["components"] == [
+        {"type": "header", "parameters": [{"type": "image", "image": {"link": "https://example.com/a.jpg"}}]},
+        {"type": "body", "parameters": [{"type": "text", "parameter_name": "first_name", "text": "Ann"}]},
+    ]
+    media_id = json.loads(template.render("16505551234", {"header": "1234", "first_name": "Ann"}).body)
+    assert media_id["template"]["components"][0]["parameters"][0]["image"] == {"id": "1234"}
+
+
+def test_from_definition():
+    template = Template.from_definition({
+        "name": "order_update",
+        "language": "en_US",
+        "components": [
+            {"type": "HEADER", "format": "TEXT", "text": "Order {{1}}"},
+            {"type": "BODY", "text": "Hi {{1}}, your order {{2}} ships on {{3}}."},
+            {"type": "BUTTONS", "buttons": [
+                {"type": "URL", "url": "https://example.com/track/{{1}}"}, {"type": "QUICK_REPLY", "text": "Stop"},
+            ]},
+        ],
+    })
+    values = ["#42", "Ann", "#42", "Friday", "a1b2"]
+    assert template.render("16505551234", values).body == ORDER.render("16505551234", values).body
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"name": "Order Update"},
+    {"name": "order_update", "header_format": "audio"},
+    {"name": "order_update", "body": "{{1}} and {{3}}"},
+    {"name": "order_update", "body": "{{1}} and {{name}}"},
+    {"name": "order_update", "header": "{{1}} {{2}}"},
+])
+def test_invalid_definitions(kwargs):
+    with pytest.raises(ValueError):
+        Template(**kwargs)
+
+
+def test_invalid_values():
+    with pytest.raises(ParameterNumberMismatchException):
+        ORDER.render("16505551234", ["#42"])
+    with pytest.raises(ParameterNumberMismatchException):
+        ORDER.render("16505551234", {"header.1": "#42", "1": "Ann"})
+    with pytest.raises(ParameterNumberMismatchException):
+        ORDER.render("16505551234", ["#42", "Ann", None, "Friday", "a1b2"])
+    with pytest.raises(CharacterFormatException):
+        ORDER.render("16505551234", ["#42", "Ann\n", "#42", "Friday", "a1b2"])
+
+
+def test_render_many_inputs(tmp_path):
+    rows = [
+        {"to": "16505550001", "header.1": "#1", "1": "Ann", "2": "#1", "3": "Friday", "button.0.1": "a1"},
+        {"to": "16505550002", "header.1": "#2", "1": "Bob", "2": "#2", "3": "Monday", "button.0.1": "b2"},
+    ]
+    expected = [ORDER.render(row["to"], row).body for row in rows]
+    # extra columns are ignored, in any order
+    csv_text = "note,button.0.1,3,2,1,header.1,to\n" + "".join(
+        f"x,{row['button.0.1']},{row['3']},{row['2']},{row['1']},{row['header.1']},{row['to']}\n" for row in rows
+    ) + "\n"
+    path = tmp_path / "rows.csv"
+    path.write_text(csv_text, encoding="utf-8")
+    columns = {key: [row[key] for row in rows] for key in rows[0]}
+    for source in (rows, columns, io.StringIO(csv_text), path, str(path)):
+        messages = list(ORDER.render_many(source))
+        assert [m.body for m in messages] == expected
+        assert [m.to for m in messages] == ["16505550001", "16505550002"]
+    assert list(ORDER.render_many(io.StringIO(""))) == []
+    with pytest.raises(ParameterNumberMismatchException):
+        list(ORDER.render_many(io.StringIO("to,1\n16505550001,Ann\n")))
+
+
+def test_encoded_message_answers_send_path_lookups():
+    message = EncodedMessage("16505551234", "template", b"{}")
+    assert message.get("to") == "16505551234"
+    assert message.get("type") == "template"
+    assert message.get("recipient_type", "individual") == "individual"
+    assert "16505551234" in repr(message) and "2 bytes" in repr(message)
+
+
+def test_send_rendered_templates():
+    with MockGraphAPI() as mock:
+        with Transport(mock.url) as transport:
+            with WhatsApp(
+                "token", "106540352242922", "verify", version="v21.0", transport=transport,
+                rate_limiter=RateLimiter(rate=1e9, pair_rate=1e9),
+            ) as whatsapp:
+                response = whatsapp.message.send_template("16505551234", ORDER, ["#42", "Ann", "#42", "Friday", "a1"])
+                assert response.messages[0].id
+                rows = {"to": ["16505550001", "16505550002"], "header.1": ["#1", "#2"], "1": ["Ann", "Bob"],
+                        "2": ["#1", "#2"], "3": ["Friday", "Monday"], "button.0.1": ["a1", "b2"]}
+                results = whatsapp.message.send_bulk(ORDER.render_many(rows)).collect()
+                assert results.succeeded == 2
+                assert [result.to for result in results] == ["16505550001", "16505550002"]
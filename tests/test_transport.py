@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from whatsapp import AsyncWhatsApp, WhatsApp
+from whatsapp.registry import WhatsAppRegistry
+from whatsapp.transport import Transport
+
+
+class Session(requests.Session):
+    closed = False
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+def test_caller_session_keeps_its_adapters():
+    session = Session()
+    adapter = HTTPAdapter(max_retries=3)
+    session.mount("https://", adapter)
+    transport = Transport(session=session, pool_maxsize=50)
+    assert session.get_adapter("https://graph.facebook.com") is adapter
+    transport.close()
+    assert not session.closed
+
+
+def test_own_session_is_configured_and_closed():
+    transport = Transport(pool_maxsize=50)
+    assert transport.session.get_adapter("https://graph.facebook.com")._pool_maxsize == 50
+    session = transport.session = Session()
+    transport.close()
+    assert session.closed
+
+
+def test_client_leaves_injected_transport_open():
+    session = Session()
+    transport = Transport(session=session)
+    whatsapp = WhatsApp("token", "106540352242922", "verify", version="v21.0", transport=transport)
+    with WhatsApp("token", "106540352242922", "verify", version="v21.0", transport=transport):
+        pass
+    whatsapp.close()
+    assert not session.closed
+    with WhatsAppRegistry(token="token", version="v21.0", transport=transport):
+        pass
+    assert not session.closed
+
+
+def test_client_closes_its_own_transport():
+    whatsapp = WhatsApp("token", "106540352242922", "verify", version="v21.0")
+    session = whatsapp.transport.session = Session()
+    whatsapp.close()
+    assert session.closed
+
+
+def test_async_client_leaves_injected_transport_open():
+    httpx = pytest.importorskip("httpx")
+    from whatsapp.async_transport import AsyncTransport
+
+    async def main():
+        client = httpx.AsyncClient()
+        transport = AsyncTransport(client=client)
+        async with AsyncWhatsApp("token", "106540352242922", "verify", version="v21.0", transport=transport):
+            pass
+        assert not client.is_closed
+        await transport.aclose()
+        # the httpx client was passed to the transport too
+        assert not client.is_closed
+        await client.aclose()
+        async with AsyncWhatsApp("token", "106540352242922", "verify", version="v21.0") as whatsapp:
+            own = whatsapp.transport.client
+        assert own.is_closed
+
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+from whatsapp.models import WhatsappConfig
+from whatsapp.version import VersionResolver, resolver
+
+
+def test_resolver_caches_latest_for_its_ttl(monkeypatch):
+    versions = iter(["v21.0", "v22.0"])
+    local = VersionResolver(ttl=60, cache_path=None)
+    now = [1_000.0]
+    monkeypatch.setattr("whatsapp.version.time.time", lambda: now[0])
+    monkeypatch.setattr(local, "_fetch", lambda: (next(versions), now[0]))
+    assert local.resolve() == "v21.0"
+    assert local.resolve() == "v21.0"
+    assert local.resolve("v19.0") == "v19.0"
+    now[0] += 61
+    assert local.resolve() == "v22.0"
+    assert next(versions, None) is None
+
+
+def test_api_url_follows_the_resolved_version(monkeypatch):
+    config = WhatsappConfig(token="token", phone_number_id="106540352242922", verify_token="verify", headers={})
+    versions = iter(["v21.0", "v22.0"])
+    monkeypatch.setattr(resolver, "resolve", lambda version="latest": next(versions))
+    assert config.api_url == "https://graph.facebook.com/v21.0/106540352242922"
+    # not frozen with the first answer, which may have been the fallback
+    assert config.api_url == "https://graph.facebook.com/v22.0/106540352242922"
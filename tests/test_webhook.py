@@ -0,0 +1,67 @@
+import hashlib
+import hmac
+import json
+import threading
+from whatsapp.events import TextMessage, parse
+from whatsapp.webhook import Webhook
+
+
+def payload(text: str = "hi") -> dict:
+    return {"entry": [{"changes": [{"value": {
+        "metadata": {"phone_number_id": "106540352242922"},
+        "messages": [{"from": "16505551234", "id": "wamid.1", "timestamp": "1700000000", "type": "text",
+                      "text": {"body": text}}],
+    }}]}]}
+
+
+def test_handshake():
+    webhook = Webhook("secret-token")
+    assert webhook.handle("GET", "hub.mode=subscribe&hub.verify_token=secret-token&hub.challenge=42", None, b"") == (200, b"42")
+    assert webhook.handle("GET", "hub.mode=subscribe&hub.verify_token=wrong&hub.challenge=42", None, b"")[0] == 403
+
+
+def test_signature():
+    webhook = Webhook("token", app_secret="app-secret")
+    body = json.dumps(payload()).encode()
+    signature = "sha256=" + hmac.new(b"app-secret", body, hashlib.sha256).hexdigest()
+    assert webhook.check_signature(body, signature)
+    assert not webhook.check_signature(body, "sha256=" + "0" * 64)
+    assert webhook.handle("POST", "", None, body)[0] == 403
+    webhook.close()
+
+
+def test_parse_skips_malformed_parts():
+    assert list(parse([1, 2])) == []
+    assert list(parse({"entry": [1]})) == []
+    assert list(parse({"entry": [{"changes": [None]}]})) == []
+    assert list(parse({"entry": [{"changes": [{"value": {"messages": [None, 3]}}]}]})) == []
+    events = list(parse({"entry": [None, *payload()["entry"]]}))
+    assert len(events) == 1 and isinstance(events[0], TextMessage) and events[0].body == "hi"
+
+
+def test_bad_payloads_do_not_kill_workers():
+    received = []
+    done = threading.Event()
+    webhook = Webhook("token", workers=2)
+
+    @webhook.on("text")
+    def on_text(event):
+        received.append(event.body)
+        done.set()
+
+    for body in (b"[1,2]", b'{"entry":[1]}', b'{"entry":[{"changes":[null]}]}', b"not json", b"null"):
+        assert webhook.handle("POST", "", None, body) == (200, b"")
+    assert webhook.handle("POST", "", None, json.dumps(payload("still alive")).encode()) == (200, b"")
+    assert done.wait(5)
+    webhook.close(timeout=5)
+    assert received == ["still alive"]
+
+
+def test_failing_handler_is_isolated():
+    calls = []
+    webhook = Webhook("token")
+    webhook.add_handler(lambda p: 1 / 0)
+    webhook.on("*")(lambda event: 1 / 0)
+    webhook.on("message")(calls.append)
+    webhook._dispatch(payload())
+    assert len(calls) == 1
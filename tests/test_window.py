@@ -0,0 +1,76 @@
+import asyncio
+import sqlite3
+import time
+import pytest
+from whatsapp import AsyncWhatsApp, WhatsApp
+from whatsapp.async_transport import AsyncTransport
+from whatsapp.errors import ChatExpiredException
+from whatsapp.mock_server import MockGraphAPI
+from whatsapp.payloads import EncodedMessage
+from whatsapp.ratelimit import RateLimiter
+from whatsapp.transport import Transport
+from whatsapp.window import ConversationWindows
+
+TO = "16505551234"
+
+
+def template(to: str) -> EncodedMessage:
+    body = b'{"messaging_product":"whatsapp","to":"%s","type":"template"}' % to.encode()
+    return EncodedMessage(to, "template", body)
+
+
+def test_expired_window_of_encoded_message():
+    # the API answers 131047 although the index has the window open
+    windows = ConversationWindows()
+    windows.record(TO, int(time.time()) - 60)
+    with MockGraphAPI(error_rate=1.0, error_codes=(131047,)) as mock:
+        whatsapp = WhatsApp(
+            "token", "106540352242922", "verify", version="v21.0", transport=Transport(mock.url),
+            rate_limiter=RateLimiter(rate=1e9, pair_rate=1e9), windows=windows,
+        )
+        with pytest.raises(ChatExpiredException):
+            whatsapp.message.send_raw(template(TO))
+        assert not windows.is_open(TO)
+        whatsapp.close()
+
+
+def test_expired_window_of_encoded_message_async():
+    pytest.importorskip("httpx")
+    windows = ConversationWindows()
+    windows.record(TO, int(time.time()) - 60)
+
+    async def send(url: str):
+        async with AsyncWhatsApp(
+            "token", "106540352242922", "verify", version="v21.0", transport=AsyncTransport(url),
+            rate_limiter=RateLimiter(rate=1e9, pair_rate=1e9), windows=windows,
+        ) as whatsapp:
+            await whatsapp.message.send_raw(template(TO))
+
+    with MockGraphAPI(error_rate=1.0, error_codes=(131047,)) as mock:
+        with pytest.raises(ChatExpiredException):
+            asyncio.run(send(mock.url))
+    assert not windows.is_open(TO)
+
+
+def test_records_are_flushed_without_further_records(tmp_path):
+    path = tmp_path / "windows.db"
+    windows = ConversationWindows(path, flush_interval=0.05)
+    windows.record(TO, 1_700_000_000)
+    deadline = time.monotonic() + 5
+    rows = []
+    while not rows and time.monotonic() < deadline:
+        time.sleep(0.02)
+        db = sqlite3.connect(path)
+        rows = db.execute("SELECT wa_id, last_inbound FROM windows").fetchall()
+        db.close()
+    assert rows == [(int(TO), 1_700_000_000)]
+    windows.close()
+
+
+def test_close_writes_pending_records(tmp_path):
+    path = tmp_path / "windows.db"
+    now = int(time.time())
+    with ConversationWindows(path, flush_interval=3600) as windows:
+        windows.record(TO, now)
+    with ConversationWindows(path) as windows:
+        assert windows.last_inbound(TO) == now
@@ -1,36 +1,35 @@
-import requests
-from bs4 import BeautifulSoup
-from whatsapp.models import WhatsappConfig
-from whatsapp.media import WhatsappMedia
-from whatsapp.message import WhatsAppMessage
-from whatsapp.models import WhatsappConfig
-
-
-__all__ = ("WhatsApp",)
-
-
-class WhatsApp:
-    def __init__(self, token: str, phone_number_id: str, verify_token: str, version: str = "latest"):
-        version = self._init_api_version(version)
-        self.config = WhatsappConfig(
-            token=token,
-            phone_number_id=phone_number_id,
-            verify_token=verify_token,
-            version=version,
-            api_url=f"https://graph.facebook.com/{self.version}/{self.config.phone_number_id}",
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        self.media = WhatsappMedia(self.config)
-        self.message = WhatsAppMessage(self.config)
-
-    @staticmethod
-    def _init_api_version(version: str):
-        if version == "latest":
-            r = requests.get("https://developers.facebook.com/docs/graph-api/changelog/")
-            soup = BeautifulSoup(r.text, features="html.parser")
-            tables = soup.findAll("table")
-            version = tables[0].find_all("tr")[0].find_all("td")[1].text
-        return version
+import importlib
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    from whatsapp.async_client import AsyncWhatsApp
+    from whatsapp.async_transport import AsyncTransport
+    from whatsapp.client import WhatsApp
+    from whatsapp.ratelimit import RateLimiter
+    from whatsapp.transport import Transport
 
 
+__all__ = ("WhatsApp", "AsyncWhatsApp", "Transport", "AsyncTransport", "RateLimiter")
+
+# Public names are imported on first access so that `import whatsapp` stays cheap and
+# requests, pydantic or httpx are only loaded by the code paths that need them.
+_lazy_imports = {
+    "WhatsApp": "whatsapp.client",
+    "AsyncWhatsApp": "whatsapp.async_client",
+    "Transport": "whatsapp.transport",
+    "AsyncTransport": "whatsapp.async_transport",
+    "RateLimiter": "whatsapp.ratelimit",
+}
+
+
+def __getattr__(name: str):
+    module = _lazy_imports.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
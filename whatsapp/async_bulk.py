@@ -0,0 +1,55 @@
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Union
+from whatsapp.bulk import BulkMessage, BulkSend, _recipient
+from whatsapp.models import BulkStats, MessageResponse
+from whatsapp.results import ResultSet, SendResult
+
+
+class AsyncBulkSend:
+    def __init__(
+            self,
+            send: Callable[[BulkMessage], Awaitable[Union[dict, MessageResponse]]],
+            messages: Iterable[BulkMessage],
+            concurrency: int = 100,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.send = send
+        self.messages = messages
+        self.concurrency = concurrency
+        self.stats = BulkStats()
+
+    async def _send(self, index: int, message: BulkMessage) -> SendResult:
+        try:
+            return SendResult(index, _recipient(message), await self.send(message))
+        except Exception as e:
+            return SendResult(index, _recipient(message), error=e)
+
+    _record = BulkSend._record
+
+    async def collect(self) -> ResultSet:
+        results = ResultSet()
+        async for result in self:
+            results.append(result)
+        return results
+
+    async def __aiter__(self) -> AsyncIterator[SendResult]:
+        start = time.perf_counter()
+        pending = set()
+        try:
+            for index, message in enumerate(self.messages):
+                pending.add(asyncio.ensure_future(self._send(index, message)))
+                if len(pending) < self.concurrency:
+                    continue
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield self._record(task.result())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield self._record(task.result())
+        finally:
+            for task in pending:
+                task.cancel()
+            self.stats.elapsed = time.perf_counter() - start
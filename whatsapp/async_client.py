@@ -0,0 +1,94 @@
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+from whatsapp.async_media import AsyncWhatsappMedia
+from whatsapp.async_message import AsyncWhatsAppMessage
+from whatsapp.async_transport import AsyncTransport
+from whatsapp.models import WhatsappConfig
+from whatsapp.payloads import JSONCodec
+from whatsapp.ratelimit import RateLimiter
+
+if TYPE_CHECKING:
+    from whatsapp.cache import MediaURLCache, UploadCache
+    from whatsapp.metrics import Instrumentation
+    from whatsapp.retry import Retrier
+    from whatsapp.validation import Preflight
+    from whatsapp.webhook import Webhook, WebhookHandler
+    from whatsapp.window import ConversationWindows
+
+
+class AsyncWhatsApp:
+    def __init__(
+            self,
+            token: str,
+            phone_number_id: str,
+            verify_token: str,
+            version: str = "latest",
+            transport: Optional[AsyncTransport] = None,
+            max_in_flight: Optional[int] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            fast_path: bool = False,
+            codec: Optional[JSONCodec] = None,
+            upload_cache: Optional["UploadCache"] = None,
+            url_cache: Optional["MediaURLCache"] = None,
+            app_secret: Optional[str] = None,
+            read_receipt_window: Optional[float] = None,
+            retrier: Optional["Retrier"] = None,
+            instrumentation: Optional["Instrumentation"] = None,
+            preflight: Union[bool, "Preflight"] = False,
+            windows: Optional["ConversationWindows"] = None,
+    ):
+        # transport ownership as in WhatsApp.__init__
+        self._owns_transport = transport is None
+        self.transport = transport if transport is not None else AsyncTransport(max_in_flight=max_in_flight)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.config = WhatsappConfig(
+            token=token,
+            phone_number_id=phone_number_id,
+            verify_token=verify_token,
+            app_secret=app_secret,
+            version=version,
+            base_url=self.transport.base_url,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        # preflight=True checks messages and uploads locally against the API limits first
+        if preflight is True:
+            from whatsapp.validation import Preflight
+
+            preflight = Preflight()
+        preflight = preflight or None
+        self.media = AsyncWhatsappMedia(
+            self.config, self.transport, upload_cache, url_cache, retrier, instrumentation, preflight
+        )
+        self.message = AsyncWhatsAppMessage(
+            self.config, self.transport, self.rate_limiter, fast_path, codec, retrier, instrumentation, preflight
+        )
+        if read_receipt_window is not None:
+            from whatsapp.receipts import AsyncReadReceipts
+
+            self.message.receipts = AsyncReadReceipts(self.message._mark_as_read, read_receipt_window)
+        # customer service windows of this number, fed by the inbound messages of webhook()
+        self.message.windows = windows
+
+    def webhook(
+            self,
+            handlers: Iterable["WebhookHandler"] = (),
+            workers: int = 4,
+            queue_size: int = 10_000,
+    ) -> "Webhook":
+        from whatsapp.webhook import Webhook
+
+        webhook = Webhook(self.config.verify_token, self.config.app_secret, handlers, workers, queue_size)
+        if self.message.windows is not None:
+            self.message.windows.attach(webhook)
+        return webhook
+
+    async def aclose(self):
+        if self.message.receipts is not None:
+            await self.message.receipts.aclose()
+        if self._owns_transport:
+            await self.transport.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
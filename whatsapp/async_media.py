@@ -0,0 +1,220 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Callable, Union
+from typing_extensions import Optional
+from whatsapp.async_transport import AsyncTransport, httpx
+from whatsapp.download import CHUNK_SIZE, DownloadDestination, MediaDownload, filename_from_headers
+from whatsapp.errors import MediaDownloadFailureException, raise_for_response
+from whatsapp.media import _content_digest, _rewinder, _upload_source
+from whatsapp.models import MediaResponse, WhatsappConfig
+from whatsapp.multipart import MultipartEncoder, ProgressCallback, UploadSource
+
+if TYPE_CHECKING:
+    from whatsapp.cache import MediaURLCache, UploadCache
+    from whatsapp.metrics import Instrumentation
+    from whatsapp.retry import Retrier
+    from whatsapp.validation import Preflight
+
+
+class AsyncWhatsappMedia:
+    def __init__(
+            self,
+            config: WhatsappConfig,
+            transport: AsyncTransport,
+            upload_cache: Optional["UploadCache"] = None,
+            url_cache: Optional["MediaURLCache"] = None,
+            retrier: Optional["Retrier"] = None,
+            instrumentation: Optional["Instrumentation"] = None,
+            preflight: Optional["Preflight"] = None,
+    ):
+        self.config = config
+        self.transport = transport
+        self.upload_cache = upload_cache
+        self.url_cache = url_cache
+        self.retrier = retrier
+        self.instrumentation = instrumentation
+        self.preflight = preflight
+
+    async def upload_media(
+            self,
+            file_path: UploadSource,
+            mime_type: str = None,
+            filename: str = None,
+            file_size: int = None,
+            progress: ProgressCallback = None,
+    ) -> MediaResponse:
+        filename, mime_type = _upload_source(file_path, mime_type, filename)
+        if self.preflight is not None:
+            from whatsapp.validation import upload_size
+
+            self.preflight.check_upload(mime_type, upload_size(file_path, file_size))
+        digest = await asyncio.to_thread(_content_digest, file_path) if self.upload_cache is not None else None
+        if digest is not None:
+            media_id = self.upload_cache.get(self.config.phone_number_id, mime_type, digest)
+            if media_id is not None:
+                return MediaResponse(id=media_id)
+        if self.retrier is None:
+            response = await self._upload_media(file_path, filename, mime_type, file_size, progress)
+        else:
+            rewind = _rewinder(file_path)
+
+            async def upload() -> MediaResponse:
+                if rewind is not None:
+                    rewind()
+                return await self._upload_media(file_path, filename, mime_type, file_size, progress)
+
+            response = await self.retrier.call_async("media", upload, max_attempts=None if rewind is not None else 1)
+        if digest is not None and response.id is not None:
+            self.upload_cache.set(self.config.phone_number_id, mime_type, digest, response.id)
+        return response
+
+    async def _upload_media(
+            self,
+            source: UploadSource,
+            filename: str,
+            mime_type: str,
+            file_size: Optional[int],
+            progress: Optional[ProgressCallback],
+    ) -> MediaResponse:
+        fields = {"messaging_product": "whatsapp"}
+        with MultipartEncoder(fields, source, filename, mime_type, file_size, progress=progress) as body:
+            headers = self.config.headers | {"Content-Type": body.content_type}
+            if body.len is not None:
+                headers["Content-Length"] = str(body.len)
+            started = time.perf_counter()
+            try:
+                r = await self.transport.post(
+                    f"{self.config.api_url}/media",
+                    headers=headers,
+                    content=body.__aiter__()
+                )
+            except Exception as e:
+                if self.instrumentation is not None:
+                    self.instrumentation.observe("media/upload", started, body.sent, error=e)
+                raise
+            if self.instrumentation is not None:
+                self.instrumentation.observe("media/upload", started, body.sent, r)
+        if r.status_code != 200:
+            raise_for_response(r)
+        return MediaResponse(**r.json())
+
+    async def download_media(self, media_url: str, save: bool = True) -> Optional[tuple[str, bytes]]:
+        async with self.transport.stream("GET", media_url, headers=self.config.headers) as r:
+            self._raise_for_status(r, media_url)
+            filename = filename_from_headers(r.headers)
+            if not save:
+                return filename, await r.aread()
+            # disk writes go to a worker thread, a slow disk would stall the event loop
+            f = await asyncio.to_thread(open, filename, "wb")
+            try:
+                async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+
+    async def download_media_to(
+            self,
+            media: Union[str, MediaResponse],
+            destination: DownloadDestination,
+            sha256: str = None,
+            resume: bool = True,
+            max_retries: int = 3,
+            progress: Callable[[int, Optional[int]], None] = None,
+    ) -> str:
+        if isinstance(media, MediaResponse):
+            media_url, sha256 = media.url, sha256 or media.sha256
+        else:
+            media_url = media
+        # opening (which hashes a .part file to resume), writing, hashing and renaming run in worker
+        # threads so that the event loop is not blocked; `progress` is called from those threads
+        download = await asyncio.to_thread(MediaDownload, destination, sha256, resume, progress)
+        try:
+            attempt = 0
+            while True:
+                started, received = time.perf_counter(), download.offset
+                try:
+                    async with self.transport.stream(
+                            "GET",
+                            media_url,
+                            headers=self.config.headers | download.range_headers(),
+                    ) as r:
+                        if r.status_code != 416 or not download.offset:
+                            self._raise_for_status(r, media_url)
+                            await asyncio.to_thread(download.begin, r.status_code, r.headers)
+                            async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                                await asyncio.to_thread(download.write, chunk)
+                            download.check_complete()
+                    self._observe_download(started, download.offset - received, r)
+                    break
+                except (httpx.TransportError, MediaDownloadFailureException) as e:
+                    self._observe_download(started, download.offset - received, error=e)
+                    attempt += 1
+                    if attempt > max_retries:
+                        raise
+                except Exception as e:
+                    self._observe_download(started, download.offset - received, error=e)
+                    raise
+            return await asyncio.to_thread(download.finish)
+        finally:
+            await asyncio.to_thread(download.close)
+
+    async def query_media_url(self, media_id: str) -> MediaResponse:
+        if self.url_cache is not None:
+            return await self.url_cache.get_or_fetch_async(media_id, lambda: self._query_media_url(media_id))
+        return await self._query_media_url(media_id)
+
+    async def _query_media_url(self, media_id: str) -> MediaResponse:
+        if self.retrier is not None:
+            return await self.retrier.call_async("media", lambda: self._get_media(media_id), idempotent=True)
+        return await self._get_media(media_id)
+
+    async def _get_media(self, media_id: str) -> MediaResponse:
+        url = str(self.config.api_url).split(f"{self.config.phone_number_id}")[0] + media_id + "/"
+        started = time.perf_counter()
+        try:
+            r = await self.transport.get(url, headers=self.config.headers)
+        except Exception as e:
+            if self.instrumentation is not None:
+                self.instrumentation.observe("media/query", started, error=e)
+            raise
+        if self.instrumentation is not None:
+            self.instrumentation.observe("media/query", started, response=r)
+        if r.status_code != 200:
+            raise_for_response(r)
+        return MediaResponse(**r.json())
+
+    async def delete_media(self, media_id: str) -> MediaResponse:
+        if self.retrier is not None:
+            response = await self.retrier.call_async("media", lambda: self._delete_media(media_id), idempotent=True)
+        else:
+            response = await self._delete_media(media_id)
+        if self.upload_cache is not None:
+            self.upload_cache.invalidate(media_id)
+        if self.url_cache is not None:
+            self.url_cache.invalidate(media_id)
+        return response
+
+    async def _delete_media(self, media_id: str) -> MediaResponse:
+        url = str(self.config.api_url).split(f"{self.config.phone_number_id}")[0] + media_id + "/"
+        started = time.perf_counter()
+        try:
+            r = await self.transport.delete(url, headers=self.config.headers)
+        except Exception as e:
+            if self.instrumentation is not None:
+                self.instrumentation.observe("media/delete", started, error=e)
+            raise
+        if self.instrumentation is not None:
+            self.instrumentation.observe("media/delete", started, response=r)
+        if r.status_code != 200:
+            raise_for_response(r)
+        return MediaResponse(**r.json())
+
+    def _observe_download(self, started: float, received: int, r=None, error: Optional[Exception] = None):
+        if self.instrumentation is not None:
+            self.instrumentation.observe("media/download", started, 0, r, error, bytes_received=received)
+
+    def _raise_for_status(self, r, media_url: str):
+        # an expired or revoked media url: the cached lookup that produced it is stale too
+        if r.status_code in (401, 404) and self.url_cache is not None:
+            self.url_cache.invalidate_url(media_url)
+        r.raise_for_status()
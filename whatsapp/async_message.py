@@ -0,0 +1,139 @@
+import time
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+from whatsapp.async_transport import AsyncTransport
+from whatsapp.async_bulk import AsyncBulkSend
+from whatsapp.errors import ChatExpiredException, ThrottlingException, raise_for_response
+from whatsapp.message import WhatsAppMessage, _free_form
+from whatsapp.models import Message, WhatsappConfig, MessageResponse
+from whatsapp.payloads import EncodedMessage, JSONCodec
+from whatsapp.ratelimit import RateLimiter
+
+if TYPE_CHECKING:
+    from whatsapp.metrics import Instrumentation
+    from whatsapp.receipts import AsyncReadReceipts
+    from whatsapp.retry import Retrier
+    from whatsapp.templates import Template, Values
+    from whatsapp.validation import Preflight
+
+
+class AsyncWhatsAppMessage(WhatsAppMessage):
+    # The builders (send_text, react, ...) are inherited: they return self.send_message(...),
+    # which is a coroutine here, so every one of them is awaitable.
+    def __init__(
+            self,
+            config: WhatsappConfig,
+            transport: AsyncTransport,
+            limiter: Optional[RateLimiter] = None,
+            fast_path: bool = False,
+            codec: Optional[JSONCodec] = None,
+            retrier: Optional["Retrier"] = None,
+            instrumentation: Optional["Instrumentation"] = None,
+            preflight: Optional["Preflight"] = None,
+    ):
+        super().__init__(config, transport, limiter, fast_path, codec, retrier, instrumentation, preflight)
+        self.receipts: Optional["AsyncReadReceipts"] = None
+
+    async def mark_as_read(
+            self,
+            message_id: str,
+            sender: Optional[str] = None,
+            timestamp: Optional[int] = None,
+    ) -> Optional[MessageResponse]:
+        if sender is not None and self.receipts is not None:
+            self.receipts.schedule(sender, message_id, timestamp)
+            return None
+        return await self._mark_as_read(message_id)
+
+    async def send_in_window(
+            self,
+            data: Union[dict[str, str], Message],
+            template: Union[str, "Template"],
+            values: "Values" = (),
+            language: str = "en_US",
+            components: Optional[list[dict]] = None,
+    ) -> MessageResponse:
+        if isinstance(data, Message):
+            data = data.model_dump(exclude_none=True)
+        to = data["to"]
+        if self.windows is None or self.windows.is_open(to):
+            try:
+                return await self.send_message(data)
+            except ChatExpiredException:
+                pass
+        return await self.send_template(
+            to, template, values, language, components, data.get("recipient_type", "individual")
+        )
+
+    def send_bulk(self, messages: Iterable[Union[dict[str, str], Message, EncodedMessage]], concurrency: int = 100) -> AsyncBulkSend:
+        return AsyncBulkSend(self.send_raw, messages, concurrency)
+
+    async def send_message(
+            self,
+            data: Union[dict[str, str], Message, EncodedMessage],
+            idempotency_key: Optional[str] = None,
+    ) -> MessageResponse:
+        return MessageResponse(**await self.send_raw(data, idempotency_key))
+
+    async def send_raw(
+            self,
+            data: Union[dict[str, str], Message, EncodedMessage],
+            idempotency_key: Optional[str] = None,
+    ) -> dict:
+        if isinstance(data, Message):
+            data = data.model_dump(exclude_none=True)
+        if self.preflight is not None:
+            self.preflight.check_message(data)
+        windows = self.windows
+        # data may be an EncodedMessage, which answers get() but not subscripts
+        to = data.get("to")
+        if windows is not None and _free_form(data):
+            windows.check(to)
+        if self.retrier is None and idempotency_key is not None:
+            raise ValueError("idempotency keys need a retrier")
+        try:
+            if self.retrier is None:
+                return await self._send_message(data)
+            return await self.retrier.call_async("messages", lambda: self._send_message(data), idempotency_key)
+        except ChatExpiredException:
+            if windows is not None and to is not None:
+                windows.expire(to)
+            raise
+
+    async def _send_message(self, data: dict) -> dict:
+        if self.limiter is None:
+            return await self._post_message(data)
+        to = data.get("to")
+        queued = time.perf_counter()
+        await self.limiter.acquire_async(self.config.phone_number_id, to)
+        try:
+            response = await self._post_message(data, time.perf_counter() - queued)
+        except ThrottlingException as e:
+            self.limiter.on_throttle(self.config.phone_number_id, to, e)
+            raise
+        self.limiter.on_success(self.config.phone_number_id, to)
+        return response
+
+    async def _post_message(self, data: dict, queue_wait: float = 0.0) -> dict:
+        body = data.body if isinstance(data, EncodedMessage) else self.codec.dumps(data)
+        started = time.perf_counter()
+        try:
+            r = await self.transport.post(
+                f"{self.config.api_url}/messages",
+                headers=self.config.headers | {"Content-Type": self.codec.content_type},
+                content=body
+            )
+        except Exception as e:
+            if self.instrumentation is not None:
+                self.instrumentation.observe(
+                    "messages", started, len(body), error=e,
+                    message_type=data.get("type", data.get("status")), queue_wait=queue_wait,
+                )
+            raise
+        if self.instrumentation is not None:
+            self.instrumentation.observe(
+                "messages", started, len(body), r,
+                message_type=data.get("type", data.get("status")), queue_wait=queue_wait,
+            )
+        if r.status_code != 200:
+            raise_for_response(r)
+        return r.json()
@@ -0,0 +1,27 @@
+from whatsapp.async_media import AsyncWhatsappMedia
+from whatsapp.async_message import AsyncWhatsAppMessage
+from whatsapp.async_transport import AsyncTransport
+from whatsapp.registry import WhatsAppRegistry
+
+
+class AsyncWhatsAppRegistry(WhatsAppRegistry):
+    # WhatsAppRegistry over one AsyncTransport: tenant handles carry AsyncWhatsAppMessage and
+    # AsyncWhatsappMedia, and send_message() returns an awaitable
+    message_class = AsyncWhatsAppMessage
+    media_class = AsyncWhatsappMedia
+
+    def _transport(self):
+        return AsyncTransport()
+
+    def close(self):
+        raise TypeError("use `await registry.aclose()` or `async with` on AsyncWhatsAppRegistry")
+
+    async def aclose(self):
+        if self._owns_transport:
+            await self.transport.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,94 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from whatsapp.transport import GRAPH_URL
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+
+class AsyncTransport:
+    def __init__(
+            self,
+            base_url: str = GRAPH_URL,
+            max_connections: int = 100,
+            max_keepalive_connections: int = 20,
+            max_in_flight: Optional[int] = None,
+            connect_timeout: float = 5.0,
+            read_timeout: float = 30.0,
+            client: Optional["httpx.AsyncClient"] = None,
+            http2: bool = False,
+            http1: bool = True,
+            max_media_connections: int = 4,
+    ):
+        if httpx is None:
+            raise ImportError("AsyncTransport requires httpx, install it with `pip install whatsapp[async]`")
+        self.base_url = base_url.rstrip("/")
+        # a caller's client is the caller's to close
+        self._owns_client = client is None
+        self.client = client if client is not None else httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            http1=http1,
+            http2=http2,
+        )
+        # with http2, media transfers get their own connections so that their flow control windows are
+        # not shared with message sends (see HTTP2Transport); http1=False forces HTTP/2 without TLS
+        self.media_client = self.client
+        if http2 and client is None:
+            self.media_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_media_connections,
+                    max_keepalive_connections=max_media_connections,
+                ),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                http1=http1,
+                http2=True,
+            )
+        # bounds the number of requests awaiting a response, on top of the connection limits
+        self._in_flight = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+
+    def lane(self, url: str) -> "httpx.AsyncClient":
+        return self.client if url.endswith("/messages") else self.media_client
+
+    async def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        if self._in_flight is None:
+            return await self.lane(url).request(method, url, **kwargs)
+        async with self._in_flight:
+            return await self.lane(url).request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator["httpx.Response"]:
+        if self._in_flight is None:
+            async with self.lane(url).stream(method, url, **kwargs) as r:
+                yield r
+            return
+        async with self._in_flight:
+            async with self.lane(url).stream(method, url, **kwargs) as r:
+                yield r
+
+    async def get(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("DELETE", url, **kwargs)
+
+    async def aclose(self):
+        if self._owns_client:
+            await self.client.aclose()
+        if self.media_client is not self.client:
+            await self.media_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
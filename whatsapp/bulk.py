@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Union
+from whatsapp.models import BulkStats, Message, MessageResponse
+from whatsapp.results import ResultSet, SendResult
+
+BulkMessage = Union[dict, Message]
+
+
+def _recipient(message: BulkMessage):
+    return message.to if isinstance(message, Message) else message.get("to")
+
+
+class BulkSend:
+    # Iterating yields a SendResult per message as soon as it completes, in completion order.
+    # At most `concurrency` sends run at once and only as many messages are pulled from the
+    # source iterable, so memory does not grow with the number of recipients. `send` may return the
+    # raw JSON response (WhatsAppMessage.send_raw), the MessageResponse is then only built on demand.
+    def __init__(
+            self,
+            send: Callable[[BulkMessage], Union[dict, MessageResponse]],
+            messages: Iterable[BulkMessage],
+            concurrency: int = 8,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.send = send
+        self.messages = messages
+        self.concurrency = concurrency
+        self.stats = BulkStats()
+
+    def _send(self, index: int, message: BulkMessage) -> SendResult:
+        try:
+            return SendResult(index, _recipient(message), self.send(message))
+        except Exception as e:
+            return SendResult(index, _recipient(message), error=e)
+
+    def _record(self, result: SendResult) -> SendResult:
+        self.stats.total += 1
+        if result.ok:
+            self.stats.succeeded += 1
+        else:
+            self.stats.failed += 1
+        return result
+
+    def collect(self) -> ResultSet:
+        # runs the whole send and keeps every result in a compact ResultSet
+        return ResultSet(self)
+
+    def __iter__(self) -> Iterator[SendResult]:
+        start = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="whatsapp-bulk")
+        pending = set()
+        try:
+            for index, message in enumerate(self.messages):
+                pending.add(pool.submit(self._send, index, message))
+                if len(pending) < self.concurrency:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield self._record(future.result())
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield self._record(future.result())
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.stats.elapsed = time.perf_counter() - start
@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Optional
+
+MEDIA_ID_TTL = 29 * 24 * 60 * 60  # uploaded media ids live 30 days, keep a day of margin
+
+
+class MemoryCache:
+    # Thread safe LRU with a per entry expiry.
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_value(self, value: Any):
+        with self._lock:
+            for key in [key for key, item in self._data.items() if item[0] == value]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache:
+    # Persistent string cache, shareable between processes through the same file.
+    def __init__(self, path: str):
+        import sqlite3
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_value ON cache (value)")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_value(self, value: str):
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE value = ?", (value,))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM cache")
+
+    def close(self):
+        self._db.close()
+
+
+class UploadCache:
+    # Maps (phone number, mime type, sha256 of the content) to the media id returned by the upload.
+    def __init__(self, backend: Optional[Any] = None, ttl: float = MEDIA_ID_TTL):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttl = ttl
+
+    @staticmethod
+    def key(phone_number_id: str, mime_type: str, digest: str) -> str:
+        return f"{phone_number_id}:{mime_type}:{digest}"
+
+    def get(self, phone_number_id: str, mime_type: str, digest: str) -> Optional[str]:
+        return self.backend.get(self.key(phone_number_id, mime_type, digest))
+
+    def set(self, phone_number_id: str, mime_type: str, digest: str, media_id: str):
+        self.backend.set(self.key(phone_number_id, mime_type, digest), media_id, self.ttl)
+
+    def invalidate(self, media_id: str):
+        self.backend.delete_value(media_id)
+
+
+class CoalescingCache:
+    # Short lived cache of call results. Concurrent calls for the same key wait for the one already
+    # in flight instead of making their own; failures are handed to the waiters and never cached.
+    # When the task making an async call is cancelled, one of its waiters makes the call again.
+    def __init__(self, ttl: float, maxsize: int = 10_000):
+        self.ttl = ttl
+        self._responses = MemoryCache(maxsize)
+        self._inflight: dict[str, Future] = {}
+        self._inflight_async: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _store(self, key: str, response: Any):
+        self._responses.set(key, response, self.ttl)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any]) -> Any:
+        response = self._responses.get(key)
+        if response is not None:
+            return response
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            response = fetch()
+            self._store(key, response)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def get_or_fetch_async(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        import asyncio
+
+        while True:
+            response = self._responses.get(key)
+            if response is not None:
+                return response
+            future = self._inflight_async.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # the leader was cancelled, not this waiter: the first waiter to get here fetches
+        future = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+        try:
+            response = await fetch()
+            self._store(key, response)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            # the leader's cancellation is not the waiters' failure
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # the exception is delivered to the waiters, if any, do not log it as never retrieved
+            future.exception()
+            raise
+        finally:
+            del self._inflight_async[key]
+
+    def invalidate(self, key: str):
+        self._responses.delete(key)
+
+
+class MediaURLCache(CoalescingCache):
+    # query_media_url results keyed by media id, so that concurrent lookups of one id send one request.
+    def __init__(self, ttl: float = 4 * 60, maxsize: int = 10_000):
+        super().__init__(ttl, maxsize)
+        self._ids_by_url = MemoryCache(maxsize)
+
+    def _store(self, media_id: str, response: Any):
+        super()._store(media_id, response)
+        if getattr(response, "url", None):
+            self._ids_by_url.set(response.url, media_id, self.ttl)
+
+    def invalidate_url(self, url: str):
+        media_id = self._ids_by_url.get(url)
+        if media_id is not None:
+            self._ids_by_url.delete(url)
+            self._responses.delete(media_id)
+
+
+class IdempotencyCache(CoalescingCache):
+    # Responses of sends made with an idempotency key: sending again with the same key, while the
+    # first send is in flight or within `ttl` after it succeeded, returns its response instead.
+    def __init__(self, ttl: float = 24 * 60 * 60, maxsize: int = 100_000):
+        super().__init__(ttl, maxsize)
@@ -0,0 +1,93 @@
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+from whatsapp.media import WhatsappMedia
+from whatsapp.message import WhatsAppMessage
+from whatsapp.models import WhatsappConfig
+from whatsapp.payloads import JSONCodec
+from whatsapp.ratelimit import RateLimiter
+from whatsapp.transport import Transport
+
+if TYPE_CHECKING:
+    from whatsapp.cache import MediaURLCache, UploadCache
+    from whatsapp.metrics import Instrumentation
+    from whatsapp.retry import Retrier
+    from whatsapp.validation import Preflight
+    from whatsapp.webhook import Webhook, WebhookHandler
+    from whatsapp.window import ConversationWindows
+
+
+class WhatsApp:
+    def __init__(
+            self,
+            token: str,
+            phone_number_id: str,
+            verify_token: str,
+            version: str = "latest",
+            transport: Optional[Transport] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            fast_path: bool = False,
+            codec: Optional[JSONCodec] = None,
+            upload_cache: Optional["UploadCache"] = None,
+            url_cache: Optional["MediaURLCache"] = None,
+            app_secret: Optional[str] = None,
+            read_receipt_window: Optional[float] = None,
+            retrier: Optional["Retrier"] = None,
+            instrumentation: Optional["Instrumentation"] = None,
+            preflight: Union[bool, "Preflight"] = False,
+            windows: Optional["ConversationWindows"] = None,
+    ):
+        # a transport passed in may be shared with other clients: close() leaves it open
+        self._owns_transport = transport is None
+        self.transport = transport if transport is not None else Transport()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.config = WhatsappConfig(
+            token=token,
+            phone_number_id=phone_number_id,
+            verify_token=verify_token,
+            app_secret=app_secret,
+            version=version,
+            base_url=self.transport.base_url,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        # preflight=True checks messages and uploads locally against the API limits first
+        if preflight is True:
+            from whatsapp.validation import Preflight
+
+            preflight = Preflight()
+        preflight = preflight or None
+        self.media = WhatsappMedia(
+            self.config, self.transport, upload_cache, url_cache, retrier, instrumentation, preflight
+        )
+        self.message = WhatsAppMessage(
+            self.config, self.transport, self.rate_limiter, fast_path, codec, retrier, instrumentation, preflight
+        )
+        if read_receipt_window is not None:
+            from whatsapp.receipts import ReadReceipts
+
+            self.message.receipts = ReadReceipts(self.message._mark_as_read, read_receipt_window)
+        # customer service windows of this number, fed by the inbound messages of webhook()
+        self.message.windows = windows
+
+    def webhook(
+            self,
+            handlers: Iterable["WebhookHandler"] = (),
+            workers: int = 4,
+            queue_size: int = 10_000,
+    ) -> "Webhook":
+        from whatsapp.webhook import Webhook
+
+        webhook = Webhook(self.config.verify_token, self.config.app_secret, handlers, workers, queue_size)
+        if self.message.windows is not None:
+            self.message.windows.attach(webhook)
+        return webhook
+
+    def close(self):
+        if self.message.receipts is not None:
+            self.message.receipts.close()
+        if self._owns_transport:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
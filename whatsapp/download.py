@@ -0,0 +1,111 @@
+import base64
+import hashlib
+import os
+from typing import BinaryIO, Callable, Mapping, Optional, Union
+from whatsapp.errors import MediaDownloadFailureException
+
+DownloadDestination = Union[str, os.PathLike, BinaryIO]
+CHUNK_SIZE = 256 * 1024
+
+
+def _failure(message: str) -> MediaDownloadFailureException:
+    return MediaDownloadFailureException({"error": message, "code": 131052})
+
+
+def filename_from_headers(headers: Mapping[str, str], default: str = "media") -> str:
+    # never trust a server supplied name as a path: keep the last component only
+    disposition = headers.get("Content-Disposition", "")
+    filename = disposition.rpartition("filename=")[2].split(";")[0].strip().strip('"')
+    return os.path.basename(filename.replace("\\", "/")) or default
+
+
+def sha256_matches(digest: bytes, expected: str) -> bool:
+    expected = expected.strip()
+    return expected.lower() == digest.hex() or expected == base64.b64encode(digest).decode()
+
+
+class MediaDownload:
+    # Transport independent state of one download: where chunks go, how many bytes are already
+    # there, and the running sha256. Paths are written to "<path>.part" and renamed once the digest
+    # checks out, so an interrupted download can be resumed with a Range request later on.
+    def __init__(
+            self,
+            destination: DownloadDestination,
+            sha256: Optional[str] = None,
+            resume: bool = True,
+            progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    ):
+        self.sha256 = sha256
+        self.progress = progress
+        self.hasher = hashlib.sha256()
+        self.offset = 0
+        self.total: Optional[int] = None
+        if isinstance(destination, (str, os.PathLike)):
+            self.path = os.fspath(destination)
+            self.part_path = self.path + ".part"
+            if resume and os.path.exists(self.part_path):
+                self._file = open(self.part_path, "r+b")
+                while chunk := self._file.read(CHUNK_SIZE):
+                    self.hasher.update(chunk)
+                    self.offset += len(chunk)
+            else:
+                self._file = open(self.part_path, "wb")
+            self._start = 0
+        else:
+            self.path = self.part_path = None
+            self._file = destination
+            try:
+                self._start = destination.tell()
+            except (AttributeError, OSError, ValueError):
+                self._start = None
+
+    def range_headers(self) -> dict[str, str]:
+        return {"Range": f"bytes={self.offset}-"} if self.offset else {}
+
+    def begin(self, status_code: int, headers: Mapping[str, str]):
+        if status_code == 206:
+            total = headers.get("Content-Range", "").rpartition("/")[2]
+            self.total = int(total) if total.isdigit() else None
+            return
+        if self.offset:
+            # the server ignored the Range header and sends the whole body again
+            self._restart()
+        length = headers.get("Content-Length")
+        self.total = int(length) if length and length.isdigit() else None
+
+    def _restart(self):
+        if self._start is None:
+            raise _failure("cannot restart the download on a non seekable destination")
+        self._file.seek(self._start)
+        self._file.truncate()
+        self.hasher = hashlib.sha256()
+        self.offset = 0
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self.hasher.update(chunk)
+        self.offset += len(chunk)
+        if self.progress is not None:
+            self.progress(self.offset, self.total)
+
+    def check_complete(self):
+        if self.total is not None and self.offset < self.total:
+            raise _failure(f"connection closed after {self.offset} of {self.total} bytes")
+
+    def finish(self) -> str:
+        digest = self.hasher.digest()
+        if self.sha256 and not sha256_matches(digest, self.sha256):
+            self.close()
+            if self.part_path is not None:
+                os.remove(self.part_path)
+            raise _failure(f"sha256 mismatch: expected {self.sha256}, got {digest.hex()}")
+        if self.part_path is not None:
+            self.close()
+            os.replace(self.part_path, self.path)
+        else:
+            self._file.flush()
+        return digest.hex()
+
+    def close(self):
+        if self.part_path is not None and not self._file.closed:
+            self._file.close()
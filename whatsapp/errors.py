@@ -1,10 +1,18 @@
 # Borrowed from https://github.com/filipporomani/whatsapp-python
 
-from typing import Union
+from typing import Optional, Union
 
+# Exceptions tagged `retryable = True` are transient on Meta's side: sending the same request again
+# later may succeed. Use is_retryable() rather than the attribute, it is False for everything else.
 
-class Handler:
-    def __init__(self, error: dict):
+
+def is_retryable(error: BaseException) -> bool:
+    return getattr(error, "retryable", False) is True
+
+
+class Handler(Exception):  # invoked by codes without a dedicated exception
+    def __init__(self, error: Exception):
+        super().__init__(error)
         self.error = error
 
 
@@ -70,11 +78,11 @@ class BlockedAccountException(IntegrityException):  # invoked by code 131031
 
 # Generic exceptions
 class UnknownAPIException(Exception):  # invoked by code 1
-    pass
+    retryable = True
 
 
 class ServiceUnavailableException(Exception):  # invoked by code 2
-    pass
+    retryable = True
 
 
 class WrongPhoneNumberException(Exception):  # invoked by code 33
@@ -106,7 +114,7 @@ class InvalidParameterTypeException(Exception):  # invoked by code 131009
 
 
 class ServiceUnavailableException(Exception):  # invoked by code 131016
-    pass
+    retryable = True
 
 
 class SamePhoneNumberException(Exception):  # invoked by code 131021
@@ -146,7 +154,7 @@ class MediaLoadFailureException(Exception):  # invoked by code 131053
 
 
 class MaintenanceException(Exception):  # invoked by code 131057
-    pass
+    retryable = True
 
 
 class ParameterNumberMismatchException(Exception):  # invoked by code 132000
@@ -190,7 +198,7 @@ class FailedToRevertRegistrationException(Exception):  # invoked by code 133000
 
 
 class ServerTemporaryUnavailableException(Exception):  # invoked by code 133004
-    pass
+    retryable = True
 
 
 class MFAPinIncorrectException(Exception):  # invoked by code 133005
@@ -214,13 +222,21 @@ class UnregisteredNumberException(Exception):  # invoked by code 133010
 
 
 class RetryLaterException(Exception):  # invoked by code 133015
-    pass
+    retryable = True
 
 
 class GenericUserException(Exception):  # invoked by code 135000
     pass
 
 
+class ServerErrorException(Exception):  # invoked by HTTP 5xx responses without an error code
+    retryable = True
+
+
+class CircuitOpenException(Exception):  # raised locally while an endpoint's circuit breaker is open
+    pass
+
+
 pairings = {
     0: AuthException,
     1: UnknownAPIException,
@@ -279,7 +295,7 @@ pairings = {
 
 
 class Handle:
-    def __init__(self, data: dict) -> Union[Exception, None]:
+    def __init__(self, data: dict, status_code: Optional[int] = None) -> Union[Exception, None]:
         try:
             code = data["error"]["code"]
             if code in pairings:
@@ -289,4 +305,15 @@ class Handle:
                     raise ForbiddenException({"error": data["error"]["message"], "code": code})
             raise Handler(Exception({"error": data["error"]["message"], "code": code}))
         except KeyError:
-            return None
\ No newline at end of file
+            if status_code is not None and status_code >= 500:
+                raise ServerErrorException({"error": f"HTTP {status_code}", "code": status_code})
+            return None
+
+
+def raise_for_response(r):
+    # Handle() for a requests or httpx response whose body may not even be JSON (proxies, 502s, ...)
+    try:
+        data = r.json()
+    except ValueError:
+        data = {}
+    Handle(data, r.status_code)
@@ -0,0 +1,190 @@
+import json
+from typing import Iterator, Optional, Union
+
+# Lightweight views over webhook payloads. parse() walks entry -> changes -> value once and wraps
+# each message or status dict as it is, every field is read from the dict when it is accessed.
+
+
+class Event:
+    __slots__ = ("raw", "value")
+    kind = "event"
+
+    def __init__(self, raw: dict, value: dict):
+        self.raw = raw
+        self.value = value
+
+    @property
+    def type(self) -> str:
+        return self.kind
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.raw.get("id")
+
+    @property
+    def timestamp(self) -> Optional[int]:
+        timestamp = self.raw.get("timestamp")
+        return int(timestamp) if timestamp is not None else None
+
+    @property
+    def phone_number_id(self) -> Optional[str]:
+        return self.value.get("metadata", {}).get("phone_number_id")
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} id={self.id!r}>"
+
+
+class InboundMessage(Event):
+    __slots__ = ()
+    kind = "message"
+
+    @property
+    def type(self) -> str:
+        return self.raw.get("type", "unknown")
+
+    @property
+    def sender(self) -> Optional[str]:
+        return self.raw.get("from")
+
+    @property
+    def context_id(self) -> Optional[str]:
+        return self.raw.get("context", {}).get("id")
+
+    @property
+    def sender_name(self) -> Optional[str]:
+        sender = self.sender
+        for contact in self.value.get("contacts", ()):
+            if contact.get("wa_id") == sender:
+                return contact.get("profile", {}).get("name")
+        return None
+
+
+class TextMessage(InboundMessage):
+    __slots__ = ()
+
+    @property
+    def body(self) -> str:
+        return self.raw["text"]["body"]
+
+
+class MediaMessage(InboundMessage):
+    __slots__ = ()
+
+    @property
+    def media(self) -> dict:
+        return self.raw[self.raw["type"]]
+
+    @property
+    def media_id(self) -> str:
+        return self.media["id"]
+
+    @property
+    def mime_type(self) -> Optional[str]:
+        return self.media.get("mime_type")
+
+    @property
+    def sha256(self) -> Optional[str]:
+        return self.media.get("sha256")
+
+    @property
+    def caption(self) -> Optional[str]:
+        return self.media.get("caption")
+
+    @property
+    def filename(self) -> Optional[str]:
+        return self.media.get("filename")
+
+
+class ReactionMessage(InboundMessage):
+    __slots__ = ()
+
+    @property
+    def message_id(self) -> str:
+        return self.raw["reaction"]["message_id"]
+
+    @property
+    def emoji(self) -> Optional[str]:
+        # missing when the reaction is removed
+        return self.raw["reaction"].get("emoji")
+
+
+class LocationMessage(InboundMessage):
+    __slots__ = ()
+
+    @property
+    def latitude(self) -> float:
+        return float(self.raw["location"]["latitude"])
+
+    @property
+    def longitude(self) -> float:
+        return float(self.raw["location"]["longitude"])
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.raw["location"].get("name")
+
+    @property
+    def address(self) -> Optional[str]:
+        return self.raw["location"].get("address")
+
+
+class StatusUpdate(Event):
+    __slots__ = ()
+    kind = "status"
+
+    @property
+    def status(self) -> str:
+        return self.raw["status"]
+
+    @property
+    def recipient(self) -> Optional[str]:
+        return self.raw.get("recipient_id")
+
+    @property
+    def conversation_id(self) -> Optional[str]:
+        return self.raw.get("conversation", {}).get("id")
+
+    @property
+    def pricing_category(self) -> Optional[str]:
+        return self.raw.get("pricing", {}).get("category")
+
+    @property
+    def error_codes(self) -> list[int]:
+        return [error["code"] for error in self.raw.get("errors", ()) if "code" in error]
+
+
+MESSAGE_TYPES = {
+    "text": TextMessage,
+    "image": MediaMessage,
+    "video": MediaMessage,
+    "audio": MediaMessage,
+    "document": MediaMessage,
+    "sticker": MediaMessage,
+    "reaction": ReactionMessage,
+    "location": LocationMessage,
+}
+
+
+def _dicts(items) -> Iterator[dict]:
+    # the dicts of a payload list; anything else (a list that is not one, null items) is skipped
+    if isinstance(items, list):
+        for item in items:
+            if isinstance(item, dict):
+                yield item
+
+
+def parse(payload: Union[bytes, str, dict]) -> Iterator[Event]:
+    # parts of the payload that are not shaped like a webhook notification are skipped
+    if isinstance(payload, (bytes, str)):
+        payload = json.loads(payload)
+    if not isinstance(payload, dict):
+        return
+    for entry in _dicts(payload.get("entry")):
+        for change in _dicts(entry.get("changes")):
+            value = change.get("value")
+            if not isinstance(value, dict):
+                continue
+            for message in _dicts(value.get("messages")):
+                yield MESSAGE_TYPES.get(message.get("type"), InboundMessage)(message, value)
+            for status in _dicts(value.get("statuses")):
+                yield StatusUpdate(status, value)
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+from typing import Iterator, Optional
+import requests
+from whatsapp.async_transport import AsyncTransport, httpx
+from whatsapp.transport import GRAPH_URL
+
+
+class HTTP2Transport:
+    # Drop in replacement for Transport speaking HTTP/2 (`pip install whatsapp[http2]`). Concurrent
+    # requests are multiplexed as streams over a few connections instead of one connection each.
+    # Message sends and media transfers use separate connections (lanes, see AsyncTransport): the
+    # flow control window of a connection is shared by its streams, so an upload on the messages
+    # connection would hold back every small send queued behind it.
+    # The HTTP/2 connections are driven by an AsyncTransport on one background event loop and calls
+    # from any thread block on their result: httpx's threaded HTTP/2 client is not safe to share
+    # between threads (stream ids and header compression state race), an event loop has no threads
+    # to race. http1=False skips protocol negotiation and talks HTTP/2 right away (h2c), for local
+    # servers without TLS; over https the protocol is negotiated and falls back to HTTP/1.1 if need be.
+    def __init__(
+            self,
+            base_url: str = GRAPH_URL,
+            max_connections: int = 10,
+            max_media_connections: int = 4,
+            connect_timeout: float = 5.0,
+            read_timeout: float = 30.0,
+            http1: bool = True,
+    ):
+        if httpx is None:
+            raise ImportError("HTTP2Transport requires httpx and h2, install them with `pip install whatsapp[http2]`")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.async_transport = AsyncTransport(
+            base_url,
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            http2=True,
+            http1=http1,
+            max_media_connections=max_media_connections,
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="whatsapp-http2", daemon=True)
+        self._thread.start()
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def request(self, method: str, url: str, **kwargs) -> "HTTP2Response":
+        # accepts the requests keywords the client uses: headers, data, params, stream, timeout
+        data = kwargs.pop("data", None)
+        stream = kwargs.pop("stream", False)
+        timeout = kwargs.pop("timeout", None)
+        headers = kwargs.pop("headers", None)
+        if data is not None and not isinstance(data, (bytes, str)):
+            # a streamed body (MultipartEncoder), its file is read on worker threads, not on the loop
+            if getattr(data, "len", None) is not None:
+                headers = dict(headers or {}, **{"Content-Length": str(data.len)})
+            data = data.__aiter__()
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        with _RequestsErrors():
+            response = self._run(self._send(method, url, data, headers, stream, timeout, kwargs))
+        return HTTP2Response(response, self)
+
+    async def _send(self, method: str, url: str, data, headers, stream: bool, timeout, kwargs: dict):
+        client = self.async_transport.lane(url)
+        request = client.build_request(
+            method, url, headers=headers, content=data, timeout=timeout if timeout is not None else client.timeout,
+            **kwargs,
+        )
+        response = await client.send(request, stream=True)
+        if not stream:
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        return response
+
+    def get(self, url: str, **kwargs) -> "HTTP2Response":
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> "HTTP2Response":
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> "HTTP2Response":
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._run(self.async_transport.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HTTP2Response:
+    # The parts of requests.Response the client uses, over an httpx.Response. Errors are raised as
+    # their requests counterparts so the retry and resume logic written for Transport applies as is.
+    def __init__(self, response: "httpx.Response", transport: HTTP2Transport):
+        self.raw = response
+        self.transport = transport
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def content(self) -> bytes:
+        try:
+            return self.raw.content
+        except httpx.ResponseNotRead:
+            with _RequestsErrors():
+                return self.transport._run(self.raw.aread())
+
+    @property
+    def text(self) -> str:
+        self.content
+        return self.raw.text
+
+    def json(self, **kwargs):
+        self.content
+        return self.raw.json(**kwargs)
+
+    def iter_content(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        chunks = self.raw.aiter_bytes(chunk_size)
+        with _RequestsErrors():
+            while (chunk := self.transport._run(_next(chunks))) is not None:
+                yield chunk
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.HTTPError(f"{self.status_code} {kind} Error for url: {self.url}", response=self)
+
+    def close(self):
+        if not self.raw.is_closed:
+            self.transport._run(self.raw.aclose())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+async def _next(chunks) -> Optional[bytes]:
+    return await anext(chunks, None)
+
+
+class _RequestsErrors:
+    # re-raises httpx transport errors as the requests exceptions Transport would have raised, on the
+    # same side of the line the retry policy draws: failures to connect (the request was not sent)
+    # are a ConnectTimeout or ConnectionError and may be retried, failures once the request went out
+    # (read/write errors, stream resets, read timeouts) may follow a message Meta accepted and are a
+    # ChunkedEncodingError or ReadTimeout, which sends do not replay
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None or not issubclass(exc_type, httpx.TransportError):
+            return False
+        if issubclass(exc_type, httpx.ConnectTimeout):
+            raise requests.exceptions.ConnectTimeout(exc) from exc
+        if issubclass(exc_type, (httpx.ConnectError, httpx.PoolTimeout)):
+            raise requests.ConnectionError(exc) from exc
+        if issubclass(exc_type, httpx.TimeoutException):
+            raise requests.exceptions.ReadTimeout(exc) from exc
+        raise requests.exceptions.ChunkedEncodingError(exc) from exc
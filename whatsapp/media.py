@@ -1,52 +1,270 @@
+import hashlib
 import mimetypes
-from typing_extensions import Optional
+import os
+import time
+from typing import TYPE_CHECKING, Callable, Union
 import requests
-from whatsapp.errors import Handle
+from typing_extensions import Optional
+from whatsapp.transport import Transport
+from whatsapp.download import CHUNK_SIZE, DownloadDestination, MediaDownload, filename_from_headers
+from whatsapp.errors import MediaDownloadFailureException, raise_for_response
 from whatsapp.models import Media, MediaResponse, WhatsappConfig
+from whatsapp.multipart import MultipartEncoder, ProgressCallback, UploadSource
+
+if TYPE_CHECKING:
+    from whatsapp.cache import MediaURLCache, UploadCache
+    from whatsapp.metrics import Instrumentation
+    from whatsapp.retry import Retrier
+    from whatsapp.validation import Preflight
+
+
+def _upload_source(source: UploadSource, mime_type: Optional[str], filename: Optional[str]) -> tuple[str, str]:
+    if isinstance(source, (str, os.PathLike)):
+        if mime_type is None:
+            mime_type = mimetypes.guess_type(source)[0]
+        media = Media(file=source, type=mime_type)
+        return filename or media.file.name, mime_type
+    name = getattr(source, "name", None)
+    filename = filename or (os.path.basename(name) if isinstance(name, str) else "file")
+    if mime_type is None:
+        mime_type = mimetypes.guess_type(filename)[0]
+    if mime_type is None:
+        raise ValueError("mime_type is required when it cannot be guessed from the file name")
+    return filename, mime_type
+
+
+def _content_digest(source: UploadSource) -> Optional[str]:
+    # sha256 of what would be uploaded, None for sources that can only be read once
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    if not hasattr(source, "read") or not hasattr(source, "seek"):
+        return None
+    try:
+        position = source.tell()
+    except (OSError, ValueError):
+        return None
+    hasher = hashlib.sha256()
+    while chunk := source.read(CHUNK_SIZE):
+        hasher.update(chunk)
+    source.seek(position)
+    return hasher.hexdigest()
+
+
+def _rewinder(source: UploadSource) -> Optional[Callable[[], None]]:
+    # how to read the source again for a retried upload, None when it can only be read once
+    if isinstance(source, (str, os.PathLike)):
+        return lambda: None
+    if not hasattr(source, "read") or not hasattr(source, "seek"):
+        return None
+    try:
+        position = source.tell()
+    except (OSError, ValueError):
+        return None
+    return lambda: source.seek(position)
 
 
 class WhatsappMedia:
-    def __init__(self, config: WhatsappConfig):
+    def __init__(
+            self,
+            config: WhatsappConfig,
+            transport: Transport,
+            upload_cache: Optional["UploadCache"] = None,
+            url_cache: Optional["MediaURLCache"] = None,
+            retrier: Optional["Retrier"] = None,
+            instrumentation: Optional["Instrumentation"] = None,
+            preflight: Optional["Preflight"] = None,
+    ):
         self.config = config
+        self.transport = transport
+        self.upload_cache = upload_cache
+        self.url_cache = url_cache
+        self.retrier = retrier
+        self.instrumentation = instrumentation
+        self.preflight = preflight
 
-    def upload_media(self, file_path: str, mime_type: str = None) -> MediaResponse:
-        if mime_type is None:
-            mime_type = mimetypes.guess_type(file_path)[0]
-        media = Media(file=file_path, type=mime_type)
-        files = {
-            "file": (media.file.name, open(file_path, "rb"), mime_type),
-        }
-        r = requests.post(
-            f"{self.config.api_url}/media",
-            headers=self.config.headers,
-            files=files,
-            data={"messaging_product": "whatsapp"}
-        )
+    def upload_media(
+            self,
+            file_path: UploadSource,
+            mime_type: str = None,
+            filename: str = None,
+            file_size: int = None,
+            progress: ProgressCallback = None,
+    ) -> MediaResponse:
+        # file_path may also be a binary file object or an iterable of bytes; the body is streamed
+        # in chunks either way. file_size is only needed for iterables, to send a Content-Length.
+        filename, mime_type = _upload_source(file_path, mime_type, filename)
+        if self.preflight is not None:
+            from whatsapp.validation import upload_size
+
+            self.preflight.check_upload(mime_type, upload_size(file_path, file_size))
+        digest = _content_digest(file_path) if self.upload_cache is not None else None
+        if digest is not None:
+            media_id = self.upload_cache.get(self.config.phone_number_id, mime_type, digest)
+            if media_id is not None:
+                return MediaResponse(id=media_id)
+        if self.retrier is None:
+            response = self._upload_media(file_path, filename, mime_type, file_size, progress)
+        else:
+            rewind = _rewinder(file_path)
+
+            def upload() -> MediaResponse:
+                if rewind is not None:
+                    rewind()
+                return self._upload_media(file_path, filename, mime_type, file_size, progress)
+
+            response = self.retrier.call("media", upload, max_attempts=None if rewind is not None else 1)
+        if digest is not None and response.id is not None:
+            self.upload_cache.set(self.config.phone_number_id, mime_type, digest, response.id)
+        return response
+
+    def _upload_media(
+            self,
+            source: UploadSource,
+            filename: str,
+            mime_type: str,
+            file_size: Optional[int],
+            progress: Optional[ProgressCallback],
+    ) -> MediaResponse:
+        fields = {"messaging_product": "whatsapp"}
+        with MultipartEncoder(fields, source, filename, mime_type, file_size, progress=progress) as body:
+            started = time.perf_counter()
+            try:
+                r = self.transport.post(
+                    f"{self.config.api_url}/media",
+                    headers=self.config.headers | {"Content-Type": body.content_type},
+                    data=body
+                )
+            except Exception as e:
+                if self.instrumentation is not None:
+                    self.instrumentation.observe("media/upload", started, body.sent, error=e)
+                raise
+            if self.instrumentation is not None:
+                self.instrumentation.observe("media/upload", started, body.sent, r)
         if r.status_code != 200:
-            Handle(r.json())
+            raise_for_response(r)
         return MediaResponse(**r.json())
 
     def download_media(self, media_url: str, save: bool = True) -> Optional[tuple[str, bytes]]:
-        #
-        r = requests.get(media_url, headers=self.config.headers)
-        r.raise_for_status()
-        filename = r.headers["Content-Disposition"].split("=")[1]
-        if save:
+        with self.transport.get(media_url, headers=self.config.headers, stream=True) as r:
+            self._raise_for_status(r, media_url)
+            filename = filename_from_headers(r.headers)
+            if not save:
+                return filename, r.content
             with open(filename, "wb") as f:
-                f.write(r.content)
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+
+    def download_media_to(
+            self,
+            media: Union[str, MediaResponse],
+            destination: DownloadDestination,
+            sha256: str = None,
+            resume: bool = True,
+            max_retries: int = 3,
+            progress: Callable[[int, Optional[int]], None] = None,
+    ) -> str:
+        # Streams the media into a path or a writable binary object and returns its sha256 hex digest.
+        # Interrupted transfers continue with a Range request, up to max_retries times, and a path
+        # destination keeps a .part file so a later call can resume it too. The digest is checked
+        # against `sha256`, or against media.sha256 when a MediaResponse is given.
+        if isinstance(media, MediaResponse):
+            media_url, sha256 = media.url, sha256 or media.sha256
         else:
-            return filename, r.content
+            media_url = media
+        download = MediaDownload(destination, sha256, resume, progress)
+        try:
+            attempt = 0
+            while True:
+                started, received = time.perf_counter(), download.offset
+                try:
+                    with self.transport.get(
+                            media_url,
+                            headers=self.config.headers | download.range_headers(),
+                            stream=True,
+                    ) as r:
+                        if r.status_code != 416 or not download.offset:
+                            self._raise_for_status(r, media_url)
+                            download.begin(r.status_code, r.headers)
+                            for chunk in r.iter_content(CHUNK_SIZE):
+                                download.write(chunk)
+                            download.check_complete()
+                    self._observe_download(started, download.offset - received, r)
+                    break
+                except (
+                        requests.ConnectionError,
+                        requests.Timeout,
+                        requests.exceptions.ChunkedEncodingError,
+                        MediaDownloadFailureException,
+                ) as e:
+                    self._observe_download(started, download.offset - received, error=e)
+                    attempt += 1
+                    if attempt > max_retries:
+                        raise
+                except Exception as e:
+                    self._observe_download(started, download.offset - received, error=e)
+                    raise
+            return download.finish()
+        finally:
+            download.close()
 
     def query_media_url(self, media_id: str) -> MediaResponse:
+        if self.url_cache is not None:
+            return self.url_cache.get_or_fetch(media_id, lambda: self._query_media_url(media_id))
+        return self._query_media_url(media_id)
+
+    def _query_media_url(self, media_id: str) -> MediaResponse:
+        if self.retrier is not None:
+            return self.retrier.call("media", lambda: self._get_media(media_id), idempotent=True)
+        return self._get_media(media_id)
+
+    def _get_media(self, media_id: str) -> MediaResponse:
         url = str(self.config.api_url).split(f"{self.config.phone_number_id}")[0] + media_id + "/"
-        r = requests.get(url, headers=self.config.headers)
+        started = time.perf_counter()
+        try:
+            r = self.transport.get(url, headers=self.config.headers)
+        except Exception as e:
+            if self.instrumentation is not None:
+                self.instrumentation.observe("media/query", started, error=e)
+            raise
+        if self.instrumentation is not None:
+            self.instrumentation.observe("media/query", started, response=r)
         if r.status_code != 200:
-            Handle(r.json())
+            raise_for_response(r)
         return MediaResponse(**r.json())
 
     def delete_media(self, media_id: str) -> MediaResponse:
+        if self.retrier is not None:
+            response = self.retrier.call("media", lambda: self._delete_media(media_id), idempotent=True)
+        else:
+            response = self._delete_media(media_id)
+        if self.upload_cache is not None:
+            self.upload_cache.invalidate(media_id)
+        if self.url_cache is not None:
+            self.url_cache.invalidate(media_id)
+        return response
+
+    def _delete_media(self, media_id: str) -> MediaResponse:
         url = str(self.config.api_url).split(f"{self.config.phone_number_id}")[0] + media_id + "/"
-        r = requests.delete(url, headers=self.config.headers)
+        started = time.perf_counter()
+        try:
+            r = self.transport.delete(url, headers=self.config.headers)
+        except Exception as e:
+            if self.instrumentation is not None:
+                self.instrumentation.observe("media/delete", started, error=e)
+            raise
+        if self.instrumentation is not None:
+            self.instrumentation.observe("media/delete", started, response=r)
         if r.status_code != 200:
-            Handle(r.json())
+            raise_for_response(r)
         return MediaResponse(**r.json())
+
+    def _observe_download(self, started: float, received: int, r=None, error: Optional[Exception] = None):
+        if self.instrumentation is not None:
+            self.instrumentation.observe("media/download", started, 0, r, error, bytes_received=received)
+
+    def _raise_for_status(self, r, media_url: str):
+        # an expired or revoked media url: the cached lookup that produced it is stale too
+        if r.status_code in (401, 404) and self.url_cache is not None:
+            self.url_cache.invalidate_url(media_url)
+        r.raise_for_status()
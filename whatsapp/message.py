@@ -1,13 +1,50 @@
-from typing import Union
-from whatsapp.errors import Handle
+import time
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+from whatsapp.bulk import BulkSend
+from whatsapp.errors import ChatExpiredException, ThrottlingException, raise_for_response
 from whatsapp.models import Message, WhatsappConfig, MessageResponse, MessageTypeProperties, Location
-import requests
+from whatsapp import payloads
+from whatsapp.payloads import EncodedMessage, JSONCodec
+from whatsapp.ratelimit import RateLimiter
+from whatsapp.transport import Transport
+
+if TYPE_CHECKING:
+    from whatsapp.metrics import Instrumentation
+    from whatsapp.receipts import ReadReceipts
+    from whatsapp.retry import Retrier
+    from whatsapp.templates import Template, Values
+    from whatsapp.validation import Preflight
+    from whatsapp.window import ConversationWindows
 
 
 class WhatsAppMessage:
-    def __init__(self, config: WhatsappConfig):
+    def __init__(
+            self,
+            config: WhatsappConfig,
+            transport: Transport,
+            limiter: Optional[RateLimiter] = None,
+            fast_path: bool = False,
+            codec: Optional[JSONCodec] = None,
+            retrier: Optional["Retrier"] = None,
+            instrumentation: Optional["Instrumentation"] = None,
+            preflight: Optional["Preflight"] = None,
+    ):
         self.config = config
+        self.transport = transport
+        self.limiter = limiter
+        # fast_path builds payload dicts directly from trusted arguments, skipping pydantic validation
+        self.fast_path = fast_path
+        self.codec = codec if codec is not None else JSONCodec()
+        self.retrier = retrier
+        self.instrumentation = instrumentation
+        # checks payloads locally before they use a round trip, see whatsapp.validation
+        self.preflight = preflight
         self.url = "/messages"
+        # set by WhatsApp(read_receipt_window=...), see mark_as_read
+        self.receipts: Optional["ReadReceipts"] = None
+        # set by WhatsApp(windows=...): free-form sends outside the customer service window fail
+        # fast with ChatExpiredException instead of using a round trip, see whatsapp.window
+        self.windows: Optional["ConversationWindows"] = None
 
     def reply_text(
             self,
@@ -16,6 +53,8 @@ class WhatsAppMessage:
             message_id: str,
             recipient_type: str = "individual",
     ) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.reply_text(to, body, message_id, recipient_type))
         message = Message(
             recipient_type=recipient_type,
             to=to,
@@ -25,7 +64,22 @@ class WhatsAppMessage:
         )
         return self.send_message(message)
 
-    def mark_as_read(self, message_id: str) -> MessageResponse:
+    def mark_as_read(
+            self,
+            message_id: str,
+            sender: Optional[str] = None,
+            timestamp: Optional[int] = None,
+    ) -> Optional[MessageResponse]:
+        # with read receipt coalescing enabled and the sender given, the receipt is only scheduled:
+        # the newest message of the conversation is marked once the burst is over, and None is returned
+        if sender is not None and self.receipts is not None:
+            self.receipts.schedule(sender, message_id, timestamp)
+            return None
+        return self._mark_as_read(message_id)
+
+    def _mark_as_read(self, message_id: str) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.read_receipt(message_id))
         message = Message(
             status="read",
             message_id=message_id,
@@ -39,6 +93,8 @@ class WhatsAppMessage:
             recipient_type: str = "individual",
             preview_url: bool = True
     ) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.text(to, body, recipient_type, preview_url))
         message = Message(
             recipient_type=recipient_type,
             to=to,
@@ -54,6 +110,8 @@ class WhatsAppMessage:
             caption: str = None,
             recipient_type: str = "individual",
     ) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.media("video", to, media_id, caption, recipient_type=recipient_type))
         message = Message(
             recipient_type=recipient_type,
             to=to,
@@ -69,11 +127,13 @@ class WhatsAppMessage:
             caption: str = None,
             recipient_type: str = "individual",
     ) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.media("image", to, media_id, caption, recipient_type=recipient_type))
         message = Message(
             recipient_type=recipient_type,
             to=to,
             type="image",
-            video=MessageTypeProperties(id=media_id, caption=caption)
+            image=MessageTypeProperties(id=media_id, caption=caption)
         )
         return self.send_message(message)
 
@@ -83,11 +143,13 @@ class WhatsAppMessage:
             media_id: str,
             recipient_type: str = "individual",
     ) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.media("audio", to, media_id, recipient_type=recipient_type))
         message = Message(
             recipient_type=recipient_type,
             to=to,
-            type="image",
-            video=MessageTypeProperties(id=media_id)
+            type="audio",
+            audio=MessageTypeProperties(id=media_id)
         )
         return self.send_message(message)
 
@@ -99,11 +161,13 @@ class WhatsAppMessage:
             filename: str = None,
             recipient_type: str = "individual",
     ) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.media("document", to, media_id, caption, filename, recipient_type))
         message = Message(
             recipient_type=recipient_type,
             to=to,
             type="document",
-            video=MessageTypeProperties(id=media_id, caption=caption, filename=filename)
+            document=MessageTypeProperties(id=media_id, caption=caption, filename=filename)
         )
         return self.send_message(message)
 
@@ -113,6 +177,8 @@ class WhatsAppMessage:
             sticker_id: str,
             recipient_type: str = "individual",
     ) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.media("sticker", to, sticker_id, recipient_type=recipient_type))
         message = Message(
             recipient_type=recipient_type,
             to=to,
@@ -133,6 +199,8 @@ class WhatsAppMessage:
             address: str = None,
             recipient_type: str = "individual",
     ) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.location(to, latitude, longitude, name, address, recipient_type))
         message = Message(
             recipient_type=recipient_type,
             to=to,
@@ -148,6 +216,8 @@ class WhatsAppMessage:
             emoji: str = None,
             recipient_type: str = "individual",
     ) -> MessageResponse:
+        if self.fast_path:
+            return self.send_message(payloads.reaction(to, message_id, emoji, recipient_type))
         message = Message(
             recipient_type=recipient_type,
             to=to,
@@ -156,14 +226,131 @@ class WhatsAppMessage:
         )
         return self.send_message(message)
 
-    def send_message(self, data: Union[dict[str, str], Message]) -> MessageResponse:
+    def send_template(
+            self,
+            to: str,
+            template: Union[str, "Template"],
+            values: "Values" = (),
+            language: str = "en_US",
+            components: Optional[list[dict]] = None,
+            recipient_type: str = "individual",
+    ) -> MessageResponse:
+        # a compiled Template is rendered with `values`; a template name is sent with `components`
+        # as given ({"type": "body", "parameters": [...]}, ...)
+        if not isinstance(template, str):
+            return self.send_message(template.render(to, values))
+        if self.fast_path:
+            return self.send_message(payloads.template(to, template, language, components, recipient_type))
+        properties = {"name": template, "language": {"code": language}}
+        if components:
+            properties["components"] = components
+        message = Message(
+            recipient_type=recipient_type,
+            to=to,
+            type="template",
+            template=properties,
+        )
+        return self.send_message(message)
+
+    def send_in_window(
+            self,
+            data: Union[dict[str, str], Message],
+            template: Union[str, "Template"],
+            values: "Values" = (),
+            language: str = "en_US",
+            components: Optional[list[dict]] = None,
+    ) -> MessageResponse:
+        # sends the free-form message if the recipient's customer service window is open, the
+        # template (as send_template) otherwise or if the API answers that the window is closed
         if isinstance(data, Message):
             data = data.model_dump(exclude_none=True)
-        r = requests.post(
-            f"{self.config.api_url}/messages",
-            headers=self.config.headers | {"Content-Type": "application/json"},
-            json=data
-        )
+        to = data["to"]
+        if self.windows is None or self.windows.is_open(to):
+            try:
+                return self.send_message(data)
+            except ChatExpiredException:
+                pass
+        return self.send_template(to, template, values, language, components, data.get("recipient_type", "individual"))
+
+    def send_bulk(self, messages: Iterable[Union[dict[str, str], Message, EncodedMessage]], concurrency: int = 8) -> BulkSend:
+        return BulkSend(self.send_raw, messages, concurrency)
+
+    def send_message(
+            self,
+            data: Union[dict[str, str], Message, EncodedMessage],
+            idempotency_key: Optional[str] = None,
+    ) -> MessageResponse:
+        return MessageResponse(**self.send_raw(data, idempotency_key))
+
+    def send_raw(
+            self,
+            data: Union[dict[str, str], Message, EncodedMessage],
+            idempotency_key: Optional[str] = None,
+    ) -> dict:
+        # send_message returning the JSON response as is, for callers that do not need the model.
+        # idempotency_key: sending again with the same key returns the first response instead of
+        # sending a duplicate (needs a retrier, which keeps the responses)
+        if isinstance(data, Message):
+            data = data.model_dump(exclude_none=True)
+        if self.preflight is not None:
+            self.preflight.check_message(data)
+        windows = self.windows
+        # data may be an EncodedMessage, which answers get() but not subscripts
+        to = data.get("to")
+        if windows is not None and _free_form(data):
+            windows.check(to)
+        if self.retrier is None and idempotency_key is not None:
+            raise ValueError("idempotency keys need a retrier")
+        try:
+            if self.retrier is None:
+                return self._send_message(data)
+            return self.retrier.call("messages", lambda: self._send_message(data), idempotency_key)
+        except ChatExpiredException:
+            if windows is not None and to is not None:
+                windows.expire(to)
+            raise
+
+    def _send_message(self, data: dict) -> dict:
+        if self.limiter is None:
+            return self._post_message(data)
+        to = data.get("to")
+        queued = time.perf_counter()
+        self.limiter.acquire(self.config.phone_number_id, to)
+        try:
+            response = self._post_message(data, time.perf_counter() - queued)
+        except ThrottlingException as e:
+            self.limiter.on_throttle(self.config.phone_number_id, to, e)
+            raise
+        self.limiter.on_success(self.config.phone_number_id, to)
+        return response
+
+    def _post_message(self, data: dict, queue_wait: float = 0.0) -> dict:
+        body = data.body if isinstance(data, EncodedMessage) else self.codec.dumps(data)
+        started = time.perf_counter()
+        try:
+            r = self.transport.post(
+                f"{self.config.api_url}/messages",
+                headers=self.config.headers | {"Content-Type": self.codec.content_type},
+                data=body
+            )
+        except Exception as e:
+            if self.instrumentation is not None:
+                self.instrumentation.observe(
+                    "messages", started, len(body), error=e,
+                    message_type=data.get("type", data.get("status")), queue_wait=queue_wait,
+                )
+            raise
+        if self.instrumentation is not None:
+            self.instrumentation.observe(
+                "messages", started, len(body), r,
+                message_type=data.get("type", data.get("status")), queue_wait=queue_wait,
+            )
         if r.status_code != 200:
-            Handle(r.json())
-        return MessageResponse(**r.json())
+            raise_for_response(r)
+        return r.json()
+
+
+def _free_form(data: dict) -> bool:
+    # a message needing an open customer service window: anything sent to someone but a template
+    type_ = data.get("type")
+    return type_ is not None and type_ != "template" and data.get("to") is not None
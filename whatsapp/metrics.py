@@ -0,0 +1,211 @@
+import math
+import threading
+import time
+from array import array
+from typing import Any, Callable, Optional, Union
+from whatsapp.errors import pairings
+
+
+class Call:
+    # One API request as seen by the client. queue_wait is the time spent waiting for the rate
+    # limiter before the request, wire_time the request itself (connect, upload, response).
+    __slots__ = (
+        "endpoint", "message_type", "status_code", "error_code", "error",
+        "queue_wait", "wire_time", "bytes_sent", "bytes_received",
+    )
+
+    def __init__(
+            self,
+            endpoint: str,
+            message_type: Optional[str],
+            status_code: Optional[int],
+            error_code: Optional[int],
+            error: Optional[BaseException],
+            queue_wait: float,
+            wire_time: float,
+            bytes_sent: int,
+            bytes_received: int,
+    ):
+        self.endpoint = endpoint
+        self.message_type = message_type
+        self.status_code = status_code
+        self.error_code = error_code
+        self.error = error
+        self.queue_wait = queue_wait
+        self.wire_time = wire_time
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status_code is not None and self.status_code < 400
+
+
+def _error_code(response: Any) -> Optional[int]:
+    try:
+        code = response.json()["error"]["code"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return code if isinstance(code, int) else None
+
+
+class Instrumentation:
+    # Gets a Call for every request to the API. Pass callbacks, or subclass and override on_call.
+    # Clients built without instrumentation skip all of this, the only cost left is a None check.
+    def __init__(self, *callbacks: Callable[[Call], None]):
+        self.callbacks = list(callbacks)
+
+    def on_call(self, call: Call):
+        for callback in self.callbacks:
+            callback(call)
+
+    def observe(
+            self,
+            endpoint: str,
+            started: float,
+            bytes_sent: int = 0,
+            response: Any = None,
+            error: Optional[BaseException] = None,
+            message_type: Optional[str] = None,
+            queue_wait: float = 0.0,
+            bytes_received: Optional[int] = None,
+    ):
+        # started is the time.perf_counter() taken right before the request
+        wire_time = time.perf_counter() - started
+        status_code = error_code = None
+        if response is not None:
+            status_code = response.status_code
+            if bytes_received is None:
+                bytes_received = len(response.content)
+            if status_code >= 400:
+                error_code = _error_code(response)
+        elif error is not None and isinstance(error.args[0] if error.args else None, dict):
+            error_code = error.args[0].get("code")
+        self.on_call(Call(
+            endpoint, message_type, status_code, error_code, error,
+            queue_wait, wire_time, bytes_sent, bytes_received or 0,
+        ))
+
+
+class Histogram:
+    # Log bucketed histogram of durations: 8 buckets per doubling from 1µs, so quantiles are within
+    # ~9% of the true value, in a fixed 2 KiB whatever the number of samples.
+    __slots__ = ("counts", "count", "total", "max")
+    BUCKETS_PER_DOUBLING = 8
+    SIZE = 256  # 1µs * 2 ** (256 / 8) is over an hour
+    UNIT = 1e-6
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * self.SIZE))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        if seconds > self.UNIT:
+            index = min(self.SIZE - 1, int(math.log2(seconds / self.UNIT) * self.BUCKETS_PER_DOUBLING) + 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                # upper bound of the bucket, never more than the largest sample
+                return min(self.max, self.UNIT * 2 ** (index / self.BUCKETS_PER_DOUBLING))
+        return self.max
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class _EndpointStats:
+    __slots__ = ("calls", "errors", "bytes_sent", "bytes_received", "wire", "queue")
+
+    def __init__(self):
+        self.calls = self.errors = self.bytes_sent = self.bytes_received = 0
+        self.wire = Histogram()
+        self.queue = Histogram()
+
+
+class MetricsRegistry(Instrumentation):
+    # In process aggregation of the calls: latency histograms per endpoint and per message type,
+    # byte counts, error counts by Graph error code. snapshot() returns plain dicts, durations in seconds.
+    def __init__(self, *callbacks: Callable[[Call], None]):
+        super().__init__(*callbacks)
+        self._endpoints: dict[str, _EndpointStats] = {}
+        self._message_types: dict[str, Histogram] = {}
+        self._errors: dict[Union[int, str], int] = {}
+        self._lock = threading.Lock()
+
+    def on_call(self, call: Call):
+        with self._lock:
+            stats = self._endpoints.get(call.endpoint)
+            if stats is None:
+                stats = self._endpoints[call.endpoint] = _EndpointStats()
+            stats.calls += 1
+            stats.bytes_sent += call.bytes_sent
+            stats.bytes_received += call.bytes_received
+            stats.wire.add(call.wire_time)
+            stats.queue.add(call.queue_wait)
+            if call.message_type is not None:
+                histogram = self._message_types.get(call.message_type)
+                if histogram is None:
+                    histogram = self._message_types[call.message_type] = Histogram()
+                histogram.add(call.queue_wait + call.wire_time)
+            if not call.ok:
+                stats.errors += 1
+                if call.error_code is not None:
+                    key = call.error_code
+                elif call.error is not None:
+                    key = type(call.error).__name__
+                else:
+                    key = f"HTTP {call.status_code}"
+                self._errors[key] = self._errors.get(key, 0) + 1
+        super().on_call(call)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                "endpoints": {
+                    endpoint: {
+                        "calls": stats.calls,
+                        "errors": stats.errors,
+                        "bytes_sent": stats.bytes_sent,
+                        "bytes_received": stats.bytes_received,
+                        "wire": stats.wire.snapshot(),
+                        "queue": stats.queue.snapshot(),
+                    }
+                    for endpoint, stats in self._endpoints.items()
+                },
+                "message_types": {type_: histogram.snapshot() for type_, histogram in self._message_types.items()},
+                "errors": {
+                    key: {
+                        "count": count,
+                        "exception": pairings[key].__name__ if key in pairings else None,
+                    }
+                    for key, count in self._errors.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._message_types.clear()
+            self._errors.clear()
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, Optional
+
+# Local stand-in for the Graph API endpoints the client talks to, for benchmarks and tests that
+# cannot reach graph.facebook.com:
+#
+#   POST   /<version>/<phone_number_id>/messages   message ids, or {"success": true} for read receipts
+#   POST   /<version>/<phone_number_id>/media      drains the multipart body, returns a media id
+#   GET    /<version>/<media_id>                   media url, mime type, sha256 and size
+#   DELETE /<version>/<media_id>                   {"success": true}
+#   GET    /download/<media_id>                    `media_size` bytes, Range requests supported
+#
+# Every request waits `latency` plus up to `jitter` seconds, then fails with probability
+# `error_rate` using one of `error_codes`: 500-599 are HTTP statuses answered with a non JSON body
+# (like a failing proxy), the others are Graph error codes answered with HTTP 400.
+
+_MESSAGES = re.compile(r"^/v[\d.]+/[^/]+/messages/?$")
+_UPLOAD = re.compile(r"^/v[\d.]+/[^/]+/media/?$")
+_MEDIA = re.compile(r"^/v[\d.]+/(\d+)/?$")
+_DOWNLOAD = re.compile(r"^/download/(\d+)$")
+_BLOCK = 64 * 1024
+
+
+class MockGraphAPI:
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 0,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            error_codes: Iterable[int] = (130429, 131016, 503),
+            media_size: int = 5 * 1024 * 1024,
+            mime_type: str = "image/jpeg",
+            seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.media_size = media_size
+        self.mime_type = mime_type
+        self.requests: Counter[str] = Counter()
+        self.bytes_received = 0
+        self._random = random.Random(seed)
+        self._block = random.Random(seed).randbytes(_BLOCK)
+        self._sha256: Optional[str] = None
+        self._ids = iter(range(10 ** 15, 10 ** 16))
+        self._lock = threading.Lock()
+        handler = type("Handler", (_Handler,), {"api": self})
+        self.server = _Server((host, port), handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def media_sha256(self) -> str:
+        if self._sha256 is None:
+            hasher = hashlib.sha256()
+            for chunk in self.media_chunks(0, self.media_size):
+                hasher.update(chunk)
+            self._sha256 = hasher.hexdigest()
+        return self._sha256
+
+    def media_chunks(self, start: int, end: int):
+        # bytes [start, end) of the served media: a pseudo random block repeated
+        while start < end:
+            offset = start % _BLOCK
+            chunk = self._block[offset:min(_BLOCK, offset + end - start)]
+            start += len(chunk)
+            yield chunk
+
+    def next_id(self) -> str:
+        with self._lock:
+            return str(next(self._ids))
+
+    def failure(self) -> Optional[int]:
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._random.choice(self.error_codes)
+            return None
+
+    def delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def start(self) -> "MockGraphAPI":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.server.serve_forever, name="whatsapp-mock-graph", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
+
+    def __enter__(self) -> "MockGraphAPI":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes, without this every response waits for a delayed ACK
+    disable_nagle_algorithm = True
+    api: MockGraphAPI
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while size := int(self.rfile.readline().split(b";")[0].strip() or b"0", 16):
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            self.rfile.readline()
+            body = b"".join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.api._lock:
+            self.api.bytes_received += len(body)
+        return body
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data: dict, status: int = 200):
+        self._send(status, json.dumps(data).encode())
+
+    def _begin(self, endpoint: str) -> bool:
+        # counts the request, waits, and answers an injected failure; False when one was sent
+        with self.api._lock:
+            self.api.requests[endpoint] += 1
+        delay = self.api.delay()
+        if delay:
+            time.sleep(delay)
+        code = self.api.failure()
+        if code is None:
+            return True
+        if 500 <= code < 600:
+            self._send(code, b"<html><body>mock server error</body></html>", "text/html")
+        else:
+            self._json({"error": {"message": f"mock error {code}", "type": "OAuthException", "code": code}}, 400)
+        return False
+
+    def do_POST(self):
+        body = self._body()
+        if _MESSAGES.match(self.path):
+            if not self._begin("messages"):
+                return
+            data = json.loads(body or b"{}")
+            if data.get("status") == "read":
+                return self._json({"success": True})
+            to = str(data.get("to", ""))
+            return self._json({
+                "messaging_product": "whatsapp",
+                "contacts": [{"input": to, "wa_id": to.lstrip("+")}],
+                "messages": [{"id": f"wamid.{self.api.next_id()}"}],
+            })
+        if _UPLOAD.match(self.path):
+            if not self._begin("media/upload"):
+                return
+            return self._json({"id": self.api.next_id()})
+        self._json({"error": {"message": "unknown path", "code": 100}}, 404)
+
+    def do_GET(self):
+        if match := _DOWNLOAD.match(self.path):
+            if self._begin("media/download"):
+                self._download(match.group(1))
+            return
+        if match := _MEDIA.match(self.path.split("?")[0]):
+            if not self._begin("media/query"):
+                return
+            media_id = match.group(1)
+            return self._json({
+                "messaging_product": "whatsapp",
+                "url": f"{self.api.url}/download/{media_id}",
+                "mime_type": self.api.mime_type,
+                "sha256": self.api.media_sha256,
+                "file_size": self.api.media_size,
+                "id": media_id,
+            })
+        self._json({"error": {"message": "unknown path", "code": 100}}, 404)
+
+    def do_DELETE(self):
+        if _MEDIA.match(self.path):
+            if self._begin("media/delete"):
+                self._json({"success": True})
+            return
+        self._json({"error": {"message": "unknown path", "code": 100}}, 404)
+
+    def _download(self, media_id: str):
+        size = self.api.media_size
+        start, status = 0, 200
+        if match := re.match(r"bytes=(\d+)-$", self.headers.get("Range", "")):
+            start = int(match.group(1))
+            if start >= size:
+                return self._send(416, b"", headers={"Content-Range": f"bytes */{size}"})
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", self.api.mime_type)
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("Content-Disposition", f'attachment; filename="{media_id}.jpg"')
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.end_headers()
+        try:
+            for chunk in self.api.media_chunks(start, size):
+                self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
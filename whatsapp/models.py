@@ -1,34 +1,52 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field, EmailStr, field_validator, FilePath, HttpUrl
+from typing import Any, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator, FilePath
+from whatsapp.version import resolver
 
 
 class WhatsappConfig(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     token: str = Field(description="Token for WhatsApp cloud API")
     phone_number_id: str = Field(description="phone numbers ID")
     verify_token: str = Field(description="Your whatsapp api verify token")
+    app_secret: Optional[str] = Field(default=None, description="App secret used to sign webhook payloads")
     version: str = Field(default="latest", description="Whatsapp API version")
-    api_url: HttpUrl = Field(description="Whatsapp API url")
+    base_url: str = Field(default="https://graph.facebook.com", description="Graph API base url")
     headers: dict[str, str] = Field(description="Whatsapp API headers")
 
+    @property
+    def api_url(self) -> str:
+        # "latest" is resolved on each use through the process wide (memory and disk) cached resolver, a
+        # cache hit is a clock check: the url follows the resolver's ttl and a fallback version is retried
+        return f"{self.base_url}/{resolver.resolve(self.version)}/{self.phone_number_id}"
+
 
 class MessageResponseContact(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     input: str
     wa_id: str
 
 
 class MessageResponseMessage(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     id: str
 
 
 class MessageResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     messaging_product: Optional[str] = Field(default=None)
-    contacts: Optional[MessageResponseContact] = Field(default=None)
-    messages: Optional[MessageResponseMessage] = Field(default=None)
+    contacts: Optional[list[MessageResponseContact]] = Field(default=None)
+    messages: Optional[list[MessageResponseMessage]] = Field(default=None)
     success: Optional[bool] = Field(default=None)
 
 
 class ContactAddress(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     street: Optional[str] = Field(description="Street address of the contact")
     city: Optional[str] = Field(description="City where the contact resides")
     state: Optional[str] = Field(description="Two-letter state code")
@@ -39,11 +57,26 @@ class ContactAddress(BaseModel):
 
 
 class ContactEmail(BaseModel):
-    email: Optional[EmailStr] = Field(description="Email address of the contact")
+    model_config = ConfigDict(defer_build=True)
+
+    email: Optional[str] = Field(description="Email address of the contact")
     type: Optional[str] = Field(description="Type of email, such as home or work")
 
+    @field_validator("email")
+    def email_validator(cls, value: Optional[str]) -> Optional[str]:
+        # email-validator is only imported once a contact email is actually validated
+        if value is None:
+            return value
+        from email_validator import EmailNotValidError, validate_email
+        try:
+            return validate_email(value, check_deliverability=False).normalized
+        except EmailNotValidError as e:
+            raise ValueError(f"value is not a valid email address: {e}")
+
 
 class ContactName(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     formated_name: str = Field(
         description="Contact's formatted name. This will appear in the message alongside the profile arrow button")
     first_name: Optional[str] = Field(description="Contact's first name.")
@@ -54,12 +87,16 @@ class ContactName(BaseModel):
 
 
 class ContactOrganization(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     company: Optional[str] = Field(description="Name of the company where the contact works")
     department: Optional[str] = Field(description="Department within the company")
     title: Optional[str] = Field(description="Contact's job title.")
 
 
 class ContactPhone(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     phone: Optional[str] = Field(description="WhatsApp user phone number.")
     type: Optional[str] = Field(
         description="Type of phone number. For example, cell, mobile, main, iPhone, home, work, etc.")
@@ -70,12 +107,16 @@ class ContactPhone(BaseModel):
 
 
 class ContactUrl(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     url: Optional[str] = Field(description="Website URL associated with the contact or their company")
     type: Optional[str] = Field(
         description="Type of website. For example, company, work, personal, Facebook Page, Instagram, etc.")
 
 
 class Contact(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     addresses: Optional[list[ContactAddress]] = Field(description="Whatsapp contact address")
     birthday: Optional[str] = Field(description="Contact's birthday in YYYY-MM-DD format.")
     emails: Optional[list[ContactEmail]] = Field(description="Email address of the contact")
@@ -94,6 +135,8 @@ class Contact(BaseModel):
 
 
 class Location(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     latitude: str = Field(description="Location latitude in decimal degrees")
     longitude: str = Field(description="Location longitude in decimal degrees")
     name: Optional[str] = Field(description="Location name")
@@ -101,6 +144,8 @@ class Location(BaseModel):
 
 
 class MessageTypeProperties(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     id: Optional[str] = Field(default=None, description="Whatsapp media ID")
     caption: Optional[str] = Field(default=None, description="Whatsapp media caption")
     filename: Optional[str] = Field(default=None, description="Whatsapp media filename")
@@ -111,10 +156,14 @@ class MessageTypeProperties(BaseModel):
 
 
 class InteractiveAction(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     name: Optional[str] = Field(default=None, description="Whatsapp interactive action name")
 
 
 class InteractiveMessage(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     type: Optional[str] = Field(
         default=None,
         description="Whatsapp interactive header type",
@@ -125,6 +174,8 @@ class InteractiveMessage(BaseModel):
 
 
 class Interactive(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     type: str = Field(
         description="Whatsapp interactive mode",
         examples=["list", "cta_url", "flow", "button", "location_request_message"]
@@ -142,6 +193,8 @@ class Interactive(BaseModel):
 
 
 class Message(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     messaging_product: str = Field(default="whatsapp", description="Whatsapp messaging product", examples=["whatsapp"])
     status: Optional[str] = Field(default=None, description="Whatsapp messaging status")
     message_id: Optional[str] = Field(default=None, description="Whatsapp messaging ID")
@@ -164,14 +217,19 @@ class Message(BaseModel):
     context: Optional[MessageTypeProperties] = Field(default=None, description="Whatsapp message reply context")
     contact: Optional[list[Contact]] = Field(default=None, description="Whatsapp contact list")
     location: Optional[Location] = Field(default=None, description="Whatsapp message location")
+    template: Optional[dict[str, Any]] = Field(default=None, description="Whatsapp message template")
 
 
 class Media(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     file: FilePath = Field(description="Path to an existing file")
     type: str = Field(description="File mime type")
 
 
 class MediaResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     messaging_product: Optional[str] = Field(default=None)
     url: Optional[str] = Field(default=None)
     mime_type: Optional[str] = Field(default=None)
@@ -180,3 +238,15 @@ class MediaResponse(BaseModel):
     id: Optional[str] = Field(default=None)
     success: Optional[bool] = Field(default=None)
 
+
+class BulkStats(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
+    total: int = Field(default=0, description="Number of messages sent or attempted")
+    succeeded: int = Field(default=0, description="Number of messages accepted by the API")
+    failed: int = Field(default=0, description="Number of messages that raised")
+    elapsed: float = Field(default=0.0, description="Wall time of the whole run in seconds")
+
+    @property
+    def throughput(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
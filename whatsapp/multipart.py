@@ -0,0 +1,126 @@
+import os
+import uuid
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Union
+
+UploadSource = Union[str, os.PathLike, BinaryIO, Iterable[bytes]]
+ProgressCallback = Callable[[int, Optional[int]], None]
+CHUNK_SIZE = 256 * 1024
+
+
+def _remaining_size(file: BinaryIO) -> Optional[int]:
+    try:
+        position = file.tell()
+        end = os.fstat(file.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        try:
+            position = file.tell()
+            end = file.seek(0, os.SEEK_END)
+            file.seek(position)
+        except (AttributeError, OSError, ValueError):
+            return None
+    return max(0, end - position)
+
+
+class MultipartEncoder:
+    # A multipart/form-data body with a single file part that is read `chunk_size` bytes at a
+    # time, so memory stays constant whatever the file size. It exposes read() for requests
+    # (and `len` so a Content-Length is sent when the size is known) and __iter__/__aiter__ for httpx.
+    # Files opened from a path are closed once the body has been fully read or close() is called,
+    # file-like objects passed in are left open for their owner.
+    def __init__(
+            self,
+            fields: dict[str, str],
+            source: UploadSource,
+            filename: str,
+            content_type: str,
+            file_size: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE,
+            progress: Optional[ProgressCallback] = None,
+    ):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self._owned = isinstance(source, (str, os.PathLike))
+        if self._owned:
+            self._file = open(source, "rb")
+            self._chunks = None
+            file_size = os.fstat(self._file.fileno()).st_size
+        elif hasattr(source, "read"):
+            self._file = source
+            self._chunks = None
+            if file_size is None:
+                file_size = _remaining_size(source)
+        else:
+            self._file = None
+            self._chunks = iter(source)
+
+        head = b"".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            for name, value in fields.items()
+        )
+        filename = filename.replace('"', "%22")
+        head += (
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self._head = head
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.file_size = file_size
+        self.len = len(head) + file_size + len(self._tail) if file_size is not None else None
+        self.sent = 0
+        self._buffer = b""
+        self._offset = 0
+        self._parts = self._iter_parts()
+
+    def _iter_parts(self) -> Iterator[bytes]:
+        yield self._head
+        if self._file is not None:
+            read = self._file.read
+            while chunk := read(self.chunk_size):
+                yield chunk
+        else:
+            for chunk in self._chunks:
+                if chunk:
+                    yield bytes(chunk)
+        yield self._tail
+        self.close()
+
+    def _next_part(self) -> bytes:
+        part = next(self._parts, b"")
+        if part:
+            self.sent += len(part)
+            if self.progress is not None:
+                self.progress(self.sent, self.len)
+        return part
+
+    def read(self, size: int = -1) -> bytes:
+        # may return fewer than `size` bytes, b"" means the body is exhausted
+        if size is None or size < 0:
+            data = self._buffer[self._offset:] + b"".join(iter(self._next_part, b""))
+            self._buffer, self._offset = b"", 0
+            return data
+        if self._offset >= len(self._buffer):
+            self._buffer, self._offset = self._next_part(), 0
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._next_part, b"")
+
+    async def __aiter__(self):
+        import asyncio
+
+        while part := await asyncio.to_thread(self._next_part):
+            yield part
+
+    def close(self):
+        if self._owned and not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
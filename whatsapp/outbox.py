@@ -0,0 +1,349 @@
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, Iterator, Optional, Union
+from whatsapp.bulk import BulkSend
+from whatsapp.errors import ThrottlingException
+from whatsapp.models import BulkStats, Message, MessageResponse
+from whatsapp.retry import RetryPolicy
+
+PENDING, CLAIMED, SENT, FAILED = 0, 1, 2, 3
+STATES = {PENDING: "pending", CLAIMED: "claimed", SENT: "sent", FAILED: "failed"}
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY,
+        key TEXT UNIQUE,
+        payload TEXT NOT NULL,
+        state INTEGER NOT NULL DEFAULT 0,
+        lease_until REAL,
+        worker TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        not_before REAL,
+        message_id TEXT,
+        error TEXT,
+        created REAL NOT NULL,
+        updated REAL
+    )""",
+    # partial indexes: only the rows a claim looks at are indexed, sent rows cost nothing
+    "CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (id) WHERE state = 0",
+    "CREATE INDEX IF NOT EXISTS outbox_claimed ON outbox (lease_until) WHERE state = 1",
+    "CREATE INDEX IF NOT EXISTS outbox_message_id ON outbox (message_id) WHERE message_id IS NOT NULL",
+)
+
+
+class OutboxItem:
+    __slots__ = ("id", "message", "attempts")
+
+    def __init__(self, id: int, message: dict, attempts: int):
+        self.id = id
+        self.message = message
+        self.attempts = attempts
+
+    def __repr__(self) -> str:
+        return f"<OutboxItem id={self.id} attempts={self.attempts}>"
+
+
+class Outbox:
+    # Durable queue of outbound messages in a SQLite file (WAL mode, synchronous=NORMAL), shareable by
+    # worker processes. enqueue() stores messages; drain() claims them in batches under a lease, sends
+    # them and records the returned message id. A draining worker renews the leases of the messages
+    # it holds; those of a worker that dies expire after `lease` seconds and are picked up by the
+    # next claim, so a restarted worker resumes where it stopped. Messages failing with a transient
+    # error wait retry_base_delay * 2**(attempts - 1) seconds (up to retry_max_delay, jittered)
+    # before they can be claimed again.
+    # Delivery is at least once: messages sent but not yet marked when a worker dies are sent again.
+    def __init__(
+            self,
+            path: Union[str, os.PathLike],
+            lease: float = 60.0,
+            timeout: float = 30.0,
+            retry_base_delay: float = 1.0,
+            retry_max_delay: float = 300.0,
+    ):
+        import sqlite3
+
+        self.path = os.fspath(path)
+        self.lease = lease
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # in WAL mode NORMAL only syncs at checkpoints: a commit is a write(), not an fsync
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction():
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+            # outboxes created before retries were delayed
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+            if "not_before" not in columns:
+                self._db.execute("ALTER TABLE outbox ADD COLUMN not_before REAL")
+
+    def _transaction(self):
+        return _Transaction(self._db, self._lock)
+
+    def enqueue(self, messages: Iterable[Union[dict, Message]], keys: Optional[Iterable[str]] = None) -> int:
+        # one transaction for the whole batch; messages whose key is already in the outbox are
+        # skipped, so enqueueing a campaign twice does not send it twice. Returns the number added.
+        now = time.time()
+        rows = (
+            (key, json.dumps(m.model_dump(exclude_none=True) if isinstance(m, Message) else m), now)
+            for m, key in zip(messages, keys if keys is not None else itertools.repeat(None))
+        )
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO outbox (key, payload, created) VALUES (?, ?, ?)", rows)
+            return db.total_changes - before
+
+    def claim(self, limit: int = 100, worker: Optional[str] = None) -> list[OutboxItem]:
+        # atomically leases up to `limit` pending messages that are due, or claimed ones whose
+        # lease expired
+        now = time.time()
+        with self._transaction() as db:
+            rows = db.execute(
+                """UPDATE outbox SET state = 1, lease_until = ?, worker = ?, attempts = attempts + 1, updated = ?
+                WHERE id IN (
+                    SELECT id FROM outbox WHERE state = 0 AND (not_before IS NULL OR not_before <= ?)
+                    UNION ALL
+                    SELECT id FROM outbox WHERE state = 1 AND lease_until < ?
+                    LIMIT ?
+                )
+                RETURNING id, payload, attempts""",
+                (now + self.lease, worker, now, now, now, limit),
+            ).fetchall()
+        rows.sort()
+        return [OutboxItem(id, json.loads(payload), attempts) for id, payload, attempts in rows]
+
+    def renew(self, ids: Iterable[int], worker: Optional[str] = None) -> int:
+        # extends the lease of messages `worker` still holds; returns the number renewed
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany(
+                "UPDATE outbox SET lease_until = ? WHERE id = ? AND state = 1 AND worker IS ?",
+                ((time.time() + self.lease, id, worker) for id in ids),
+            )
+            return db.total_changes - before
+
+    def mark_sent(self, sent: Iterable[tuple[int, Optional[str]]]):
+        # (item id, message id returned by the API) pairs, in one transaction
+        now = time.time()
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE outbox SET state = 2, message_id = ?, lease_until = NULL, error = NULL, updated = ? WHERE id = ?",
+                ((message_id, now, id) for id, message_id in sent),
+            )
+
+    def mark_failed(self, failed: Iterable[tuple[int, str]], retry: bool = False):
+        # (item id, error) pairs; retry puts them back in the queue, after a backoff that grows with
+        # their attempts, instead of failing them for good
+        now = time.time()
+        with self._transaction() as db:
+            if not retry:
+                db.executemany(
+                    "UPDATE outbox SET state = ?, error = ?, lease_until = NULL, updated = ? WHERE id = ?",
+                    ((FAILED, error, now, id) for id, error in failed),
+                )
+                return
+            db.executemany(
+                """UPDATE outbox SET state = ?, error = ?, lease_until = NULL, updated = ?,
+                not_before = ? + min(?, ? * (1 << min(max(attempts - 1, 0), 30))) * (0.5 + abs(random() % 1000) / 2000.0)
+                WHERE id = ?""",
+                (
+                    (PENDING, error, now, now, self.retry_max_delay, self.retry_base_delay, id)
+                    for id, error in failed
+                ),
+            )
+
+    def next_due(self) -> Optional[float]:
+        # when the next pending message can be claimed (a time.time() value), None if there is none
+        with self._lock:
+            row = self._db.execute(
+                "SELECT count(*), min(coalesce(not_before, 0)) FROM outbox WHERE state = ?", (PENDING,)
+            ).fetchone()
+        return row[1] if row[0] else None
+
+    def release(self, ids: Iterable[int]):
+        # gives claimed messages back without counting the attempt
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE outbox SET state = 0, lease_until = NULL, attempts = attempts - 1 WHERE id = ? AND state = 1",
+                ((id,) for id in ids),
+            )
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall()
+        counts = dict.fromkeys(STATES.values(), 0)
+        counts.update({STATES[state]: count for state, count in rows})
+        return counts
+
+    def message_id(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT message_id FROM outbox WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def purge(self, older_than: float = 0.0) -> int:
+        # deletes sent messages updated more than `older_than` seconds ago
+        with self._transaction() as db:
+            return db.execute("DELETE FROM outbox WHERE state = 2 AND updated < ?", (time.time() - older_than,)).rowcount
+
+    def drain(
+            self,
+            send: Callable[[dict], Union[dict, MessageResponse]],
+            concurrency: int = 8,
+            batch_size: int = 100,
+            max_attempts: int = 5,
+            worker: Optional[str] = None,
+            wait: bool = False,
+            poll_interval: float = 1.0,
+    ) -> BulkStats:
+        # Sends claimed messages with `send` (e.g. whatsapp.message.send_raw) on `concurrency`
+        # threads until the outbox is empty, or forever with wait=True. Results are written back in
+        # batches of `batch_size`, at least every `poll_interval` seconds and whenever the outbox
+        # runs empty. Transient and throttling errors, and connection errors raised before the
+        # request was sent, put the message back in the queue until it was tried max_attempts
+        # times, other errors fail it; without wait, messages backing off are waited for too.
+        worker = worker or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        stats = BulkStats()
+        while True:
+            # a pass ends when a claim comes back empty, so that its last results are written
+            # back before waiting for new messages
+            self._drain(send, concurrency, batch_size, max_attempts, worker, poll_interval, stats)
+            due = self.next_due()
+            if due is None and not wait:
+                return stats
+            time.sleep(poll_interval if due is None else max(0.0, min(due - time.time(), poll_interval)))
+
+    def _drain(
+            self,
+            send: Callable[[dict], Union[dict, MessageResponse]],
+            concurrency: int,
+            batch_size: int,
+            max_attempts: int,
+            worker: str,
+            write_interval: float,
+            stats: BulkStats,
+    ):
+        claimed: dict[int, OutboxItem] = {}
+        # ids leased and not written back yet, including those of a batch BulkSend has not pulled
+        # yet and those sent but waiting for the next write back; their leases are renewed until then
+        leased: set[int] = set()
+        leased_lock = threading.Lock()
+
+        def messages() -> Iterator[dict]:
+            index = 0
+            while True:
+                items = self.claim(batch_size, worker)
+                if not items:
+                    return
+                with leased_lock:
+                    leased.update(item.id for item in items)
+                for item in items:
+                    claimed[index] = item
+                    index += 1
+                    yield item.message
+
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(self.lease / 3):
+                with leased_lock:
+                    ids = list(leased)
+                if ids:
+                    self.renew(ids, worker)
+
+        heartbeat = threading.Thread(target=renew, name="whatsapp-outbox-lease", daemon=True)
+        heartbeat.start()
+        bulk = BulkSend(send, messages(), concurrency)
+        sent: list[tuple[int, Optional[str]]] = []
+        retry: list[tuple[int, str]] = []
+        failed: list[tuple[int, str]] = []
+        written = time.monotonic()
+        try:
+            for result in bulk:
+                item = claimed.pop(result.index)
+                if result.ok:
+                    sent.append((item.id, result.message_id))
+                elif item.attempts < max_attempts and _transient(result.error):
+                    retry.append((item.id, repr(result.error)))
+                else:
+                    failed.append((item.id, repr(result.error)))
+                if (
+                        len(sent) + len(retry) + len(failed) >= batch_size
+                        or time.monotonic() - written >= write_interval
+                ):
+                    self._write_back(sent, retry, failed, leased, leased_lock)
+                    written = time.monotonic()
+        finally:
+            stop.set()
+            heartbeat.join()
+            self._write_back(sent, retry, failed, leased, leased_lock)
+            if leased:
+                # claimed but not finished when the drain was interrupted: back to the queue now rather
+                # than when the lease expires
+                self.release(leased)
+            stats.total += bulk.stats.total
+            stats.succeeded += bulk.stats.succeeded
+            stats.failed += bulk.stats.failed
+            stats.elapsed += bulk.stats.elapsed
+
+    def _write_back(self, sent: list, retry: list, failed: list, leased: set, leased_lock: threading.Lock):
+        with leased_lock:
+            for rows in (sent, retry, failed):
+                leased.difference_update(id for id, _ in rows)
+        if sent:
+            self.mark_sent(sent)
+            sent.clear()
+        if retry:
+            self.mark_failed(retry, retry=True)
+            retry.clear()
+        if failed:
+            self.mark_failed(failed)
+            failed.clear()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_POLICY = RetryPolicy()
+
+
+def _transient(error: Exception) -> bool:
+    # Meta's transient errors, throttling and connection errors from before the request was sent;
+    # an error after it went out may come from a delivered message and fails it
+    return _POLICY.retryable(error) or isinstance(error, ThrottlingException)
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so concurrent claims from other processes wait
+    # for it (up to the connect timeout) instead of failing half way with SQLITE_BUSY
+    __slots__ = ("db", "lock")
+
+    def __init__(self, db, lock: threading.Lock):
+        self.db = db
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            self.db.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.db
+
+    def __exit__(self, exc_type, *exc_info):
+        try:
+            self.db.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self.lock.release()
@@ -0,0 +1,135 @@
+import json
+from typing import Optional
+
+# Trusted fast path: plain dict templates that produce exactly what
+# Message(...).model_dump(exclude_none=True) produces for the same arguments (same keys, same
+# order, None values left out), without validating the arguments.
+
+
+class JSONCodec:
+    # same settings requests uses for `json=`, so the encoded body is byte-identical
+    content_type = "application/json"
+
+    def __init__(self):
+        self._encode = json.JSONEncoder(allow_nan=False).encode
+
+    def dumps(self, data: dict) -> bytes:
+        return self._encode(data).encode("utf-8")
+
+
+class OrjsonCodec(JSONCodec):
+    # faster, but emits compact JSON, so bodies are not byte-identical to JSONCodec's
+    content_type = "application/json"
+
+    def __init__(self):
+        import orjson
+
+        self._dumps = orjson.dumps
+
+    def dumps(self, data: dict) -> bytes:
+        return self._dumps(data)
+
+
+class EncodedMessage:
+    # a message whose JSON body is already encoded (see whatsapp.templates): sent as is, without the
+    # codec. get() answers the "to" and "type" lookups the send path makes on payload dicts.
+    __slots__ = ("to", "type", "body")
+
+    def __init__(self, to: Optional[str], type_: str, body: bytes):
+        self.to = to
+        self.type = type_
+        self.body = body
+
+    def get(self, key: str, default=None):
+        if key == "to":
+            return self.to
+        if key == "type":
+            return self.type
+        return default
+
+    def __repr__(self) -> str:
+        return f"<EncodedMessage to={self.to} type={self.type} {len(self.body)} bytes>"
+
+
+def _head(to: Optional[str], type_: str, recipient_type: Optional[str]) -> dict:
+    payload = {"messaging_product": "whatsapp"}
+    if to is not None:
+        payload["to"] = to
+    payload["type"] = type_
+    if recipient_type is not None:
+        payload["recipient_type"] = recipient_type
+    return payload
+
+
+def text(to: str, body: str, recipient_type: Optional[str] = "individual", preview_url: Optional[bool] = True) -> dict:
+    payload = _head(to, "text", recipient_type)
+    payload["text"] = {"body": body} if preview_url is None else {"body": body, "preview_url": preview_url}
+    return payload
+
+
+def reply_text(to: str, body: str, message_id: str, recipient_type: Optional[str] = "individual") -> dict:
+    payload = _head(to, "text", recipient_type)
+    payload["text"] = {"body": body}
+    payload["context"] = {"message_id": message_id}
+    return payload
+
+
+def media(
+        type_: str,
+        to: str,
+        media_id: str,
+        caption: Optional[str] = None,
+        filename: Optional[str] = None,
+        recipient_type: Optional[str] = "individual",
+) -> dict:
+    properties = {"id": media_id}
+    if caption is not None:
+        properties["caption"] = caption
+    if filename is not None:
+        properties["filename"] = filename
+    payload = _head(to, type_, recipient_type)
+    payload[type_] = properties
+    return payload
+
+
+def reaction(to: str, message_id: str, emoji: Optional[str] = None, recipient_type: Optional[str] = "individual") -> dict:
+    payload = _head(to, "reaction", recipient_type)
+    payload["reaction"] = {"message_id": message_id} if emoji is None else {"message_id": message_id, "emoji": emoji}
+    return payload
+
+
+def location(
+        to: str,
+        latitude: str,
+        longitude: str,
+        name: Optional[str] = None,
+        address: Optional[str] = None,
+        recipient_type: Optional[str] = "individual",
+) -> dict:
+    properties = {"latitude": latitude, "longitude": longitude}
+    if name is not None:
+        properties["name"] = name
+    if address is not None:
+        properties["address"] = address
+    payload = _head(to, "location", recipient_type)
+    payload["location"] = properties
+    return payload
+
+
+def template(
+        to: str,
+        name: str,
+        language: str = "en_US",
+        components: Optional[list[dict]] = None,
+        recipient_type: Optional[str] = "individual",
+) -> dict:
+    properties = {"name": name, "language": {"code": language}}
+    if components:
+        properties["components"] = components
+    payload = _head(to, "template", recipient_type)
+    payload["template"] = properties
+    return payload
+
+
+def read_receipt(message_id: str) -> dict:
+    return {"messaging_product": "whatsapp", "status": "read", "message_id": message_id}
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from whatsapp.errors import CoupleRateLimitException, ThrottlingException
+
+
+class TokenBucket:
+    __slots__ = ("rate", "ceiling", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.ceiling = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        # tokens may go negative: the debt is the queue of callers already promised a slot
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def slow_down(self, factor: float, floor: float):
+        self.rate = max(floor, self.rate * factor)
+        self.tokens = min(self.tokens, 0.0)
+
+    def speed_up(self, step: float):
+        if self.rate < self.ceiling:
+            self.rate = min(self.ceiling, self.rate + step)
+
+
+class RateLimiter:
+    # Token buckets per phone_number_id and per (phone_number_id, recipient) pair.
+    # Throttling errors halve the affected bucket's rate, every success adds `increase`
+    # messages/second back until the configured rate is reached again (AIMD).
+    def __init__(
+            self,
+            rate: float = 80.0,
+            burst: Optional[float] = None,
+            pair_rate: float = 1 / 6,
+            pair_burst: float = 45.0,
+            min_rate: float = 1.0,
+            decrease: float = 0.5,
+            increase: float = 0.5,
+            max_pairs: int = 100_000,
+    ):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.pair_rate = pair_rate
+        self.pair_burst = pair_burst
+        self.min_rate = min_rate
+        self.decrease = decrease
+        self.increase = increase
+        self.max_pairs = max_pairs
+        self._senders: dict[str, TokenBucket] = {}
+        self._pairs: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sender(self, phone_number_id: str, now: float) -> TokenBucket:
+        bucket = self._senders.get(phone_number_id)
+        if bucket is None:
+            bucket = self._senders[phone_number_id] = TokenBucket(self.rate, self.burst, now)
+        return bucket
+
+    def _pair(self, phone_number_id: str, to: str, now: float) -> TokenBucket:
+        key = (phone_number_id, to)
+        bucket = self._pairs.get(key)
+        if bucket is None:
+            bucket = self._pairs[key] = TokenBucket(self.pair_rate, self.pair_burst, now)
+            if len(self._pairs) > self.max_pairs:
+                self._pairs.popitem(last=False)
+        else:
+            self._pairs.move_to_end(key)
+        return bucket
+
+    def reserve(self, phone_number_id: str, to: Optional[str] = None) -> float:
+        now = time.monotonic()
+        with self._lock:
+            delay = self._sender(phone_number_id, now).reserve(now)
+            if to is not None:
+                delay = max(delay, self._pair(phone_number_id, to, now).reserve(now))
+        return delay
+
+    def acquire(self, phone_number_id: str, to: Optional[str] = None) -> float:
+        delay = self.reserve(phone_number_id, to)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, phone_number_id: str, to: Optional[str] = None) -> float:
+        import asyncio
+
+        delay = self.reserve(phone_number_id, to)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def on_success(self, phone_number_id: str, to: Optional[str] = None):
+        now = time.monotonic()
+        with self._lock:
+            self._sender(phone_number_id, now).speed_up(self.increase)
+            if to is not None and (phone_number_id, to) in self._pairs:
+                self._pairs[(phone_number_id, to)].speed_up(self.increase * self.pair_rate / self.rate)
+
+    def on_throttle(self, phone_number_id: str, to: Optional[str], error: ThrottlingException):
+        now = time.monotonic()
+        with self._lock:
+            if isinstance(error, CoupleRateLimitException) and to is not None:
+                self._pair(phone_number_id, to, now).slow_down(self.decrease, self.pair_rate * self.decrease ** 4)
+            else:
+                self._sender(phone_number_id, now).slow_down(self.decrease, self.min_rate)
+
+    def current_rate(self, phone_number_id: str) -> float:
+        bucket = self._senders.get(phone_number_id)
+        return bucket.rate if bucket is not None else self.rate
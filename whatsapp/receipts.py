@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    __slots__ = ("message_id", "timestamp", "due", "deadline")
+
+    def __init__(self, message_id: str, timestamp: Optional[int], due: float, deadline: float):
+        self.message_id = message_id
+        self.timestamp = timestamp
+        self.due = due
+        self.deadline = deadline
+
+
+class ReadReceipts:
+    # Debounces read receipts per conversation. Marking a message as read marks everything before it
+    # in the chat as read too, so only the newest message id of a burst is sent: `window` seconds
+    # after the last schedule() for that conversation, and no later than `max_delay` seconds after
+    # the first one. A single background thread sends them; flush() and close() send what is left.
+    def __init__(self, mark: Callable[[str], Any], window: float = 2.0, max_delay: float = 10.0):
+        self.mark = mark
+        self.window = window
+        self.max_delay = max(max_delay, window)
+        self.scheduled = 0
+        self.sent = 0
+        self._pending: dict[str, _Pending] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def schedule(self, conversation: str, message_id: str, timestamp: Optional[int] = None):
+        # conversation is the sender's wa_id; timestamp (the webhook one) keeps a message that is
+        # delivered out of order from replacing a newer one
+        now = time.monotonic()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("read receipts are closed")
+            self.scheduled += 1
+            pending = self._pending.get(conversation)
+            if pending is None:
+                pending = self._pending[conversation] = _Pending(message_id, timestamp, 0.0, now + self.max_delay)
+            elif timestamp is None or pending.timestamp is None or timestamp >= pending.timestamp:
+                pending.message_id, pending.timestamp = message_id, timestamp
+            pending.due = min(now + self.window, pending.deadline)
+            heapq.heappush(self._heap, (pending.due, next(self._seq), conversation))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="whatsapp-read-receipts", daemon=True)
+                self._thread.start()
+            elif self._heap[0][2] == conversation:
+                self._cond.notify()
+
+    def _pop_due(self, now: float) -> list[str]:
+        # heap entries are not removed when a conversation is rescheduled, stale ones are skipped here
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            at, _, conversation = heapq.heappop(self._heap)
+            pending = self._pending.get(conversation)
+            if pending is not None and pending.due == at:
+                del self._pending[conversation]
+                due.append(pending.message_id)
+        return due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    due = self._pop_due(now)
+                    if due:
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+            self._send(due)
+
+    def _send(self, message_ids: list[str]):
+        for message_id in message_ids:
+            try:
+                self.mark(message_id)
+            except Exception:
+                logger.exception("could not mark %s as read", message_id)
+            self.sent += 1
+
+    def flush(self):
+        with self._cond:
+            due = [pending.message_id for pending in self._pending.values()]
+            self._pending.clear()
+            self._heap.clear()
+        self._send(due)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class AsyncReadReceipts:
+    # asyncio counterpart of ReadReceipts: one loop timer per pending conversation instead of a thread.
+    def __init__(self, mark: Callable[[str], Awaitable[Any]], window: float = 2.0, max_delay: float = 10.0):
+        self.mark = mark
+        self.window = window
+        self.max_delay = max(max_delay, window)
+        self.scheduled = 0
+        self.sent = 0
+        self._pending: dict[str, tuple[_Pending, Any]] = {}
+        self._tasks: set = set()
+        self._closed = False
+
+    def schedule(self, conversation: str, message_id: str, timestamp: Optional[int] = None):
+        import asyncio
+
+        if self._closed:
+            raise RuntimeError("read receipts are closed")
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self.scheduled += 1
+        item = self._pending.get(conversation)
+        if item is None:
+            pending = _Pending(message_id, timestamp, 0.0, now + self.max_delay)
+        else:
+            pending, timer = item
+            timer.cancel()
+            if timestamp is None or pending.timestamp is None or timestamp >= pending.timestamp:
+                pending.message_id, pending.timestamp = message_id, timestamp
+        pending.due = min(now + self.window, pending.deadline)
+        self._pending[conversation] = (pending, loop.call_at(pending.due, self._fire, conversation))
+
+    def _fire(self, conversation: str):
+        import asyncio
+
+        pending, _ = self._pending.pop(conversation)
+        task = asyncio.ensure_future(self._send(pending.message_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, message_id: str):
+        try:
+            await self.mark(message_id)
+        except Exception:
+            logger.exception("could not mark %s as read", message_id)
+        self.sent += 1
+
+    async def flush(self):
+        import asyncio
+
+        pending, self._pending = self._pending, {}
+        for _, timer in pending.values():
+            timer.cancel()
+        await asyncio.gather(*(self._send(item.message_id) for item, _ in pending.values()), *self._tasks)
+
+    async def aclose(self):
+        self._closed = True
+        await self.flush()
+
+    def __len__(self) -> int:
+        return len(self._pending)
@@ -0,0 +1,175 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+from whatsapp.cache import MediaURLCache, UploadCache
+from whatsapp.media import WhatsappMedia
+from whatsapp.message import WhatsAppMessage
+from whatsapp.metrics import Instrumentation
+from whatsapp.models import Message, MessageResponse, WhatsappConfig
+from whatsapp.payloads import JSONCodec
+from whatsapp.ratelimit import RateLimiter
+from whatsapp.retry import Retrier
+from whatsapp.transport import Transport
+from whatsapp.validation import Preflight
+from whatsapp.version import resolver
+
+
+class Tenant:
+    # Per phone number handle: the same .message and .media as WhatsApp, built on first use over
+    # the registry's shared transport, rate limiter, caches and codec.
+    __slots__ = ("registry", "config", "_message", "_media")
+
+    def __init__(self, registry: "WhatsAppRegistry", config: WhatsappConfig):
+        self.registry = registry
+        self.config = config
+        self._message = None
+        self._media = None
+
+    @property
+    def phone_number_id(self) -> str:
+        return self.config.phone_number_id
+
+    @property
+    def message(self) -> WhatsAppMessage:
+        if self._message is None:
+            registry = self.registry
+            self._message = registry.message_class(
+                self.config, registry.transport, registry.rate_limiter, registry.fast_path, registry.codec,
+                registry.retrier, registry.instrumentation, registry.preflight,
+            )
+        return self._message
+
+    @property
+    def media(self) -> WhatsappMedia:
+        if self._media is None:
+            registry = self.registry
+            self._media = registry.media_class(
+                self.config, registry.transport, registry.upload_cache, registry.url_cache,
+                registry.retrier, registry.instrumentation, registry.preflight,
+            )
+        return self._media
+
+    def __repr__(self) -> str:
+        return f"<Tenant {self.config.phone_number_id}>"
+
+
+class WhatsAppRegistry:
+    # Many business phone numbers behind one transport (one connection pool), one rate limiter and
+    # one API version lookup. add() only records a number's credentials; get() builds its Tenant
+    # handle on first use, without validation, and keeps the `max_active` most recently used ones.
+    # Numbers sharing a token (a system user token) share one headers dict.
+    message_class = WhatsAppMessage
+    media_class = WhatsappMedia
+
+    def __init__(
+            self,
+            token: Optional[str] = None,
+            version: str = "latest",
+            transport: Optional[Transport] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            fast_path: bool = False,
+            codec: Optional[JSONCodec] = None,
+            upload_cache: Optional[UploadCache] = None,
+            url_cache: Optional[MediaURLCache] = None,
+            retrier: Optional[Retrier] = None,
+            instrumentation: Optional[Instrumentation] = None,
+            max_active: int = 1024,
+            preflight: Union[bool, Preflight] = False,
+    ):
+        # token is the default for numbers added without one of their own
+        self.token = token
+        self.version = version
+        # transport ownership as in WhatsApp.__init__
+        self._owns_transport = transport is None
+        self.transport = transport if transport is not None else self._transport()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.fast_path = fast_path
+        self.codec = codec if codec is not None else JSONCodec()
+        self.upload_cache = upload_cache
+        self.url_cache = url_cache
+        self.retrier = retrier
+        self.instrumentation = instrumentation
+        self.max_active = max_active
+        self.preflight = Preflight() if preflight is True else preflight or None
+        self._numbers: dict[str, tuple[Optional[str], str, Optional[str]]] = {}
+        self._active: OrderedDict[str, Tenant] = OrderedDict()
+        self._headers: dict[str, dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _transport(self):
+        return Transport()
+
+    @property
+    def api_version(self) -> str:
+        # the resolver caches "latest" for its ttl, and refreshes it after
+        return resolver.resolve(self.version)
+
+    def add(self, phone_number_id: str, token: Optional[str] = None, verify_token: str = "", app_secret: Optional[str] = None):
+        if token is None and self.token is None:
+            raise ValueError(f"no token for {phone_number_id} and no default token")
+        with self._lock:
+            self._numbers[phone_number_id] = (token, verify_token, app_secret)
+            self._active.pop(phone_number_id, None)
+
+    def remove(self, phone_number_id: str):
+        with self._lock:
+            self._numbers.pop(phone_number_id, None)
+            self._active.pop(phone_number_id, None)
+
+    def get(self, phone_number_id: str) -> Tenant:
+        with self._lock:
+            tenant = self._active.get(phone_number_id)
+            if tenant is not None:
+                self._active.move_to_end(phone_number_id)
+                return tenant
+        # outside the lock: resolving "latest" may fetch the changelog, other lookups must not wait
+        version = self.api_version
+        with self._lock:
+            tenant = self._active.get(phone_number_id)
+            if tenant is not None:
+                # built by another thread in the meantime
+                self._active.move_to_end(phone_number_id)
+                return tenant
+            try:
+                token, verify_token, app_secret = self._numbers[phone_number_id]
+            except KeyError:
+                raise KeyError(f"unknown phone_number_id {phone_number_id}") from None
+            token = token if token is not None else self.token
+            headers = self._headers.get(token)
+            if headers is None:
+                headers = self._headers[token] = {"Authorization": f"Bearer {token}"}
+            # fields are known good: skip validation, api_url is derived on first use
+            config = WhatsappConfig.model_construct(
+                token=token,
+                phone_number_id=phone_number_id,
+                verify_token=verify_token,
+                app_secret=app_secret,
+                version=version,
+                base_url=self.transport.base_url,
+                headers=headers,
+            )
+            tenant = self._active[phone_number_id] = Tenant(self, config)
+            while len(self._active) > self.max_active:
+                self._active.popitem(last=False)
+            return tenant
+
+    __getitem__ = get
+
+    def __contains__(self, phone_number_id: str) -> bool:
+        return phone_number_id in self._numbers
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def send_message(self, phone_number_id: str, data: Union[dict, Message], **kwargs) -> MessageResponse:
+        return self.get(phone_number_id).message.send_message(data, **kwargs)
+
+    def close(self):
+        if self._owns_transport:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
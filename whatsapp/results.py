@@ -0,0 +1,239 @@
+import csv
+import json
+import os
+from array import array
+from typing import Iterable, Iterator, Optional, TextIO, Union
+from whatsapp.errors import Handler
+from whatsapp.models import MessageResponse
+
+FIELDS = ("index", "input", "wa_id", "message_id", "error_code")
+# error_code of a send that raised something without a Graph error code (connection errors, ...)
+NO_CODE = -1
+
+
+def error_code(error: Exception) -> int:
+    # errors.py exceptions carry {"error": message, "code": code}
+    if isinstance(error, Handler):
+        error = error.error
+    args = getattr(error, "args", ())
+    if args and isinstance(args[0], dict):
+        code = args[0].get("code")
+        if isinstance(code, int):
+            return code
+    return NO_CODE
+
+
+def _first(response: Union[dict, MessageResponse], field: str) -> Optional[dict]:
+    items = response.get(field) if isinstance(response, dict) else getattr(response, field)
+    if not items:
+        return None
+    item = items[0]
+    return item if isinstance(item, dict) else item.__dict__
+
+
+def _response(to: Optional[str], wa_id: Optional[str], message_id: Optional[str]) -> MessageResponse:
+    return MessageResponse(
+        messaging_product="whatsapp",
+        contacts=[{"input": to, "wa_id": wa_id}] if to is not None and wa_id is not None else None,
+        messages=[{"id": message_id}] if message_id is not None else None,
+    )
+
+
+class SendResult:
+    # Outcome of one send of a bulk run. Only the ids are kept from the JSON response, the
+    # MessageResponse is rebuilt from them if .response is asked for.
+    __slots__ = ("index", "to", "wa_id", "message_id", "error")
+
+    def __init__(
+            self,
+            index: int,
+            to: Optional[str],
+            response: Union[dict, MessageResponse, None] = None,
+            error: Optional[Exception] = None,
+    ):
+        self.index = index
+        self.to = to
+        self.error = error
+        self.wa_id = self.message_id = None
+        if response is not None:
+            contact = _first(response, "contacts")
+            if contact is not None:
+                self.wa_id = contact.get("wa_id")
+            message = _first(response, "messages")
+            if message is not None:
+                self.message_id = message.get("id")
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def error_code(self) -> Optional[int]:
+        return error_code(self.error) if self.error is not None else None
+
+    @property
+    def response(self) -> Optional[MessageResponse]:
+        return _response(self.to, self.wa_id, self.message_id) if self.error is None else None
+
+    def to_response(self) -> Optional[MessageResponse]:
+        return self.response
+
+    def __repr__(self) -> str:
+        if self.error is not None:
+            return f"<SendResult index={self.index} to={self.to} error={self.error!r}>"
+        return f"<SendResult index={self.index} to={self.to} message_id={self.message_id}>"
+
+
+class _Strings:
+    # append only column of strings, utf-8 bytes end to end in one bytearray; None is stored as ""
+    __slots__ = ("data", "ends")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array("Q")
+
+    def append(self, value: Optional[str]):
+        if value:
+            self.data += value.encode()
+        self.ends.append(len(self.data))
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        start = self.ends[i - 1] if i else 0
+        end = self.ends[i]
+        return self.data[start:end].decode() if end > start else None
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) + self.ends.itemsize * len(self.ends)
+
+
+class ResultSet:
+    # Columnar store of send results for reconciling large campaigns: each row costs its strings'
+    # bytes plus a few machine words instead of several Python objects. Rows are read back as
+    # SendResult (without the exception, only its code) or MessageResponse, or exported to CSV/JSONL.
+    # wa_ids are numeric and kept as integers; the rare one that is not lives in a side dict.
+    # Success is its own column: no error code can stand for it, AuthException's Graph code is 0.
+    def __init__(self, results: Iterable[SendResult] = ()):
+        self._index = array("Q")
+        self._input = _Strings()
+        self._wa_id = array("Q")
+        self._odd_wa_ids: dict[int, str] = {}
+        self._message_id = _Strings()
+        self._ok = bytearray()
+        self._error_code = array("q")
+        self._failed = 0
+        self.extend(results)
+
+    def append(self, result: SendResult):
+        row = len(self._index)
+        self._index.append(result.index)
+        self._input.append(result.to)
+        wa_id = result.wa_id
+        if wa_id is None:
+            self._wa_id.append(0)
+        elif wa_id.isdigit() and wa_id.isascii() and len(wa_id) <= 19 and wa_id[0] != "0":
+            self._wa_id.append(int(wa_id))
+        else:
+            self._wa_id.append(0)
+            self._odd_wa_ids[row] = wa_id
+        self._message_id.append(result.message_id)
+        if result.error is None:
+            self._ok.append(1)
+            self._error_code.append(0)
+        else:
+            self._ok.append(0)
+            self._error_code.append(error_code(result.error))
+            self._failed += 1
+
+    def extend(self, results: Iterable[SendResult]):
+        for result in results:
+            self.append(result)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def succeeded(self) -> int:
+        return len(self._index) - self._failed
+
+    @property
+    def failed(self) -> int:
+        return self._failed
+
+    def wa_id(self, row: int) -> Optional[str]:
+        value = self._wa_id[row]
+        return str(value) if value else self._odd_wa_ids.get(row)
+
+    def ok(self, row: int) -> bool:
+        return bool(self._ok[row])
+
+    def row(self, row: int) -> tuple[int, Optional[str], Optional[str], Optional[str], Optional[int]]:
+        # (index, input, wa_id, message_id, error_code), error_code None for a successful send
+        code = None if self._ok[row] else self._error_code[row]
+        return self._index[row], self._input[row], self.wa_id(row), self._message_id[row], code
+
+    def __getitem__(self, row: int) -> SendResult:
+        if row < 0:
+            row += len(self)
+        index, to, wa_id, message_id, code = self.row(row)
+        result = SendResult(index, to)
+        result.wa_id, result.message_id = wa_id, message_id
+        if code is not None:
+            result.error = Exception({"error": "send failed", "code": code})
+        return result
+
+    def __iter__(self) -> Iterator[SendResult]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def errors(self) -> Iterator[tuple[int, Optional[str], int]]:
+        # (index, input, error_code) of the failed sends
+        for row, ok in enumerate(self._ok):
+            if not ok:
+                yield self._index[row], self._input[row], self._error_code[row]
+
+    def to_response(self, row: int) -> Optional[MessageResponse]:
+        # the MessageResponse the API returned for a row, None for a failed send
+        _, to, wa_id, message_id, code = self.row(row)
+        return _response(to, wa_id, message_id) if code is None else None
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self._input.nbytes + self._message_id.nbytes + len(self._ok)
+            + sum(column.itemsize * len(column) for column in (self._index, self._wa_id, self._error_code))
+        )
+
+    def to_csv(self, file: Union[str, os.PathLike, TextIO]):
+        with _Output(file) as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            writer.writerows(
+                tuple("" if value is None else value for value in self.row(row)) for row in range(len(self))
+            )
+
+    def to_jsonl(self, file: Union[str, os.PathLike, TextIO]):
+        dumps = json.dumps
+        with _Output(file) as f:
+            for row in range(len(self)):
+                index, to, wa_id, message_id, code = self.row(row)
+                f.write(
+                    f'{{"index": {index}, "input": {dumps(to)}, "wa_id": {dumps(wa_id)}, '
+                    f'"message_id": {dumps(message_id)}, "error_code": {"null" if code is None else code}}}\n'
+                )
+
+
+class _Output:
+    # opens a path for writing, or passes an open text file through without closing it
+    def __init__(self, file: Union[str, os.PathLike, TextIO]):
+        self.owned = isinstance(file, (str, os.PathLike))
+        if self.owned:
+            file = open(file, "w", newline="", encoding="utf-8", buffering=1024 * 1024)
+        self.file = file
+
+    def __enter__(self) -> TextIO:
+        return self.file
+
+    def __exit__(self, *exc_info):
+        if self.owned:
+            self.file.close()
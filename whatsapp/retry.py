@@ -0,0 +1,247 @@
+import random
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+import requests
+import urllib3
+from whatsapp.cache import IdempotencyCache
+from whatsapp.errors import CircuitOpenException, is_retryable
+
+T = TypeVar("T")
+
+# Transport errors raised before the request was sent (no connection could be made): safe to retry
+# even for sends. Any other transport error (connection aborted or reset, read timeout, broken
+# response) can come after Meta received the request and accepted the message, so sending it again
+# could deliver it twice: those are only retried for idempotent calls (lookups, deletes), never for
+# sends, whether or not they carry an idempotency key (the key is not sent to the API).
+_HTTPX_BEFORE_SEND = ("ConnectError", "ConnectTimeout", "PoolTimeout")
+
+
+def _httpx_errors(names) -> tuple:
+    httpx = sys.modules.get("httpx")
+    return tuple(getattr(httpx, name) for name in names) if httpx is not None else ()
+
+
+def _before_send(error: BaseException) -> bool:
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError):
+        # requests wraps the underlying error: urllib3's MaxRetryError(reason=NewConnectionError)
+        # for Transport, the httpx error for HTTP2Transport
+        reason = error.args[0] if error.args else None
+        reason = getattr(reason, "reason", reason)
+        return isinstance(reason, urllib3.exceptions.NewConnectionError) or _before_send_httpx(reason)
+    return _before_send_httpx(error)
+
+
+def _before_send_httpx(error: BaseException) -> bool:
+    errors = _httpx_errors(_HTTPX_BEFORE_SEND)
+    return bool(errors) and isinstance(error, errors)
+
+
+def _transport_error(error: BaseException) -> bool:
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return True
+    errors = _httpx_errors(("TransportError",))
+    return bool(errors) and isinstance(error, errors)
+
+
+class RetryPolicy:
+    # Exponential backoff with full jitter: attempt n waits uniform(0, min(max_delay, base_delay * 2**n)).
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def transient(self, error: BaseException) -> bool:
+        # counts against the circuit breaker: Meta's transient errors and every transport error
+        return is_retryable(error) or _transport_error(error)
+
+    def retryable(self, error: BaseException, replayable: bool = False) -> bool:
+        # replayable: sending the request twice is acceptable (idempotent calls), so transport
+        # errors after the request went out are retried too
+        if is_retryable(error) or _before_send(error):
+            return True
+        return replayable and _transport_error(error)
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive transient failures and fails fast with
+    # CircuitOpenException for `reset_timeout` seconds. Then one probe request is let through
+    # (half open): its success closes the circuit again, its failure opens it for another period.
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            retry_after = self.opened_at + self.reset_timeout - time.monotonic()
+            if retry_after <= 0 and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenException({
+            "error": f"circuit breaker for {self.name} is open",
+            "endpoint": self.name,
+            "retry_after": max(retry_after, 0.0),
+        })
+
+    def on_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        # the call was interrupted (cancelled, KeyboardInterrupt) before it got an answer
+        with self._lock:
+            self._probing = False
+
+
+class Retrier:
+    # Runs calls to an endpoint ("messages", "media") through that endpoint's circuit breaker and
+    # retries the transient failures according to `policy`. Calls made with an idempotency key are
+    # deduplicated through `idempotency`, see IdempotencyCache.
+    def __init__(
+            self,
+            policy: Optional[RetryPolicy] = None,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30.0,
+            idempotency: Optional[IdempotencyCache] = None,
+    ):
+        self.policy = policy if policy is not None else RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.idempotency = idempotency if idempotency is not None else IdempotencyCache()
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.setdefault(
+                    endpoint, CircuitBreaker(endpoint, self.failure_threshold, self.reset_timeout)
+                )
+        return breaker
+
+    def _failed(
+            self,
+            breaker: CircuitBreaker,
+            error: BaseException,
+            attempt: int,
+            max_attempts: Optional[int],
+            replayable: bool,
+    ) -> Optional[float]:
+        # the delay before the next attempt, None when the error has to be raised
+        if not self.policy.transient(error):
+            # a definitive answer (invalid parameter, throttling, ...): the endpoint itself is up
+            breaker.on_success()
+            return None
+        breaker.on_failure()
+        if not self.policy.retryable(error, replayable) or attempt + 1 >= (max_attempts or self.policy.max_attempts):
+            return None
+        return self.policy.delay(attempt)
+
+    def call(
+            self,
+            endpoint: str,
+            fn: Callable[[], T],
+            idempotency_key: Optional[str] = None,
+            max_attempts: Optional[int] = None,
+            idempotent: bool = False,
+    ) -> T:
+        # max_attempts overrides the policy, 1 for calls that cannot be replayed. Errors that may
+        # come after the request was received are only retried for idempotent calls (lookups,
+        # deletes). idempotency_key only coalesces the caller's own repeated calls, the API never
+        # sees it, so it does not make a send replayable.
+        if idempotency_key is not None:
+            return self.idempotency.get_or_fetch(
+                idempotency_key, lambda: self._call(endpoint, fn, max_attempts, idempotent)
+            )
+        return self._call(endpoint, fn, max_attempts, idempotent)
+
+    def _call(self, endpoint: str, fn: Callable[[], T], max_attempts: Optional[int], replayable: bool) -> T:
+        breaker = self.breaker(endpoint)
+        attempt = 0
+        while True:
+            breaker.before()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._failed(breaker, e, attempt, max_attempts, replayable)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.on_success()
+            return result
+
+    async def call_async(
+            self,
+            endpoint: str,
+            fn: Callable[[], Awaitable[Any]],
+            idempotency_key: Optional[str] = None,
+            max_attempts: Optional[int] = None,
+            idempotent: bool = False,
+    ) -> Any:
+        if idempotency_key is not None:
+            return await self.idempotency.get_or_fetch_async(
+                idempotency_key, lambda: self._call_async(endpoint, fn, max_attempts, idempotent)
+            )
+        return await self._call_async(endpoint, fn, max_attempts, idempotent)
+
+    async def _call_async(
+            self,
+            endpoint: str,
+            fn: Callable[[], Awaitable[Any]],
+            max_attempts: Optional[int],
+            replayable: bool,
+    ) -> Any:
+        import asyncio
+
+        breaker = self.breaker(endpoint)
+        attempt = 0
+        while True:
+            breaker.before()
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._failed(breaker, e, attempt, max_attempts, replayable)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.on_success()
+            return result
@@ -0,0 +1,577 @@
+import logging
+import os
+import threading
+import time
+from array import array
+from typing import Iterable, Iterator, Optional, Union
+from whatsapp.events import Event, StatusUpdate, parse
+from whatsapp.results import SendResult, _Strings
+from whatsapp.window import _key
+
+logger = logging.getLogger(__name__)
+# Delivery states in the order a message goes through them; a status never moves a message back
+# (webhooks are not delivered in order), "failed" wins over everything.
+ACCEPTED, SENT, DELIVERED, READ, FAILED = range(5)
+STATUSES = ("accepted", "sent", "delivered", "read", "failed")
+_RANKS = {name: rank for rank, name in enumerate(STATUSES)}
+_GOLDEN = 0x9E3779B97F4A7C15
+_U64 = (1 << 64) - 1
+_NONE = 0xFFFFFFFF
+
+
+class MessageStatus:
+    __slots__ = ("message_id", "recipient", "campaign", "status", "sent_at", "updated_at", "error_code")
+
+    def __init__(
+            self,
+            message_id: str,
+            recipient: Optional[str],
+            campaign: Optional[str],
+            status: str,
+            sent_at: int,
+            updated_at: Optional[int] = None,
+            error_code: Optional[int] = None,
+    ):
+        self.message_id = message_id
+        self.recipient = recipient
+        self.campaign = campaign
+        self.status = status
+        self.sent_at = sent_at
+        self.updated_at = updated_at
+        self.error_code = error_code
+
+    @property
+    def delivered(self) -> bool:
+        return self.status in ("delivered", "read")
+
+    def __repr__(self) -> str:
+        return f"<MessageStatus {self.message_id} {self.status}>"
+
+
+def _recipient(to: Optional[str]) -> Optional[str]:
+    # the wa_id form status webhooks use: "+1 650-555-1234" is tracked as "16505551234"
+    if to is None:
+        return None
+    key = _key(to)
+    return str(key) if key is not None else to
+
+
+def _updates(events: Iterable[Event]) -> Iterator[tuple[str, Optional[str], int, int, Optional[int]]]:
+    # (message id, recipient, rank, timestamp, error code) of the status updates among `events`
+    now = int(time.time())
+    for event in events:
+        if not isinstance(event, StatusUpdate):
+            continue
+        rank = _RANKS.get(event.raw.get("status"))
+        message_id = event.id
+        if rank is None or message_id is None:
+            continue
+        codes = event.error_codes if rank == FAILED else ()
+        timestamp = event.timestamp
+        yield message_id, event.recipient, rank, timestamp if timestamp is not None else now, codes[0] if codes else None
+
+
+class _Index:
+    # open addressing table of uint64 keys (0 is an empty slot) to uint32 rows, linear probing
+    __slots__ = ("keys", "rows", "shift", "mask", "used")
+
+    def __init__(self, size: int = 1024):
+        self._allocate(size)
+        self.used = 0
+
+    def _allocate(self, size: int):
+        self.keys = array("Q", bytes(8 * size))
+        self.rows = array("I", bytes(4 * size))
+        self.shift = 65 - size.bit_length()
+        self.mask = size - 1
+
+    def start(self, key: int) -> int:
+        return ((key * _GOLDEN) & _U64) >> self.shift
+
+    def add(self, key: int, row: int, replace: bool = False) -> Optional[int]:
+        # replace: a key has one row, returns the one it replaces; otherwise keys may repeat
+        if (self.used + 1) * 2 > len(self.keys):
+            self._grow()
+        keys, mask = self.keys, self.mask
+        i = self.start(key)
+        while True:
+            k = keys[i]
+            if not k:
+                keys[i] = key
+                self.rows[i] = row
+                self.used += 1
+                return None
+            if replace and k == key:
+                previous = self.rows[i]
+                self.rows[i] = row
+                return previous
+            i = (i + 1) & mask
+
+    def get(self, key: int) -> Optional[int]:
+        keys, mask = self.keys, self.mask
+        i = self.start(key)
+        while k := keys[i]:
+            if k == key:
+                return self.rows[i]
+            i = (i + 1) & mask
+        return None
+
+    def _grow(self):
+        keys, rows = self.keys, self.rows
+        self._allocate(2 * len(keys))
+        new_keys, new_rows, mask = self.keys, self.rows, self.mask
+        for key, row in zip(keys, rows):
+            if key:
+                i = self.start(key)
+                while new_keys[i]:
+                    i = (i + 1) & mask
+                new_keys[i] = key
+                new_rows[i] = row
+
+    @property
+    def nbytes(self) -> int:
+        return 12 * len(self.keys)
+
+
+class MemoryStatusStore:
+    # Delivery status of tracked messages in columns (arrays and one bytearray of message ids),
+    # about a hundred bytes a message. Indexes: message id (hash table), recipient (hash table to
+    # the newest row, rows chained per recipient), not yet delivered messages (a linked list kept
+    # in sent_at order, that delivered ones leave), and status counters per campaign. Thread safe.
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._ids = _Strings()
+        self._recipient = array("Q")
+        self._odd_recipients: dict[int, str] = {}
+        self._campaign = array("I")
+        self._status = array("B")
+        self._sent_at = array("I")
+        self._updated_at = array("I")
+        self._error_codes: dict[int, int] = {}
+        size = 1 << max(10, (2 * capacity).bit_length())
+        self._by_id = _Index(size)
+        self._by_recipient = _Index(size)
+        self._previous = array("I")  # previous row of the same recipient
+        self._next = array("I")  # undelivered list
+        self._prev = array("I")
+        self._head = self._tail = _NONE
+        self._campaigns: list[Optional[str]] = [None]
+        self._campaign_index: dict[Optional[str], int] = {None: 0}
+        self._counts: list[list[int]] = [[0] * len(STATUSES)]
+
+    def _row(self, message_id: str) -> Optional[int]:
+        index = self._by_id
+        h = hash(message_id) & _U64 or 1
+        keys, rows, mask = index.keys, index.rows, index.mask
+        i = index.start(h)
+        while k := keys[i]:
+            if k == h and self._ids[rows[i]] == message_id:
+                return rows[i]
+            i = (i + 1) & mask
+        return None
+
+    def _campaign_id(self, campaign: Optional[str]) -> int:
+        index = self._campaign_index.get(campaign)
+        if index is None:
+            index = self._campaign_index[campaign] = len(self._campaigns)
+            self._campaigns.append(campaign)
+            self._counts.append([0] * len(STATUSES))
+        return index
+
+    def _add(self, message_id: str, recipient: Optional[str], campaign: int, rank: int, sent_at: int) -> int:
+        row = len(self._status)
+        self._ids.append(message_id)
+        key = _key(recipient) if recipient is not None else None
+        self._recipient.append(key or 0)
+        if key is None and recipient is not None:
+            self._odd_recipients[row] = recipient
+        self._campaign.append(campaign)
+        self._status.append(rank)
+        self._sent_at.append(sent_at)
+        self._updated_at.append(0)
+        self._by_id.add(hash(message_id) & _U64 or 1, row)
+        previous = self._by_recipient.add(key, row, replace=True) if key else None
+        self._previous.append(_NONE if previous is None else previous)
+        self._next.append(_NONE)
+        self._prev.append(_NONE)
+        if rank < DELIVERED:
+            self._link(row)
+        self._counts[campaign][rank] += 1
+        return row
+
+    def _link(self, row: int):
+        # rows mostly come in send order, so the walk back from the tail is short; rows made by
+        # webhook events or tracked with an older sent_at are put in their place
+        sent_at = self._sent_at[row]
+        after = self._tail
+        while after != _NONE and self._sent_at[after] > sent_at:
+            after = self._prev[after]
+        following = self._head if after == _NONE else self._next[after]
+        self._prev[row] = after
+        self._next[row] = following
+        if after == _NONE:
+            self._head = row
+        else:
+            self._next[after] = row
+        if following == _NONE:
+            self._tail = row
+        else:
+            self._prev[following] = row
+
+    def _unlink(self, row: int):
+        previous, following = self._prev[row], self._next[row]
+        if previous == _NONE:
+            self._head = following
+        else:
+            self._next[previous] = following
+        if following == _NONE:
+            self._tail = previous
+        else:
+            self._prev[following] = previous
+
+    def _set_status(self, row: int, rank: int, timestamp: int, error_code: Optional[int]):
+        old = self._status[row]
+        if rank <= old:
+            return
+        counts = self._counts[self._campaign[row]]
+        counts[old] -= 1
+        counts[rank] += 1
+        self._status[row] = rank
+        self._updated_at[row] = timestamp
+        if error_code is not None:
+            self._error_codes[row] = error_code
+        if old < DELIVERED <= rank:
+            self._unlink(row)
+
+    def track(self, message_id: str, to: Optional[str], campaign: Optional[str] = None, sent_at: Optional[float] = None):
+        self.track_many([(message_id, to)], campaign, sent_at)
+
+    def track_many(
+            self,
+            messages: Iterable[Union[SendResult, tuple[str, Optional[str]]]],
+            campaign: Optional[str] = None,
+            sent_at: Optional[float] = None,
+    ):
+        # (message id, recipient) pairs or the SendResults of a bulk send (failed sends are skipped)
+        sent_at = int(sent_at if sent_at is not None else time.time())
+        with self._lock:
+            campaign_id = self._campaign_id(campaign)
+            for message_id, to in _pairs(messages):
+                row = self._row(message_id)
+                if row is None:
+                    self._add(message_id, to, campaign_id, ACCEPTED, sent_at)
+                    continue
+                # its status came in before the send returned: move it to its campaign
+                old = self._campaign[row]
+                if old != campaign_id:
+                    rank = self._status[row]
+                    self._counts[old][rank] -= 1
+                    self._counts[campaign_id][rank] += 1
+                    self._campaign[row] = campaign_id
+
+    def ingest(self, events: Iterable[Event]) -> int:
+        # status updates among `events` (other events are skipped); returns the number applied
+        applied = 0
+        with self._lock:
+            for message_id, recipient, rank, timestamp, error_code in _updates(events):
+                row = self._row(message_id)
+                if row is None:
+                    row = self._add(message_id, recipient, 0, ACCEPTED, timestamp)
+                self._set_status(row, rank, timestamp, error_code)
+                applied += 1
+        return applied
+
+    def feed(self, payload: Union[bytes, str, dict]) -> int:
+        return self.ingest(parse(payload))
+
+    def attach(self, webhook):
+        # payload handler, so that the statuses of a webhook delivery are ingested as one batch
+        webhook.add_handler(self.feed)
+        return self
+
+    def _record(self, row: int) -> MessageStatus:
+        key = self._recipient[row]
+        updated_at = self._updated_at[row]
+        return MessageStatus(
+            self._ids[row],
+            str(key) if key else self._odd_recipients.get(row),
+            self._campaigns[self._campaign[row]],
+            STATUSES[self._status[row]],
+            self._sent_at[row],
+            updated_at or None,
+            self._error_codes.get(row),
+        )
+
+    def get(self, message_id: str) -> Optional[MessageStatus]:
+        with self._lock:
+            row = self._row(message_id)
+            return self._record(row) if row is not None else None
+
+    def for_recipient(self, wa_id: str) -> list[MessageStatus]:
+        # newest first
+        key = _key(wa_id)
+        if key is None:
+            return []
+        with self._lock:
+            records = []
+            row = self._by_recipient.get(key)
+            while row is not None and row != _NONE:
+                records.append(self._record(row))
+                row = self._previous[row]
+            return records
+
+    def counts(self, campaign: Optional[str] = None) -> dict[str, int]:
+        with self._lock:
+            index = self._campaign_index.get(campaign)
+            counts = self._counts[index] if index is not None else [0] * len(STATUSES)
+            return dict(zip(STATUSES, counts))
+
+    def delivery_rate(self, campaign: Optional[str] = None) -> float:
+        return _delivery_rate(self.counts(campaign))
+
+    def undelivered(self, older_than: float = 0.0, campaign: Optional[str] = None) -> list[MessageStatus]:
+        # messages sent more than `older_than` seconds ago and neither delivered, read nor failed,
+        # oldest first. Walks the undelivered list only, up to the first message sent after the cutoff.
+        cutoff = time.time() - older_than
+        with self._lock:
+            campaign_id = self._campaign_index.get(campaign, _NONE) if campaign is not None else None
+            records = []
+            row = self._head
+            while row != _NONE and self._sent_at[row] <= cutoff:
+                if campaign_id is None or self._campaign[row] == campaign_id:
+                    records.append(self._record(row))
+                row = self._next[row]
+            return records
+
+    def __len__(self) -> int:
+        return len(self._status)
+
+    @property
+    def nbytes(self) -> int:
+        columns = (
+            self._recipient, self._campaign, self._status, self._sent_at, self._updated_at,
+            self._previous, self._next, self._prev,
+        )
+        return (
+            self._ids.nbytes + sum(column.itemsize * len(column) for column in columns)
+            + self._by_id.nbytes + self._by_recipient.nbytes
+        )
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS statuses (
+        message_id TEXT PRIMARY KEY,
+        recipient TEXT,
+        campaign TEXT NOT NULL DEFAULT '',
+        status INTEGER NOT NULL DEFAULT 0,
+        sent_at INTEGER NOT NULL,
+        updated_at INTEGER,
+        error_code INTEGER
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS statuses_recipient ON statuses (recipient)",
+    # partial index: only the messages not delivered yet are indexed by send time
+    "CREATE INDEX IF NOT EXISTS statuses_undelivered ON statuses (sent_at) WHERE status < 2",
+    """CREATE TABLE IF NOT EXISTS campaign_counts (
+        campaign TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (campaign, status)
+    ) WITHOUT ROWID""",
+    # the counters follow the rows, so that campaign queries read a handful of rows
+    """CREATE TRIGGER IF NOT EXISTS statuses_insert AFTER INSERT ON statuses BEGIN
+        INSERT INTO campaign_counts VALUES (new.campaign, new.status, 1)
+        ON CONFLICT (campaign, status) DO UPDATE SET count = count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS statuses_update AFTER UPDATE OF status, campaign ON statuses
+    WHEN old.status != new.status OR old.campaign != new.campaign BEGIN
+        UPDATE campaign_counts SET count = count - 1 WHERE campaign = old.campaign AND status = old.status;
+        INSERT INTO campaign_counts VALUES (new.campaign, new.status, 1)
+        ON CONFLICT (campaign, status) DO UPDATE SET count = count + 1;
+    END""",
+)
+_TRACK = (
+    "INSERT INTO statuses (message_id, recipient, campaign, sent_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (message_id) DO UPDATE SET campaign = excluded.campaign"
+)
+_INGEST = (
+    "INSERT INTO statuses (message_id, recipient, status, sent_at, updated_at, error_code) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (message_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, "
+    "error_code = coalesce(excluded.error_code, error_code) WHERE excluded.status > status"
+)
+_COLUMNS = "message_id, recipient, campaign, status, sent_at, updated_at, error_code"
+
+
+class SQLiteStatusStore:
+    # MemoryStatusStore's interface over a SQLite file (WAL mode, synchronous=NORMAL), shareable by
+    # processes. Writes are buffered and applied in one transaction every `flush_size` updates,
+    # every `flush_interval` seconds from a background thread, and before every query; close()
+    # writes what is left. Campaign counters are kept by triggers.
+    def __init__(
+            self,
+            path: Union[str, os.PathLike],
+            flush_size: int = 5000,
+            flush_interval: float = 1.0,
+            timeout: float = 30.0,
+    ):
+        import sqlite3
+
+        self.path = os.fspath(path)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._tracked: list[tuple] = []
+        self._updates: list[tuple] = []
+        self._db = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="whatsapp-statuses", daemon=True)
+            self._flusher.start()
+
+    def track(self, message_id: str, to: Optional[str], campaign: Optional[str] = None, sent_at: Optional[float] = None):
+        self.track_many([(message_id, to)], campaign, sent_at)
+
+    def track_many(
+            self,
+            messages: Iterable[Union[SendResult, tuple[str, Optional[str]]]],
+            campaign: Optional[str] = None,
+            sent_at: Optional[float] = None,
+    ):
+        sent_at = int(sent_at if sent_at is not None else time.time())
+        campaign = campaign or ""
+        rows = [(message_id, _recipient(to), campaign, sent_at) for message_id, to in _pairs(messages)]
+        with self._lock:
+            self._tracked += rows
+            self._maybe_flush()
+
+    def ingest(self, events: Iterable[Event]) -> int:
+        rows = [
+            (message_id, _recipient(recipient), rank, timestamp, timestamp, error_code)
+            for message_id, recipient, rank, timestamp, error_code in _updates(events)
+        ]
+        with self._lock:
+            self._updates += rows
+            self._maybe_flush()
+        return len(rows)
+
+    def feed(self, payload: Union[bytes, str, dict]) -> int:
+        return self.ingest(parse(payload))
+
+    def attach(self, webhook):
+        webhook.add_handler(self.feed)
+        return self
+
+    def _maybe_flush(self):
+        if len(self._tracked) + len(self._updates) >= self.flush_size:
+            self._flush()
+
+    def _flush_loop(self):
+        # writes the updates of quiet periods too, which no later write would flush
+        while not self._closed.wait(self.flush_interval):
+            try:
+                with self._lock:
+                    self._flush()
+            except Exception:
+                logger.exception("could not write delivery statuses, retrying")
+
+    def _flush(self):
+        # under the lock
+        if not (self._tracked or self._updates):
+            return
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(_TRACK, self._tracked)
+            db.executemany(_INGEST, self._updates)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        self._tracked.clear()
+        self._updates.clear()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _query(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        with self._lock:
+            self._flush()
+            return self._db.execute(sql, parameters).fetchall()
+
+    def get(self, message_id: str) -> Optional[MessageStatus]:
+        rows = self._query(f"SELECT {_COLUMNS} FROM statuses WHERE message_id = ?", (message_id,))
+        return _record(rows[0]) if rows else None
+
+    def for_recipient(self, wa_id: str) -> list[MessageStatus]:
+        rows = self._query(
+            f"SELECT {_COLUMNS} FROM statuses WHERE recipient = ? ORDER BY sent_at DESC", (_recipient(wa_id),)
+        )
+        return [_record(row) for row in rows]
+
+    def counts(self, campaign: Optional[str] = None) -> dict[str, int]:
+        counts = dict.fromkeys(STATUSES, 0)
+        rows = self._query("SELECT status, count FROM campaign_counts WHERE campaign = ?", (campaign or "",))
+        counts.update({STATUSES[status]: count for status, count in rows})
+        return counts
+
+    def delivery_rate(self, campaign: Optional[str] = None) -> float:
+        return _delivery_rate(self.counts(campaign))
+
+    def undelivered(self, older_than: float = 0.0, campaign: Optional[str] = None) -> list[MessageStatus]:
+        sql = f"SELECT {_COLUMNS} FROM statuses WHERE status < 2 AND sent_at <= ?"
+        parameters = (int(time.time() - older_than),)
+        if campaign is not None:
+            sql += " AND campaign = ?"
+            parameters += (campaign,)
+        return [_record(row) for row in self._query(sql + " ORDER BY sent_at", parameters)]
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM statuses")[0][0]
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _pairs(messages: Iterable[Union[SendResult, tuple[str, Optional[str]]]]) -> Iterator[tuple[str, Optional[str]]]:
+    for message in messages:
+        if isinstance(message, SendResult):
+            if message.error is None and message.message_id is not None:
+                yield message.message_id, message.wa_id or message.to
+        else:
+            yield message
+
+
+def _record(row: tuple) -> MessageStatus:
+    message_id, recipient, campaign, status, sent_at, updated_at, error_code = row
+    return MessageStatus(message_id, recipient, campaign or None, STATUSES[status], sent_at, updated_at, error_code)
+
+
+def _delivery_rate(counts: dict[str, int]) -> float:
+    # delivered or read among the tracked messages
+    total = sum(counts.values())
+    return (counts["delivered"] + counts["read"]) / total if total else 0.0
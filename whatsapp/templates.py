@@ -0,0 +1,200 @@
+import csv
+import json
+import os
+import re
+from json.encoder import encode_basestring_ascii
+from typing import Iterable, Iterator, Mapping, Optional, Sequence, TextIO, Union
+from whatsapp.errors import ParameterNumberMismatchException
+from whatsapp.payloads import EncodedMessage
+from whatsapp.validation import check_template_text
+
+_PLACEHOLDER = re.compile(r"{{\s*([A-Za-z0-9_]+)\s*}}")
+_NAME = re.compile(r"^[a-z0-9_]{1,512}$")
+_MEDIA_FORMATS = ("image", "video", "document")
+_SLOT = "\x00slot:{}\x00"
+
+Values = Union[Mapping[str, str], Sequence[str]]
+Rows = Union[str, os.PathLike, TextIO, Mapping[str, Sequence[str]], Iterable[Mapping[str, str]]]
+
+
+def _placeholders(text: str) -> list[str]:
+    # {{1}} {{2}} ... (positional, must be 1..n) or {{first_name}} (named); each counted once
+    names = list(dict.fromkeys(_PLACEHOLDER.findall(text)))
+    if names and all(name.isdigit() for name in names):
+        if sorted(int(name) for name in names) != list(range(1, len(names) + 1)):
+            raise ValueError(f"positional placeholders must be {{{{1}}}} to {{{{{len(names)}}}}}: {text!r}")
+        return sorted(names, key=int)
+    if any(name.isdigit() for name in names):
+        raise ValueError(f"placeholders mix positional and named parameters: {text!r}")
+    return names
+
+
+class Template:
+    # A template definition compiled once into the JSON of its message with a slot for the recipient
+    # and each parameter. render() fills the slots: one str.format() of JSON escaped values, no dict
+    # building and no encoder, and the body comes out byte for byte as JSONCodec would encode it.
+    #
+    # The texts are the ones approved in the WhatsApp Manager, with {{1}}-style or {{name}}-style
+    # placeholders. Fields, in render order: header placeholders as "header.<name>" (or "header" for
+    # a media header: a media id, or a link if it starts with http), body placeholders as "<name>",
+    # dynamic URL button suffixes as "button.<index>.<name>".
+    def __init__(
+            self,
+            name: str,
+            language: str = "en_US",
+            body: str = "",
+            header: Optional[str] = None,
+            header_format: str = "text",
+            buttons: Sequence[Optional[str]] = (),
+            recipient_type: Optional[str] = "individual",
+    ):
+        if not _NAME.match(name):
+            raise ValueError(f"template names are lowercase letters, digits and underscores: {name!r}")
+        if header_format != "text" and header_format not in _MEDIA_FORMATS:
+            raise ValueError(f"header_format is text, image, video or document, not {header_format!r}")
+        self.name = name
+        self.language = language
+        self.header_format = header_format
+        fields: list[str] = []
+        media: list[int] = []
+        components = []
+
+        def parameters(prefix: str, names: list[str]) -> list[dict]:
+            result = []
+            for placeholder in names:
+                parameter = {"type": "text"}
+                if not placeholder.isdigit():
+                    parameter["parameter_name"] = placeholder
+                parameter["text"] = _SLOT.format(len(fields) + 1)
+                fields.append(prefix + placeholder)
+                result.append(parameter)
+            return result
+
+        self.parameter_counts: dict[str, int] = {}
+        if header_format != "text":
+            media.append(len(fields) + 1)
+            fields.append("header")
+            components.append({
+                "type": "header",
+                "parameters": [{"type": header_format, header_format: _SLOT.format(len(fields))}],
+            })
+            self.parameter_counts["header"] = 1
+        elif header:
+            names = _placeholders(header)
+            if len(names) > 1:
+                raise ValueError(f"a text header takes at most one parameter: {header!r}")
+            if names:
+                components.append({"type": "header", "parameters": parameters("header.", names)})
+                self.parameter_counts["header"] = 1
+        names = _placeholders(body)
+        if names:
+            components.append({"type": "body", "parameters": parameters("", names)})
+            self.parameter_counts["body"] = len(names)
+        for index, url in enumerate(buttons):
+            names = _placeholders(url or "")
+            if len(names) > 1:
+                raise ValueError(f"a URL button takes at most one parameter: {url!r}")
+            if names:
+                components.append({
+                    "type": "button",
+                    "sub_type": "url",
+                    "index": str(index),
+                    "parameters": parameters(f"button.{index}.", names),
+                })
+                self.parameter_counts[f"button:{index}"] = 1
+        self.fields = tuple(fields)
+        self._media = frozenset(media)
+
+        template = {"name": name, "language": {"code": language}}
+        if components:
+            template["components"] = components
+        payload = {"messaging_product": "whatsapp", "to": _SLOT.format(0), "type": "template"}
+        if recipient_type is not None:
+            payload["recipient_type"] = recipient_type
+        payload["template"] = template
+        # same encoder settings as JSONCodec; each slot, quotes included, becomes a format field
+        encoded = json.JSONEncoder(allow_nan=False).encode(payload)
+        pieces = re.split(r'"\\u0000slot:(\d+)\\u0000"', encoded)
+        self._format = "".join(
+            piece.replace("{", "{{").replace("}", "}}") if i % 2 == 0 else "{" + piece + "}"
+            for i, piece in enumerate(pieces)
+        )
+
+    @classmethod
+    def from_definition(cls, definition: Mapping, recipient_type: Optional[str] = "individual") -> "Template":
+        # a template as returned by the Graph API (GET /<WABA_ID>/message_templates)
+        header, header_format, body, buttons = None, "text", "", []
+        for component in definition.get("components", ()):
+            kind = component.get("type", "").upper()
+            if kind == "HEADER":
+                header_format = component.get("format", "TEXT").lower()
+                header = component.get("text")
+            elif kind == "BODY":
+                body = component.get("text", "")
+            elif kind == "BUTTONS":
+                buttons = [button.get("url") if button.get("type") == "URL" else None for button in component["buttons"]]
+        return cls(definition["name"], definition.get("language", "en_US"), body, header, header_format, buttons, recipient_type)
+
+    def render(self, to: str, values: Values = ()) -> EncodedMessage:
+        # values: a mapping keyed by field, or a sequence in self.fields order
+        if isinstance(values, Mapping):
+            try:
+                values = [values[field] for field in self.fields]
+            except KeyError as e:
+                raise ParameterNumberMismatchException(
+                    {"error": f"template {self.name!r} is missing parameter {e.args[0]!r}", "code": 132000}
+                ) from None
+        elif len(values) != len(self.fields):
+            raise ParameterNumberMismatchException({
+                "error": f"template {self.name!r} takes {len(self.fields)} parameters, {len(values)} given",
+                "code": 132000,
+            })
+        return EncodedMessage(to, "template", self._encode(to, values))
+
+    def _encode(self, to: str, values: Sequence[str]) -> bytes:
+        escaped = [encode_basestring_ascii(to)]
+        for slot, value in enumerate(values, 1):
+            if value is None:
+                raise ParameterNumberMismatchException(
+                    {"error": f"template {self.name!r} parameter {self.fields[slot - 1]!r} is None", "code": 132000}
+                )
+            value = str(value)
+            if slot in self._media:
+                key = "link" if value.startswith(("https://", "http://")) else "id"
+                escaped.append(f'{{"{key}": {encode_basestring_ascii(value)}}}')
+                continue
+            check_template_text(value)
+            escaped.append(encode_basestring_ascii(value))
+        return self._format.format(*escaped).encode()
+
+    def render_many(self, rows: Rows, to: str = "to") -> Iterator[EncodedMessage]:
+        # rows: a CSV file (path or open text file) with a header line, a mapping of columns
+        # ({"to": [...], "1": [...]}), or an iterable of row mappings. `to` names the recipient column.
+        # Payloads are produced lazily, so the input can be larger than memory.
+        columns = (to, *self.fields)
+        if isinstance(rows, (str, os.PathLike)):
+            with open(rows, newline="", encoding="utf-8") as f:
+                yield from self.render_many(f, to)
+            return
+        if hasattr(rows, "read"):
+            reader = csv.reader(rows)
+            header = next(reader, None)
+            if header is None:
+                return
+            missing = [column for column in columns if column not in header]
+            if missing:
+                raise ParameterNumberMismatchException(
+                    {"error": f"template {self.name!r} columns missing from the CSV: {missing}", "code": 132000}
+                )
+            positions = [header.index(column) for column in columns]
+            tuples = ([record[i] for i in positions] for record in reader if record)
+        elif isinstance(rows, Mapping):
+            tuples = zip(*(rows[column] for column in columns), strict=True)
+        else:
+            tuples = ([row[column] for column in columns] for row in rows)
+        encode, type_ = self._encode, "template"
+        for values in tuples:
+            yield EncodedMessage(values[0], type_, encode(values[0], values[1:]))
+
+    def __repr__(self) -> str:
+        return f"<Template {self.name} ({self.language}) fields={list(self.fields)}>"
@@ -0,0 +1,52 @@
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+GRAPH_URL = "https://graph.facebook.com"
+
+
+class Transport:
+    def __init__(
+            self,
+            base_url: str = GRAPH_URL,
+            pool_connections: int = 10,
+            pool_maxsize: int = 10,
+            pool_block: bool = False,
+            connect_timeout: float = 5.0,
+            read_timeout: float = 30.0,
+            session: Optional[requests.Session] = None,
+    ):
+        # pool_connections is the number of hosts kept alive, pool_maxsize the connections kept per host.
+        # pool_block turns pool_maxsize into a hard per-host limit instead of a keep-alive limit.
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        # a caller's session keeps its own adapters (pools, retries, proxies) and is the caller's to close
+        self._owns_session = session is None
+        self.session = session if session is not None else requests.Session()
+        if self._owns_session:
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
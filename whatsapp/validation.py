@@ -0,0 +1,150 @@
+import os
+from typing import Optional
+from whatsapp.errors import (
+    CharacterFormatException,
+    InvalidParameterException,
+    ParameterNumberMismatchException,
+    TextTooLongException,
+    WrongPhoneNumberException,
+)
+from whatsapp.multipart import UploadSource, _remaining_size
+
+# Cloud API limits, checked locally so that payloads the API would reject never use a round trip or
+# rate limit quota. The errors raised are the ones the API would have answered with.
+TEXT_MAX = 4096
+CAPTION_MAX = 1024
+INTERACTIVE_BODY_MAX = 1024
+INTERACTIVE_HEADER_MAX = 60
+INTERACTIVE_FOOTER_MAX = 60
+_MB = 1024 * 1024
+MEDIA_LIMITS = {
+    "audio/aac": 16 * _MB,
+    "audio/amr": 16 * _MB,
+    "audio/mpeg": 16 * _MB,
+    "audio/mp4": 16 * _MB,
+    "audio/ogg": 16 * _MB,
+    "text/plain": 100 * _MB,
+    "application/pdf": 100 * _MB,
+    "application/msword": 100 * _MB,
+    "application/vnd.ms-excel": 100 * _MB,
+    "application/vnd.ms-powerpoint": 100 * _MB,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": 100 * _MB,
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": 100 * _MB,
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": 100 * _MB,
+    "image/jpeg": 5 * _MB,
+    "image/png": 5 * _MB,
+    "image/webp": 500 * 1024,  # stickers; static ones are limited to 100 KB by the API
+    "video/mp4": 16 * _MB,
+    "video/3gpp": 16 * _MB,
+}
+_CAPTIONED = ("image", "video", "document")
+_PHONE_SEPARATORS = str.maketrans("", "", " ()-.")
+
+
+def _error(exception: type, code: int, message: str) -> Exception:
+    return exception({"error": message, "code": code})
+
+
+class Preflight:
+    # check_message() and check_upload() raise the errors.py exception the API would answer with.
+    # `templates` maps a template name to its parameter count per component ("header", "body",
+    # "button:<index>") for the 132000 parameter count check; templates not listed are not counted.
+    # The common case (digits only recipient, short text) is a handful of dict lookups.
+    def __init__(self, templates: Optional[dict[str, dict[str, int]]] = None):
+        self.templates = templates if templates is not None else {}
+
+    def check_message(self, data: dict):
+        to = data.get("to")
+        if to is not None and data.get("recipient_type", "individual") == "individual":
+            check_phone_number(to)
+        type_ = data.get("type")
+        if type_ == "text":
+            body = data["text"].get("body") or ""
+            if len(body) > TEXT_MAX:
+                raise _error(TextTooLongException, 132005, f"text body is {len(body)} characters, the limit is {TEXT_MAX}")
+        elif type_ in _CAPTIONED:
+            caption = data[type_].get("caption")
+            if caption is not None and len(caption) > CAPTION_MAX:
+                raise _error(
+                    TextTooLongException, 132005, f"caption is {len(caption)} characters, the limit is {CAPTION_MAX}"
+                )
+        elif type_ == "template":
+            # None for an EncodedMessage: whatsapp.templates checked its parameters when rendering it
+            template = data.get("template")
+            if template is not None:
+                self.check_template(template)
+        elif type_ == "interactive":
+            check_interactive(data["interactive"])
+
+    def check_template(self, template: dict):
+        counts = {}
+        for component in template.get("components") or ():
+            parameters = component.get("parameters") or ()
+            for parameter in parameters:
+                if parameter.get("type") == "text":
+                    check_template_text(parameter.get("text") or "")
+            key = component.get("type", "")
+            if key == "button":
+                key = f"button:{component.get('index', 0)}"
+            counts[key] = counts.get(key, 0) + len(parameters)
+        expected = self.templates.get(template.get("name"))
+        if expected is None:
+            return
+        for key in expected.keys() | counts.keys():
+            if expected.get(key, 0) != counts.get(key, 0):
+                raise _error(
+                    ParameterNumberMismatchException, 132000,
+                    f"template {template.get('name')!r} {key} takes {expected.get(key, 0)} parameters, "
+                    f"{counts.get(key, 0)} given",
+                )
+
+    def check_upload(self, mime_type: str, size: Optional[int] = None):
+        limit = MEDIA_LIMITS.get(mime_type)
+        if limit is None:
+            raise _error(InvalidParameterException, 100, f"unsupported media type {mime_type!r}")
+        if size is not None and size > limit:
+            raise _error(
+                InvalidParameterException, 100, f"{mime_type} media is {size} bytes, the limit is {limit}"
+            )
+
+
+def check_phone_number(to: str):
+    # E.164 without the +: 7 to 15 digits; spaces, dashes, dots and parentheses are tolerated
+    if not (to.isdigit() and to.isascii()):
+        digits = to.removeprefix("+").translate(_PHONE_SEPARATORS)
+        if not (digits.isdigit() and digits.isascii()):
+            raise _error(WrongPhoneNumberException, 33, f"malformed recipient phone number {to!r}")
+        to = digits
+    if not 7 <= len(to) <= 15:
+        raise _error(WrongPhoneNumberException, 33, f"recipient phone number {to!r} must have 7 to 15 digits")
+
+
+def check_template_text(text: str):
+    # template parameters may not contain new lines, tabs or more than 4 consecutive spaces
+    if "\n" in text or "\t" in text or "     " in text:
+        raise _error(
+            CharacterFormatException, 132007,
+            f"template parameter {text[:40]!r} contains new lines, tabs or more than 4 consecutive spaces",
+        )
+
+
+def check_interactive(interactive: dict):
+    for part, limit in (
+            ("body", INTERACTIVE_BODY_MAX), ("header", INTERACTIVE_HEADER_MAX), ("footer", INTERACTIVE_FOOTER_MAX)
+    ):
+        text = (interactive.get(part) or {}).get("text")
+        if text is not None and len(text) > limit:
+            raise _error(
+                TextTooLongException, 132005, f"interactive {part} is {len(text)} characters, the limit is {limit}"
+            )
+
+
+def upload_size(source: UploadSource, file_size: Optional[int] = None) -> Optional[int]:
+    # bytes an upload of `source` would send, None when only known once an iterable is consumed
+    if file_size is not None:
+        return file_size
+    if isinstance(source, (str, os.PathLike)):
+        return os.stat(source).st_size
+    if hasattr(source, "read"):
+        return _remaining_size(source)
+    return None
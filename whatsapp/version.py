@@ -0,0 +1,95 @@
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+CHANGELOG_URL = "https://developers.facebook.com/docs/graph-api/changelog/"
+# used whenever the changelog cannot be fetched or parsed, bump it with each Graph API release we test against
+FALLBACK_VERSION = "v21.0"
+DEFAULT_CACHE_PATH = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "whatsapp" / "version.json"
+_VERSION_RE = re.compile(r"^v\d+\.\d+$")
+
+
+class VersionResolver:
+    def __init__(
+            self,
+            ttl: float = 24 * 60 * 60,
+            cache_path: Optional[Path] = DEFAULT_CACHE_PATH,
+            fallback: str = FALLBACK_VERSION,
+            timeout: tuple[float, float] = (2.0, 5.0),
+    ):
+        self.ttl = ttl
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.fallback = fallback
+        self.timeout = timeout
+        self._version: Optional[str] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def resolve(self, version: str = "latest") -> str:
+        if version != "latest":
+            return version
+        if self._version is not None and time.time() < self._expires:
+            return self._version
+        with self._lock:
+            if self._version is None or time.time() >= self._expires:
+                self._version, resolved_at = self._read_disk() or self._fetch()
+                self._expires = resolved_at + self.ttl
+        return self._version
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._expires = 0.0
+            if self.cache_path is not None:
+                try:
+                    self.cache_path.unlink()
+                except OSError:
+                    pass
+
+    def _read_disk(self) -> Optional[tuple[str, float]]:
+        if self.cache_path is None:
+            return None
+        try:
+            data = json.loads(self.cache_path.read_text())
+            version, resolved_at = data["version"], float(data["resolved_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if not _VERSION_RE.match(version) or time.time() >= resolved_at + self.ttl:
+            return None
+        return version, resolved_at
+
+    def _write_disk(self, version: str, resolved_at: float):
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"version": version, "resolved_at": resolved_at}))
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+    def _fetch(self) -> tuple[str, float]:
+        now = time.time()
+        try:
+            import requests
+            from bs4 import BeautifulSoup
+
+            r = requests.get(CHANGELOG_URL, timeout=self.timeout)
+            r.raise_for_status()
+            soup = BeautifulSoup(r.text, features="html.parser")
+            version = soup.find_all("table")[0].find_all("tr")[0].find_all("td")[1].text.strip()
+        except Exception:
+            version = None
+        if version is None or not _VERSION_RE.match(version):
+            # do not persist the fallback, and retry the lookup after a short while rather than a full ttl
+            return self.fallback, now - self.ttl + min(self.ttl, 5 * 60)
+        self._write_disk(version, now)
+        return version, now
+
+
+resolver = VersionResolver()
@@ -0,0 +1,187 @@
+import hashlib
+import hmac
+import json
+import logging
+import queue
+import threading
+from typing import Callable, Iterable, Optional
+from urllib.parse import parse_qs
+from whatsapp.events import Event, parse
+
+logger = logging.getLogger(__name__)
+
+WebhookHandler = Callable[[dict], None]
+EventHandler = Callable[[Event], None]
+_STOP = object()
+
+
+class Webhook:
+    # WSGI (`wsgi_app`) and ASGI (`asgi_app`) webhook endpoint.
+    # GET answers the hub.challenge handshake. POST checks X-Hub-Signature-256 when an app secret is
+    # set, queues the raw body and acknowledges right away; worker threads decode the JSON and call
+    # the handlers: payload handlers get the decoded dict, event handlers registered with on() get the
+    # events of the types they asked for (see whatsapp.events). When the queue is full the request
+    # gets a 503 so Meta delivers it again later.
+    def __init__(
+            self,
+            verify_token: str,
+            app_secret: Optional[str] = None,
+            handlers: Iterable[WebhookHandler] = (),
+            workers: int = 4,
+            queue_size: int = 10_000,
+    ):
+        self.verify_token = verify_token
+        self._app_secret = app_secret.encode() if app_secret else None
+        self.handlers: list[WebhookHandler] = list(handlers)
+        self.event_handlers: dict[str, list[EventHandler]] = {}
+        self.workers = workers
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads: list[threading.Thread] = []
+        self._start_lock = threading.Lock()
+
+    def add_handler(self, handler: WebhookHandler) -> WebhookHandler:
+        self.handlers.append(handler)
+        return handler
+
+    def on(self, *types: str) -> Callable[[EventHandler], EventHandler]:
+        # types are message types ("text", "image", "reaction", ...), "message" for any inbound
+        # message, "status" for status updates, or "*" for every event
+        def register(handler: EventHandler) -> EventHandler:
+            for type_ in types or ("*",):
+                self.event_handlers.setdefault(type_, []).append(handler)
+            return handler
+
+        return register
+
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"whatsapp-webhook-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def close(self, timeout: Optional[float] = None):
+        # lets the workers finish what is already queued, then stops them
+        with self._start_lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+
+    def _work(self):
+        while True:
+            body = self._queue.get()
+            if body is _STOP:
+                return
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                logger.warning("dropping webhook payload that is not valid JSON")
+                continue
+            # a payload of an unexpected shape is dropped, it must not take the worker down with it
+            try:
+                self._dispatch(payload)
+            except Exception:
+                logger.exception("dropping webhook payload that could not be dispatched")
+
+    def _dispatch(self, payload: dict):
+        for handler in self.handlers:
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception("webhook handler %r failed", handler)
+        if not self.event_handlers:
+            return
+        for event in parse(payload):
+            type_ = event.type
+            for key in (type_, "*") if type_ == event.kind else (type_, event.kind, "*"):
+                for handler in self.event_handlers.get(key, ()):
+                    try:
+                        handler(event)
+                    except Exception:
+                        logger.exception("webhook event handler %r failed", handler)
+
+    def verify(self, mode: Optional[str], token: Optional[str], challenge: Optional[str]) -> Optional[str]:
+        if mode == "subscribe" and token is not None and hmac.compare_digest(token.encode(), self.verify_token.encode()):
+            return challenge or ""
+        return None
+
+    def check_signature(self, body: bytes, signature: Optional[str]) -> bool:
+        if self._app_secret is None:
+            return True
+        if not signature or not signature.startswith("sha256="):
+            return False
+        expected = hmac.new(self._app_secret, body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature[7:])
+
+    def handle(self, method: str, query: str, signature: Optional[str], body: bytes) -> tuple[int, bytes]:
+        if method == "GET":
+            params = parse_qs(query)
+            challenge = self.verify(
+                params.get("hub.mode", [None])[0],
+                params.get("hub.verify_token", [None])[0],
+                params.get("hub.challenge", [None])[0],
+            )
+            return (200, challenge.encode()) if challenge is not None else (403, b"")
+        if method != "POST":
+            return 405, b""
+        if not self.check_signature(body, signature):
+            return 403, b""
+        if not self._threads:
+            self.start()
+        try:
+            self._queue.put_nowait(body)
+        except queue.Full:
+            return 503, b""
+        return 200, b""
+
+    def wsgi_app(self, environ: dict, start_response: Callable) -> list[bytes]:
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        body = environ["wsgi.input"].read(length) if length else b""
+        status, content = self.handle(
+            environ["REQUEST_METHOD"],
+            environ.get("QUERY_STRING", ""),
+            environ.get("HTTP_X_HUB_SIGNATURE_256"),
+            body,
+        )
+        start_response(
+            f"{status} {_REASONS[status]}",
+            [("Content-Type", "text/plain"), ("Content-Length", str(len(content)))],
+        )
+        return [content]
+
+    async def asgi_app(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            return
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        signature = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-hub-signature-256":
+                signature = value.decode("latin-1")
+                break
+        status, content = self.handle(
+            scope["method"],
+            scope.get("query_string", b"").decode("latin-1"),
+            signature,
+            b"".join(chunks),
+        )
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(content)).encode())],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+_REASONS = {200: "OK", 403: "Forbidden", 405: "Method Not Allowed", 503: "Service Unavailable"}
@@ -0,0 +1,301 @@
+import logging
+import os
+import threading
+import time
+from array import array
+from typing import Iterable, Optional, Union
+from whatsapp.errors import ChatExpiredException
+from whatsapp.events import Event, InboundMessage, parse
+
+logger = logging.getLogger(__name__)
+# Customer service window: free-form messages can be sent for 24 hours after the customer's last
+# message, outside of it only templates are delivered (131047).
+WINDOW = 24 * 60 * 60
+_GOLDEN = 0x9E3779B97F4A7C15
+_U64 = (1 << 64) - 1
+_MAX_LOAD = 0.75
+_PHONE_SEPARATORS = str.maketrans("", "", " ()-.+")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS windows (wa_id INTEGER PRIMARY KEY, last_inbound INTEGER NOT NULL)",
+)
+_UPSERT = (
+    "INSERT INTO windows (wa_id, last_inbound) VALUES (?, ?) "
+    "ON CONFLICT (wa_id) DO UPDATE SET last_inbound = max(last_inbound, excluded.last_inbound)"
+)
+
+
+def _key(wa_id: str) -> Optional[int]:
+    # wa_ids are E.164 numbers without the +, kept as integers; None for anything else
+    if not (wa_id.isdigit() and wa_id.isascii()):
+        wa_id = wa_id.translate(_PHONE_SEPARATORS)
+        if not (wa_id.isdigit() and wa_id.isascii()):
+            return None
+    key = int(wa_id)
+    return key if 0 < key <= _U64 else None
+
+
+def _table(size: int) -> tuple[array, array, int, int]:
+    # (keys, last inbound timestamps, hash shift, mask) for `size` slots, a power of two
+    return array("Q", bytes(8 * size)), array("I", bytes(4 * size)), 64 - size.bit_length() + 1, size - 1
+
+
+class ConversationWindows:
+    # Last inbound message time per customer of one business phone number, fed by inbound message
+    # webhooks (attach() or observe()), so that sends can tell without a round trip whether the
+    # customer service window is open. An open addressing hash table over two arrays: 12 bytes a
+    # slot (wa_id as an unsigned 64 bit integer, timestamp as 32 bit seconds), lookups are lock free.
+    # Contacts whose window closed are dropped when the table grows, so memory follows the contacts
+    # active in the last day, not all the contacts ever seen; give `capacity` to size it up front.
+    #
+    # With a `path` the times are also written to a SQLite file (in batches, every `flush_size`
+    # records, and every `flush_interval` seconds from a background thread) and the open windows are
+    # loaded from it on start. close() writes what is left.
+    # Contacts never seen are outside the window: a business initiated conversation needs a template.
+    def __init__(
+            self,
+            path: Union[str, os.PathLike, None] = None,
+            phone_number_id: Optional[str] = None,
+            capacity: int = 1024,
+            window: int = WINDOW,
+            flush_size: int = 1000,
+            flush_interval: float = 1.0,
+            timeout: float = 30.0,
+    ):
+        # phone_number_id: events for other business numbers are ignored by observe()
+        self.phone_number_id = phone_number_id
+        self.window = window
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._table = _table(max(16, 1 << int(capacity / _MAX_LOAD).bit_length()))
+        self._used = 0
+        self._pending: list[tuple[int, int]] = []
+        self._expired: list[tuple[int, int]] = []
+        self._db = None
+        self._closed = threading.Event()
+        self._flusher = None
+        self.path = os.fspath(path) if path is not None else None
+        if self.path is not None:
+            import sqlite3
+
+            self._db = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+            self.purge()
+            rows = self._db.execute("SELECT wa_id, last_inbound FROM windows").fetchall()
+            with self._lock:
+                self._grow(len(rows))
+                for key, timestamp in rows:
+                    self._set(key, timestamp)
+            if flush_interval > 0:
+                self._flusher = threading.Thread(target=self._flush_loop, name="whatsapp-windows", daemon=True)
+                self._flusher.start()
+
+    def _slot(self, key: int) -> int:
+        keys, _, shift, mask = self._table
+        i = ((key * _GOLDEN) & _U64) >> shift
+        while True:
+            k = keys[i]
+            if k == key or not k:
+                return i
+            i = (i + 1) & mask
+
+    def _set(self, key: int, timestamp: int):
+        # under the lock; keeps the newest timestamp
+        keys, times = self._table[0], self._table[1]
+        i = self._slot(key)
+        if keys[i]:
+            if timestamp > times[i]:
+                times[i] = timestamp
+            return
+        if self._used + 1 > _MAX_LOAD * len(keys):
+            self._grow(1)
+            keys, times = self._table[0], self._table[1]
+            i = self._slot(key)
+        keys[i] = key
+        times[i] = timestamp
+        self._used += 1
+
+    def _grow(self, extra: int):
+        # rebuilds the table without the closed windows, twice as large as the open ones need
+        # (two passes over the arrays rather than a list of the live entries, which would cost more
+        # memory than the table itself)
+        keys, times = self._table[0], self._table[1]
+        cutoff = int(time.time()) - self.window
+        live = sum(1 for k, t in zip(keys, times) if k and t > cutoff)
+        size = len(keys)
+        while live + extra > _MAX_LOAD * size / 2:
+            size *= 2
+        table = _table(size)
+        new_keys, new_times, shift, mask = table
+        for key, timestamp in zip(keys, times):
+            if key and timestamp > cutoff:
+                i = ((key * _GOLDEN) & _U64) >> shift
+                while new_keys[i]:
+                    i = (i + 1) & mask
+                new_keys[i] = key
+                new_times[i] = timestamp
+        self._table = table
+        self._used = live
+
+    def record(self, wa_id: str, timestamp: Optional[int] = None):
+        # a message from `wa_id` at `timestamp` (unix seconds, the webhook one; now if None)
+        key = _key(wa_id)
+        if key is None:
+            return
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        with self._lock:
+            self._set(key, timestamp)
+            if self._db is not None:
+                self._pending.append((key, timestamp))
+                self._maybe_flush()
+
+    def record_many(self, records: Iterable[tuple[str, int]]):
+        # (wa_id, timestamp) pairs under one lock and one transaction, e.g. to warm the index up
+        with self._lock:
+            for wa_id, timestamp in records:
+                key = _key(wa_id)
+                if key is not None:
+                    self._set(key, int(timestamp))
+                    if self._db is not None:
+                        self._pending.append((key, int(timestamp)))
+            if self._db is not None:
+                self._flush()
+
+    def expire(self, wa_id: str, at: Optional[float] = None):
+        # the API answered 131047 at `at`: the window is closed unless a message came in since
+        key = _key(wa_id)
+        if key is None:
+            return
+        at = int(at if at is not None else time.time())
+        with self._lock:
+            keys, times = self._table[0], self._table[1]
+            i = self._slot(key)
+            if keys[i] and times[i] < at:
+                times[i] = 0
+                if self._db is not None:
+                    self._expired.append((key, at))
+                    self._maybe_flush()
+
+    def last_inbound(self, wa_id: str) -> Optional[int]:
+        # time of the customer's last message, None if unknown or expired
+        key = _key(wa_id)
+        if key is None:
+            return None
+        keys, times, shift, mask = self._table
+        i = ((key * _GOLDEN) & _U64) >> shift
+        while True:
+            k = keys[i]
+            if k == key:
+                return times[i] or None
+            if not k:
+                return None
+            i = (i + 1) & mask
+
+    def is_open(self, wa_id: str, now: Optional[float] = None) -> bool:
+        timestamp = self.last_inbound(wa_id)
+        return timestamp is not None and timestamp + self.window > (now if now is not None else time.time())
+
+    def expires_at(self, wa_id: str) -> Optional[int]:
+        timestamp = self.last_inbound(wa_id)
+        return timestamp + self.window if timestamp is not None else None
+
+    def check(self, wa_id: str):
+        # raises the ChatExpiredException the API would answer a free-form message with
+        if not self.is_open(wa_id):
+            raise ChatExpiredException({
+                "error": f"no message from {wa_id} in the last {self.window // 3600} hours, send a template",
+                "code": 131047,
+            })
+
+    def observe(self, event: Event):
+        # webhook event handler: `webhook.on("message")(windows.observe)`
+        if not isinstance(event, InboundMessage):
+            return
+        if self.phone_number_id is not None and event.phone_number_id != self.phone_number_id:
+            return
+        sender = event.sender
+        if sender:
+            self.record(sender, event.timestamp)
+
+    def attach(self, webhook) -> "ConversationWindows":
+        webhook.on("message")(self.observe)
+        return self
+
+    def feed(self, payload: Union[bytes, str, dict]):
+        # a webhook payload as received, for applications with their own webhook endpoint
+        for event in parse(payload):
+            self.observe(event)
+
+    def _maybe_flush(self):
+        if len(self._pending) + len(self._expired) >= self.flush_size:
+            self._flush()
+
+    def _flush_loop(self):
+        # writes the records of quiet periods too, which no later record() would flush
+        while not self._closed.wait(self.flush_interval):
+            try:
+                with self._lock:
+                    if self._db is not None:
+                        self._flush()
+            except Exception:
+                logger.exception("could not write conversation windows, retrying")
+
+    def _flush(self):
+        # under the lock
+        if not (self._pending or self._expired):
+            return
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(_UPSERT, self._pending)
+            db.executemany("DELETE FROM windows WHERE wa_id = ? AND last_inbound < ?", self._expired)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        self._pending.clear()
+        self._expired.clear()
+
+    def flush(self):
+        if self._db is not None:
+            with self._lock:
+                self._flush()
+
+    def purge(self) -> int:
+        # deletes the closed windows from the SQLite file
+        if self._db is None:
+            return 0
+        with self._lock:
+            self._flush()
+            return self._db.execute(
+                "DELETE FROM windows WHERE last_inbound <= ?", (int(time.time()) - self.window,)
+            ).rowcount
+
+    @property
+    def nbytes(self) -> int:
+        keys, times = self._table[0], self._table[1]
+        return keys.itemsize * len(keys) + times.itemsize * len(times)
+
+    def __len__(self) -> int:
+        # contacts in the table, including closed windows not dropped yet
+        return self._used
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()